@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+
+
+class TTLCache:
+    """
+    Caché en memoria (por worker) con caducidad, límite de entradas (LRU)
+    e invalidación por etiquetas. Thread-safe: las rutas sync corren en el threadpool.
+
+    Cada etiqueta lleva una generación que sube al invalidarla. Quien rellena la
+    caché toma version(tags) antes de leer la BD y la pasa a set(): si mientras
+    tanto se invalidó alguna etiqueta, el valor ya es viejo y no se guarda.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expires_at, value, tags)
+        self._generations = {}  # tag -> nº de invalidaciones
+        self._clears = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        if self.ttl <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def version(self, tags=()) -> tuple:
+        """Generación actual de estas etiquetas (tomarla antes de calcular el valor)."""
+        with self._lock:
+            return self._version(tags)
+
+    def _version(self, tags) -> tuple:
+        return (self._clears, *(self._generations.get(t, 0) for t in sorted(tags)))
+
+    def set(self, key, value, tags=(), version=None):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if version is not None and self._version(tags) != version:
+                return  # invalidada mientras se calculaba
+            self._data[key] = (time.monotonic() + self.ttl, value, frozenset(tags))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate_tags(self, *tags):
+        """Borra las entradas que tengan alguna de estas etiquetas."""
+        wanted = set(tags)
+        with self._lock:
+            for tag in wanted:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            stale = [k for k, (_, _, entry_tags) in self._data.items() if entry_tags & wanted]
+            for k in stale:
+                del self._data[k]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._clears += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+class HighWaterMarks:
+    """
+    Último id conocido por clave (p. ej. el interés más reciente de cada usuario).
+    Solo sube: raise_to() ignora valores menores, así una lectura lenta de BD no pisa
+    una actualización más nueva. Caduca tras `ttl` para recoger escrituras de otros workers.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if self.ttl <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def raise_to(self, key, value, only_if_present: bool = False):
+        """Guarda max(actual, value). Con only_if_present no crea entradas nuevas."""
+        if self.ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] < now:
+                del self._data[key]
+                entry = None
+            if entry is None:
+                if only_if_present:
+                    return
+                self._data[key] = (now + self.ttl, value)
+            elif value > entry[1]:
+                # Conserva la caducidad: la entrada sigue necesitando refrescarse desde BD
+                self._data[key] = (entry[0], value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+# HTML renderizado de /ui/results (ver app/routes/web.py)
+results_page_cache = TTLCache(ttl=settings.RESULTS_CACHE_TTL)
+
+# Último Interest.id sobre las ofertas de cada usuario (ver poll_interests)
+interest_high_water = HighWaterMarks(ttl=settings.INTEREST_HWM_TTL)
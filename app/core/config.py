@@ -13,6 +13,31 @@ class Settings(BaseModel):
     SECRET_KEY: str = "change-me"
     DATABASE_URL: str = "sqlite:///./dev.db"  # por defecto, para arrancar rápido
     DEBUG: bool = True
+    AUTO_MIGRATE: bool = True  # En producción se migra una vez por despliegue (app.scripts.migrate)
+    SQLITE_BUSY_TIMEOUT_MS: int = 10000  # Espera máxima por el lock de escritura (app/db/sqlite.py)
+    SQLITE_SINGLE_WRITER: bool = True  # Escrituras en cola: un escritor a la vez entre todos los workers
+    WEB_CONCURRENCY: int = 4  # Workers de gunicorn (gunicorn lee la misma variable); reparte DB_MAX_CONNECTIONS
+    DB_MAX_CONNECTIONS: int = 90  # Conexiones de Postgres para la app entera (deja margen a max_connections)
+    DB_POOL_SIZE: int | None = None  # Por worker; por defecto sale de DB_MAX_CONNECTIONS (app/db/pool.py)
+    DB_MAX_OVERFLOW: int | None = None
+    DB_POOL_TIMEOUT: int = 10  # Segundos esperando una conexión libre antes de fallar
+    DB_POOL_RECYCLE: int = 1800  # Segundos antes de reabrir una conexión
+    DB_POOL_PRE_PING: bool = True  # Comprobar la conexión al sacarla del pool
+    DB_STATEMENT_TIMEOUT_MS: int = 15000  # statement_timeout de Postgres (0 = sin límite)
+    DB_PGBOUNCER: bool = False  # Detrás de PgBouncer en modo transaction: NullPool + SET LOCAL
+    RESULTS_CACHE_TTL: int = 30  # Segundos que se cachea el HTML de /ui/results (0 = desactivado)
+    INTEREST_HWM_TTL: int = 30  # Segundos que se confía en el último interés cacheado por usuario (0 = desactivado)
+    BACKPLANE: str = "local"  # local / unix / redis: reparto de mensajes entre workers (app/services/backplane.py)
+    BACKPLANE_URL: str = ""  # Ruta del socket (unix) o redis://host:6379/0 (redis)
+    MEDIA_WORKERS: int = 1  # Procesos de ffmpeg (versiones web) por worker de gunicorn (app/services/media_jobs.py)
+    MEDIA_PROBE_WORKERS: int = 1  # Procesos de ffprobe (validación), aparte: no esperan a ffmpeg
+    STORAGE: str = "local"  # local / s3: dónde se guardan los archivos subidos (app/services/storage.py)
+    S3_ENDPOINT: str = ""  # https://s3.eu-west-1.amazonaws.com, http://minio:9000...
+    S3_BUCKET: str = ""
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY: str = ""
+    S3_SECRET_KEY: str = ""
+    S3_PUBLIC_URL: str = ""  # Desde donde se sirven los archivos (CDN); por defecto endpoint/bucket
     GOOGLE_CLIENT_ID: str | None = None
     GOOGLE_CLIENT_SECRET: str | None = None
 
@@ -25,6 +50,31 @@ def get_settings() -> Settings:
         SECRET_KEY=os.getenv("SECRET_KEY", "change-me"),
         DATABASE_URL=os.getenv("DATABASE_URL", "sqlite:///./dev.db"),
         DEBUG=os.getenv("DEBUG", "true").lower() in ("1", "true", "yes", "y"),
+        AUTO_MIGRATE=os.getenv("AUTO_MIGRATE", "true").lower() in ("1", "true", "yes", "y"),
+        SQLITE_BUSY_TIMEOUT_MS=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "10000")),
+        SQLITE_SINGLE_WRITER=os.getenv("SQLITE_SINGLE_WRITER", "true").lower() in ("1", "true", "yes", "y"),
+        WEB_CONCURRENCY=int(os.getenv("WEB_CONCURRENCY", "4")),
+        DB_MAX_CONNECTIONS=int(os.getenv("DB_MAX_CONNECTIONS", "90")),
+        DB_POOL_SIZE=int(os.getenv("DB_POOL_SIZE")) if os.getenv("DB_POOL_SIZE") else None,
+        DB_MAX_OVERFLOW=int(os.getenv("DB_MAX_OVERFLOW")) if os.getenv("DB_MAX_OVERFLOW") else None,
+        DB_POOL_TIMEOUT=int(os.getenv("DB_POOL_TIMEOUT", "10")),
+        DB_POOL_RECYCLE=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        DB_POOL_PRE_PING=os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes", "y"),
+        DB_STATEMENT_TIMEOUT_MS=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000")),
+        DB_PGBOUNCER=os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes", "y"),
+        RESULTS_CACHE_TTL=int(os.getenv("RESULTS_CACHE_TTL", "30")),
+        INTEREST_HWM_TTL=int(os.getenv("INTEREST_HWM_TTL", "30")),
+        BACKPLANE=os.getenv("BACKPLANE", "local").lower(),
+        BACKPLANE_URL=os.getenv("BACKPLANE_URL", ""),
+        MEDIA_WORKERS=int(os.getenv("MEDIA_WORKERS", "1")),
+        MEDIA_PROBE_WORKERS=int(os.getenv("MEDIA_PROBE_WORKERS", "1")),
+        STORAGE=os.getenv("STORAGE", "local").lower(),
+        S3_ENDPOINT=os.getenv("S3_ENDPOINT", ""),
+        S3_BUCKET=os.getenv("S3_BUCKET", ""),
+        S3_REGION=os.getenv("S3_REGION", "us-east-1"),
+        S3_ACCESS_KEY=os.getenv("S3_ACCESS_KEY", ""),
+        S3_SECRET_KEY=os.getenv("S3_SECRET_KEY", ""),
+        S3_PUBLIC_URL=os.getenv("S3_PUBLIC_URL", ""),
         GOOGLE_CLIENT_ID=os.getenv("GOOGLE_CLIENT_ID"),
         GOOGLE_CLIENT_SECRET=os.getenv("GOOGLE_CLIENT_SECRET"),
     )
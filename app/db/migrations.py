@@ -0,0 +1,243 @@
+"""
+Migraciones versionadas.
+
+Cada migración es (versión, función(conn)). Se aplican en orden, cada una en su
+propia transacción, y se apuntan en la tabla `schema_migrations` para no repetirlas.
+Se ejecutan una vez por despliegue con `python -m app.scripts.migrate`
+(ver render.yaml), no en el arranque de cada worker.
+
+Para añadir una migración: escribir la función y añadirla AL FINAL de MIGRATIONS.
+Nunca reordenar ni renombrar las ya publicadas. Dentro de una migración, SQL
+(text() o Core) sobre columnas explícitas, nunca consultas con los modelos ORM:
+el modelo es el de hoy y puede tener columnas que aún no existen en esa versión.
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from app.db.base import Base
+
+# IMPORTA LOS MODELOS PARA QUE SQLAlchemy LOS REGISTRE
+from app.models.user import User  # noqa: F401
+from app.models.profile import Profile  # noqa: F401
+from app.models.offer import Offer  # noqa: F401
+from app.models.rating import Rating  # noqa: F401
+from app.models.interest import Interest  # noqa: F401
+from app.models.offer_real_estate import OfferRealEstate  # noqa: F401
+from app.models.category import Category  # noqa: F401
+from app.models.profile_category import ProfileCategory  # noqa: F401
+from app.models.chat import Chat  # noqa: F401
+from app.models.message import Message  # noqa: F401
+from app.services.search_index import ensure_search_index, fold_accents
+from app.services.geo import geo_cell, parse_coord
+
+
+def _add_columns(conn, table: str, columns: dict):
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    for name, ddl_type in columns.items():
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl_type}"))
+            print(f"DEBUG: Migrated {table} ADD COLUMN {name}")
+
+
+def m0001_profile_contact_columns(conn):
+    # Antes era la auto-migración a mano de init_db
+    _add_columns(conn, "profiles", {
+        "phone": "VARCHAR",
+        "lat": "VARCHAR",
+        "lon": "VARCHAR",
+        "address": "VARCHAR",
+    })
+
+
+def m0002_offer_search_index(conn):
+    ensure_search_index(conn)
+
+
+def _to_int(value):
+    # Copia congelada de app.services.offer_attributes._to_int: la migración no
+    # debe cambiar si cambia el servicio
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def m0003_offer_vertical_attributes(conn):
+    # SQL sobre columnas explícitas, no el modelo Offer: su SELECT incluye
+    # columnas que añaden migraciones posteriores (0007, 0008, 0009)
+    rows = conn.execute(text(
+        "SELECT offers.id, offers.extra_info FROM offers "
+        "LEFT JOIN offer_real_estate ON offer_real_estate.offer_id = offers.id "
+        "WHERE offers.category = 'Inmobiliaria (Pisos/Locales)' AND offer_real_estate.offer_id IS NULL"
+    )).all()
+    for offer_id, extra in rows:
+        if isinstance(extra, str):
+            extra = json.loads(extra or "null")
+        extra = extra if isinstance(extra, dict) else {}
+        operation_type, zone = extra.get("operation_type"), extra.get("zone_text")
+        conn.execute(
+            text(
+                "INSERT INTO offer_real_estate (offer_id, operation_type, rooms, sqm, zone_text) "
+                "VALUES (:id, :operation_type, :rooms, :sqm, :zone_text)"
+            ),
+            {
+                "id": offer_id,
+                "operation_type": str(operation_type).strip() if operation_type not in (None, "") else None,
+                "rooms": _to_int(extra.get("rooms")),
+                "sqm": _to_int(extra.get("sqm")),
+                "zone_text": fold_accents(str(zone)).strip() if zone not in (None, "") else None,
+            },
+        )
+    if rows:
+        print(f"DEBUG: Backfill de atributos de vertical: {len(rows)} ofertas")
+
+
+def m0004_listing_indexes(conn):
+    # Índices para las consultas calientes de web.py, offers.py e interests.py
+    statements = [
+        # status='PUBLISHED' ORDER BY id DESC (feed, resultados, list_offers)
+        "CREATE INDEX IF NOT EXISTS ix_offers_published_id ON offers (id) WHERE status = 'PUBLISHED'",
+        # status + category (filtros por categoría, ordenados por id)
+        "CREATE INDEX IF NOT EXISTS ix_offers_status_category_id ON offers (status, category, id)",
+        # status + price (filtros de precio min/max)
+        "CREATE INDEX IF NOT EXISTS ix_offers_status_price ON offers (status, price)",
+        # ofertas de un perfil (perfil público, mine=true, intereses de mis ofertas)
+        "CREATE INDEX IF NOT EXISTS ix_offers_profile_status_id ON offers (profile_id, status, id)",
+        # intereses por oferta (+ id > last_id en el poll)
+        "CREATE INDEX IF NOT EXISTS ix_interests_offer_id_id ON interests (offer_id, id)",
+    ]
+    for stmt in statements:
+        conn.execute(text(stmt))
+    # Estadísticas para que el planificador elija los índices nuevos
+    conn.execute(text("ANALYZE"))
+
+
+def m0005_profile_geo_index(conn):
+    _add_columns(conn, "profiles", {
+        "geo_lat": "FLOAT",
+        "geo_lon": "FLOAT",
+        "geo_cell": "INTEGER",
+    })
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_profiles_geo_cell ON profiles (geo_cell, geo_lat, geo_lon)"
+    ))
+
+    # Backfill desde las columnas de texto lat/lon
+    rows = conn.execute(text(
+        "SELECT id, lat, lon FROM profiles WHERE lat IS NOT NULL AND lon IS NOT NULL"
+    )).all()
+    for profile_id, lat_raw, lon_raw in rows:
+        lat, lon = parse_coord(lat_raw), parse_coord(lon_raw)
+        if lat is None or lon is None:
+            continue
+        conn.execute(
+            text("UPDATE profiles SET geo_lat = :lat, geo_lon = :lon, geo_cell = :cell WHERE id = :id"),
+            {"lat": lat, "lon": lon, "cell": geo_cell(lat, lon), "id": profile_id},
+        )
+
+
+def m0006_profile_rating_stats(conn):
+    scores = range(1, 6)
+    columns = {"rating_count": "INTEGER NOT NULL DEFAULT 0", "rating_sum": "INTEGER NOT NULL DEFAULT 0"}
+    columns.update({f"rating_{score}": "INTEGER NOT NULL DEFAULT 0" for score in scores})
+    _add_columns(conn, "profiles", columns)
+    # Relleno en SQL (no rebuild_rating_stats, que escribe con el modelo Profile de hoy)
+    per_score = ", ".join(
+        f"rating_{score} = (SELECT COUNT(*) FROM ratings WHERE ratings.profile_id = profiles.id "
+        f"AND ratings.score = {score})"
+        for score in scores
+    )
+    conn.execute(text(
+        "UPDATE profiles SET "
+        "rating_count = (SELECT COUNT(*) FROM ratings WHERE ratings.profile_id = profiles.id), "
+        "rating_sum = (SELECT COALESCE(SUM(ratings.score), 0) FROM ratings WHERE ratings.profile_id = profiles.id), "
+        f"{per_score}"
+    ))
+
+
+def m0007_offer_media_status(conn):
+    _add_columns(conn, "offers", {
+        "media_status": "VARCHAR",
+        "media_error": "VARCHAR",
+        "media_info": "JSON",
+        "media_updated_at": "TIMESTAMP",
+    })
+    # Los vídeos subidos antes ya pasaron la validación inline
+    conn.execute(text("UPDATE offers SET media_status = 'READY' WHERE video_path IS NOT NULL"))
+    # Solo los trabajos sin terminar: lo que busca pending_offer_ids() al arrancar cada worker
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_offers_media_pending ON offers (media_updated_at) "
+        "WHERE media_status IN ('PENDING', 'PROCESSING')"
+    ))
+
+
+def m0008_offer_video_renditions(conn):
+    _add_columns(conn, "offers", {
+        "video_renditions": "JSON",
+        "poster_path": "VARCHAR",
+    })
+
+
+def m0009_photo_variants(conn):
+    # Las fotos subidas antes siguen con photo/photo_path (original) y variantes NULL
+    _add_columns(conn, "offers", {"photo_variants": "JSON"})
+    _add_columns(conn, "profiles", {"photo_variants": "JSON"})
+
+
+def m0010_real_estate_zone_prefix_index(conn):
+    # El filtro de zona es un prefijo (zone_text LIKE 'texto%'). Un índice normal no
+    # lo sirve: SQLite solo usa uno con COLLATE NOCASE (LIKE no distingue mayúsculas)
+    # y Postgres, con una collation que no sea C, solo uno con varchar_pattern_ops
+    conn.execute(text("DROP INDEX IF EXISTS ix_offer_real_estate_zone"))
+    opclass = "COLLATE NOCASE" if conn.dialect.name == "sqlite" else "varchar_pattern_ops"
+    conn.execute(text(f"CREATE INDEX ix_offer_real_estate_zone ON offer_real_estate (zone_text {opclass})"))
+
+
+MIGRATIONS = [
+    ("0001_profile_contact_columns", m0001_profile_contact_columns),
+    ("0002_offer_search_index", m0002_offer_search_index),
+    ("0003_offer_vertical_attributes", m0003_offer_vertical_attributes),
+    ("0004_listing_indexes", m0004_listing_indexes),
+    ("0005_profile_geo_index", m0005_profile_geo_index),
+    ("0006_profile_rating_stats", m0006_profile_rating_stats),
+    ("0007_offer_media_status", m0007_offer_media_status),
+    ("0008_offer_video_renditions", m0008_offer_video_renditions),
+    ("0009_photo_variants", m0009_photo_variants),
+    ("0010_real_estate_zone_prefix_index", m0010_real_estate_zone_prefix_index),
+]
+
+
+def applied_migrations(conn) -> set:
+    return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars().all())
+
+
+def run_migrations(engine) -> list:
+    """Crea las tablas base y aplica las migraciones pendientes. Devuelve las aplicadas."""
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version VARCHAR PRIMARY KEY, applied_at TIMESTAMP NOT NULL)"
+        ))
+
+    applied = []
+    for version, migrate in MIGRATIONS:
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # Evita que dos despliegues simultáneos apliquen la misma migración
+                conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('schema_migrations'))"))
+                # Un índice o un backfill sobre una tabla grande tarda más que DB_STATEMENT_TIMEOUT_MS
+                conn.execute(text("SET LOCAL statement_timeout = 0"))
+            if version in applied_migrations(conn):
+                continue
+            print(f"DEBUG: Aplicando migración {version}")
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, applied_at) VALUES (:v, :t)"),
+                {"v": version, "t": datetime.utcnow()},
+            )
+            applied.append(version)
+    return applied
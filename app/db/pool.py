@@ -0,0 +1,185 @@
+"""
+Pool de conexiones por worker (Postgres) y sus métricas.
+
+Cada worker de gunicorn tiene su propio pool, y cada petición sync ocupa una
+conexión desde un hilo del threadpool. Con los valores por defecto de
+SQLAlchemy (5 + 10 de overflow) cuatro workers pueden abrir 60 conexiones,
+más que lo que permiten los planes pequeños de Postgres; y tras un rato sin
+tráfico el pool devuelve conexiones que el servidor (o un balanceador) ya
+cerró. pool_options() reparte DB_MAX_CONNECTIONS entre WEB_CONCURRENCY workers:
+
+    por worker    = DB_MAX_CONNECTIONS // WEB_CONCURRENCY, a medias entre los dos
+                    engines (el sync, como mucho 40: los hilos)
+    pool_size     = DB_POOL_SIZE o min(por worker, 10)   abiertas siempre
+    max_overflow  = DB_MAX_OVERFLOW o el resto           se abren en picos
+    pool_timeout  espera máxima por una conexión libre (luego error, no cuelgue)
+    pool_recycle  reabre conexiones de más de DB_POOL_RECYCLE s
+    pool_pre_ping comprueba la conexión al sacarla del pool
+    statement_timeout  una consulta colgada no retiene la conexión
+
+DB_PGBOUNCER=true (PgBouncer en modo transaction): el pool lo hace PgBouncer,
+aquí NullPool. PgBouncer rechaza parámetros de arranque (options=-c ...) y
+reparte las transacciones entre conexiones de servidor, así que el
+statement_timeout se pone con SET LOCAL al empezar cada transacción.
+
+Cada worker tiene dos engines (app/db/session.py): el sync de siempre y el
+async (asyncpg) de las lecturas calientes; se reparten a medias la cuota del
+worker. El async solo lee: va en AUTOCOMMIT (sin BEGIN / ROLLBACK) y en vez
+de pre-ping mira si asyncpg ya vio cerrarse el socket, así que cada consulta
+es una sola ida y vuelta. Con PgBouncer asyncpg no puede cachear sentencias
+preparadas (cada transacción puede ir a otra conexión de servidor):
+statement_cache_size=0, y sigue con transacción para que valga el SET LOCAL.
+
+Métricas (/metrics -> db_pool / db_pool_async): espera por conexión (media,
+máxima, cuántas esperaron más de SLOW_CHECKOUT_MS) y ocupación del pool.
+"""
+import time
+import uuid
+
+from sqlalchemy import event
+from sqlalchemy.exc import DisconnectionError, TimeoutError as PoolTimeout
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+DEFAULT_POOL_SIZE = 10
+# Hilos del threadpool de anyio por worker: más conexiones que hilos no se usan nunca
+THREADPOOL_THREADS = 40
+SLOW_CHECKOUT_MS = 10.0
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.capacity = None
+        self.checkouts = 0
+        self.slow_checkouts = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+        self.max_wait_ms = 0.0
+        self.peak_checked_out = 0
+
+    def record(self, wait_ms: float, checked_out: int | None):
+        self.checkouts += 1
+        self.wait_ms_total += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        if wait_ms > SLOW_CHECKOUT_MS:
+            self.slow_checkouts += 1
+        if checked_out is not None:
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def stats(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "slow_checkouts": self.slow_checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_ms_total / self.checkouts, 3) if self.checkouts else None,
+            "max_wait_ms": round(self.max_wait_ms, 3),
+            "peak_checked_out": self.peak_checked_out,
+        }
+
+
+class _MeteredPool:
+    metrics = None  # PoolMetrics de cada clase (un engine sync y uno async por worker)
+
+    # _do_get es donde el pool espera una conexión libre (o abre una nueva)
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeout:
+            self.metrics.timeouts += 1
+            raise
+        checked_out = self.checkedout() if isinstance(self, QueuePool) else None
+        self.metrics.record((time.perf_counter() - started) * 1000, checked_out)
+        return connection
+
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    metrics = PoolMetrics()
+
+
+class MeteredAsyncQueuePool(_MeteredPool, AsyncAdaptedQueuePool):
+    metrics = PoolMetrics()
+
+
+class MeteredNullPool(_MeteredPool, NullPool):
+    metrics = PoolMetrics()
+
+
+class MeteredAsyncNullPool(_MeteredPool, NullPool):
+    metrics = PoolMetrics()
+
+
+def pool_options(settings, asyncio: bool = False) -> dict:
+    """Argumentos de create_engine() / create_async_engine() para Postgres según la configuración."""
+    if settings.DB_PGBOUNCER:
+        # Conexión nueva en cada checkout: pre-ping sería una ida y vuelta más para nada
+        options = {"poolclass": MeteredAsyncNullPool if asyncio else MeteredNullPool}
+        if asyncio:
+            # Sentencias preparadas sin caché y con nombre único: PgBouncer cambia la conexión de servidor
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+        return options
+
+    per_worker = max(2, settings.DB_MAX_CONNECTIONS // max(1, settings.WEB_CONCURRENCY) // 2)
+    if not asyncio:
+        per_worker = min(per_worker, THREADPOOL_THREADS)
+    pool_size = settings.DB_POOL_SIZE or min(per_worker, DEFAULT_POOL_SIZE)
+    max_overflow = settings.DB_MAX_OVERFLOW if settings.DB_MAX_OVERFLOW is not None else max(0, per_worker - pool_size)
+    poolclass = MeteredAsyncQueuePool if asyncio else MeteredQueuePool
+    poolclass.metrics.capacity = pool_size + max_overflow
+
+    options = {
+        "poolclass": poolclass,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        # Con asyncpg el ping va dentro de BEGIN / ROLLBACK: tres idas y vueltas.
+        # El engine async comprueba la conexión en local (configure_postgres)
+        "pool_pre_ping": settings.DB_POOL_PRE_PING and not asyncio,
+        "pool_use_lifo": True,  # las conexiones sobrantes quedan ociosas y el recycle las cierra
+    }
+    if asyncio:
+        # Solo lecturas: cada consulta en su propia transacción implícita, sin BEGIN / ROLLBACK
+        options["isolation_level"] = "AUTOCOMMIT"
+    if settings.DB_STATEMENT_TIMEOUT_MS and asyncio:
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+    elif settings.DB_STATEMENT_TIMEOUT_MS:
+        options["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def configure_postgres(engine, settings):
+    if settings.DB_PGBOUNCER and settings.DB_STATEMENT_TIMEOUT_MS:
+        statement = f"SET LOCAL statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT_MS)}"
+
+        @event.listens_for(engine, "begin")
+        def _statement_timeout(conn):
+            conn.exec_driver_sql(statement)
+
+    if engine.dialect.is_async and not settings.DB_PGBOUNCER and settings.DB_POOL_PRE_PING:
+        # asyncpg se entera en cuanto el servidor cierra el socket (reinicio,
+        # pg_terminate_backend, timeout de inactividad): se descarta sin ir a la BD
+        @event.listens_for(engine, "checkout")
+        def _discard_closed(dbapi_connection, connection_record, connection_proxy):
+            if dbapi_connection.driver_connection.is_closed():
+                raise DisconnectionError("Conexión cerrada por el servidor")
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    metrics = getattr(pool, "metrics", None) or PoolMetrics()
+    data = {"pool": type(pool).__name__, **metrics.stats()}
+    if isinstance(pool, QueuePool):
+        checked_out = pool.checkedout()
+        data.update({
+            "size": pool.size(),
+            "capacity": metrics.capacity,
+            "checked_out": checked_out,
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "utilization": round(checked_out / metrics.capacity, 3) if metrics.capacity else None,
+        })
+    return data
@@ -1,14 +1,58 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.db.pool import configure_postgres, pool_options
+from app.db.sqlite import configure_sqlite
 
+url = make_url(settings.DATABASE_URL)
 # SQLite necesita este flag si usas archivos y múltiples hilos (FastAPI dev)
-connect_args = {"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
+engine_options = {"connect_args": {"check_same_thread": False}} if url.get_backend_name() == "sqlite" else {}
+# Postgres: pool dimensionado por worker, pre-ping, recycle y statement_timeout (app/db/pool.py)
+if url.get_backend_name() == "postgresql":
+    engine_options = pool_options(settings)
 
-engine = create_engine(settings.DATABASE_URL, echo=False, future=True, connect_args=connect_args)
+engine = create_engine(url, echo=False, future=True, **engine_options)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+# SQLite: WAL + PRAGMAs y un solo escritor a la vez (app/db/sqlite.py); None con Postgres
+sqlite_writer = None
+if engine.dialect.name == "sqlite":
+    sqlite_writer = configure_sqlite(
+        engine,
+        url.database,
+        busy_timeout_ms=settings.SQLITE_BUSY_TIMEOUT_MS,
+        single_writer=settings.SQLITE_SINGLE_WRITER,
+    )
+elif engine.dialect.name == "postgresql":
+    configure_postgres(engine, settings)
+
+
+# Engine async para las lecturas calientes (rutas `async def` con get_async_db):
+# no ocupan un hilo del threadpool mientras esperan a la BD. Misma base de datos
+# con el driver async (aiosqlite / asyncpg). Solo lecturas: las escrituras siguen
+# por el engine sync (en SQLite, el WriterLock bloquea y no puede ir en el event loop).
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+async_url = url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+async_engine_options = {}
+if url.get_backend_name() == "postgresql":
+    async_engine_options = pool_options(settings, asyncio=True)
+
+async_engine = create_async_engine(async_url, echo=False, **async_engine_options)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+if async_engine.dialect.name == "sqlite":
+    configure_sqlite(
+        async_engine.sync_engine,
+        url.database,
+        busy_timeout_ms=settings.SQLITE_BUSY_TIMEOUT_MS,
+        single_writer=False,
+    )
+elif async_engine.dialect.name == "postgresql":
+    configure_postgres(async_engine.sync_engine, settings)
+
 
 def get_db():
     db = SessionLocal()
@@ -16,3 +60,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,172 @@
+"""
+SQLite en producción (render.yaml: sqlite:///./data.db con 4 workers de gunicorn).
+
+Con la configuración por defecto (journal en modo DELETE, sin busy_timeout
+útil) una escritura bloquea también a los lectores, y dos escritores a la vez
+acaban en "database is locked". configure_sqlite() deja:
+
+- PRAGMAs en cada conexión (sqlite_pragmas()):
+    journal_mode=WAL        los lectores no esperan a los escritores ni al revés
+    synchronous=NORMAL      con WAL es seguro ante caídas del proceso; solo un
+                            corte de luz puede perder la última transacción
+    busy_timeout            esperar al lock en vez de fallar al momento
+    cache_size / mmap_size  páginas calientes en memoria (mmap: compartida
+                            entre workers a través de la caché del sistema)
+    temp_store=MEMORY, journal_size_limit (el -wal no crece sin límite)
+
+- Un solo escritor a la vez (SQLITE_SINGLE_WRITER): antes de la primera
+  sentencia de escritura de una transacción la conexión coge WriterLock (un
+  lock de hilo + flock sobre <bd>-writer.lock, compartido por los workers) y
+  lo suelta al volver al pool, ya confirmada o deshecha. Los escritores
+  esperan en cola en vez de pelearse por el lock de SQLite a base de
+  reintentos. Las lecturas no pasan por aquí.
+
+pysqlite no abre la transacción (BEGIN) hasta la primera escritura, así que
+al coger el lock justo antes la transacción nunca parte de una lectura vieja
+(lo que en WAL da SQLITE_BUSY sin respetar busy_timeout).
+"""
+import fcntl
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import event
+
+SQLITE_CACHE_KIB = 16 * 1024  # por conexión
+SQLITE_MMAP_BYTES = 256 * 1024 * 1024
+SQLITE_JOURNAL_LIMIT_BYTES = 64 * 1024 * 1024
+WRITE_STATEMENT = re.compile(r"\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|ALTER|DROP)\b", re.IGNORECASE)
+_HOLDS_WRITER = "sqlite_writer_lock"
+
+
+def sqlite_pragmas(busy_timeout_ms: int) -> list:
+    return [
+        "journal_mode=WAL",
+        "synchronous=NORMAL",
+        f"busy_timeout={busy_timeout_ms}",
+        f"cache_size=-{SQLITE_CACHE_KIB}",
+        f"mmap_size={SQLITE_MMAP_BYTES}",
+        "temp_store=MEMORY",
+        f"journal_size_limit={SQLITE_JOURNAL_LIMIT_BYTES}",
+    ]
+
+
+class WriterLock:
+    """
+    Un escritor a la vez entre hilos (threading.Lock) y entre procesos (flock).
+    Se puede soltar desde otro hilo: la sesión de una ruta sync a veces se
+    cierra en un hilo distinto del que escribió.
+    """
+
+    def __init__(self, path: str, timeout_s: float):
+        self.path = path
+        self.timeout_s = timeout_s
+        self._lock = threading.Lock()
+        self._fd = None
+        self._pid = None
+        self._acquired_at = None
+        self.acquired = 0
+        self.contended = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+        self.max_wait_ms = 0.0
+        self.max_held_ms = 0.0
+
+    def _file(self) -> int:
+        # Abierto en cada proceso (gunicorn hace fork después de importar)
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _timeout(self):
+        self.timeouts += 1
+        return sqlite3.OperationalError(f"database is locked (sin turno de escritura en {self.timeout_s:.0f} s)")
+
+    def acquire(self):
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.timeout_s
+        if not self._lock.acquire(blocking=False):
+            self.contended += 1
+            if not self._lock.acquire(timeout=self.timeout_s):
+                raise self._timeout()
+        try:
+            fd = self._file()
+            delay = 0.001
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    # Otro worker está escribiendo
+                    if time.monotonic() > deadline:
+                        raise self._timeout()
+                    time.sleep(delay)
+                    delay = min(delay * 2, 0.005)
+        except BaseException:
+            self._lock.release()
+            raise
+        waited_ms = (time.perf_counter() - started) * 1000
+        self.acquired += 1
+        self.wait_ms_total += waited_ms
+        self.max_wait_ms = max(self.max_wait_ms, waited_ms)
+        self._acquired_at = time.perf_counter()
+
+    def release(self):
+        held_ms = (time.perf_counter() - self._acquired_at) * 1000
+        self.max_held_ms = max(self.max_held_ms, held_ms)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            self._lock.release()
+
+    def stats(self) -> dict:
+        return {
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_ms_total / self.acquired, 3) if self.acquired else None,
+            "max_wait_ms": round(self.max_wait_ms, 3),
+            "max_held_ms": round(self.max_held_ms, 3),
+        }
+
+
+def configure_sqlite(engine, database: str | None, busy_timeout_ms: int, single_writer: bool) -> WriterLock | None:
+    """PRAGMAs y, si single_writer, el WriterLock del archivo. Nada de esto aplica a :memory:."""
+    if not database or database == ":memory:" or database.startswith("file::memory:"):
+        return None
+    pragmas = sqlite_pragmas(busy_timeout_ms)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(f"PRAGMA {pragma}")
+        finally:
+            cursor.close()
+
+    if not single_writer:
+        return None
+    writer = WriterLock(f"{os.path.abspath(database)}-writer.lock", busy_timeout_ms / 1000)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _take_writer_turn(conn, cursor, statement, parameters, context, executemany):
+        if not conn.info.get(_HOLDS_WRITER) and WRITE_STATEMENT.match(statement):
+            writer.acquire()
+            conn.info[_HOLDS_WRITER] = True
+
+    # Al volver al pool la transacción ya está confirmada o deshecha (reset on return)
+    @event.listens_for(engine, "checkin")
+    def _release_writer_turn(dbapi_connection, connection_record):
+        if connection_record is not None and connection_record.info.pop(_HOLDS_WRITER, False):
+            writer.release()
+
+    @event.listens_for(engine, "invalidate")
+    def _release_on_invalidate(dbapi_connection, connection_record, exception):
+        if connection_record is not None and connection_record.info.pop(_HOLDS_WRITER, False):
+            writer.release()
+
+    return writer
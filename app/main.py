@@ -5,6 +5,7 @@ import traceback
 from fastapi.staticfiles import StaticFiles
 
 from app.db.init_db import init_db
+from app.db.session import async_engine
 
 from starlette.middleware.sessions import SessionMiddleware
 from app.core.config import settings
@@ -16,6 +17,15 @@ from app.routes.web import router as web_router
 from app.routes.auth import router as auth_router
 from app.routes.ratings import router as ratings_router
 from app.routes.interests import router as interests_router
+from app.routes.metrics import router as metrics_router
+from app.routes.search import router as search_router
+from app.routes.chat import router as chat_router
+from app.routes.media import router as media_router
+from app.routes.uploads import router as uploads_router
+from app.services.backplane import backplane
+from app.services.chat_history import chat_writer
+from app.services.media_jobs import media_jobs
+from app.services.resumable import resumable_uploads
 
 app = FastAPI(title="Ofrezco", version="0.1.0")
 VERSION = "V5-FULL-RECOVERY-2026-02-01"
@@ -52,12 +62,37 @@ def on_startup():
     print(f"GOOGLE_CLIENT_SECRET presente: {bool(settings.GOOGLE_CLIENT_SECRET)}")
     print(f"SECRET_KEY presente: {bool(settings.SECRET_KEY)}")
     print("---------------------------------------------")
+    if not settings.AUTO_MIGRATE:
+        # Las migraciones ya se aplicaron en el despliegue (python -m app.scripts.migrate)
+        print("DEBUG: AUTO_MIGRATE desactivado, no se migra en el arranque del worker.")
+        return
     try:
         init_db()
         print("DEBUG: Base de datos inicializada correctamente.")
     except Exception as e:
         print(f"ERROR CRÍTICO inicializando DB: {str(e)}")
 
+@app.on_event("startup")
+async def start_background_services():
+    # Reparto de chat / notificaciones / invalidaciones entre workers
+    await backplane.start()
+    # Escritura por lotes del historial del chat
+    await chat_writer.start()
+    # Validación de vídeos fuera de las peticiones (ffprobe en un pool de procesos)
+    await media_jobs.start()
+    # Limpieza de subidas reanudables abandonadas
+    await resumable_uploads.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    await resumable_uploads.stop()
+    await media_jobs.stop()
+    await chat_writer.stop()
+    await backplane.stop()
+    # Cierra las conexiones del engine async dentro del event loop que las abrió
+    await async_engine.dispose()
+
 # Redirigir la raíz directamente a la UI visual
 @app.get("/")
 def root():
@@ -77,5 +112,10 @@ app.include_router(offers_router, prefix="/api/v1", tags=["offers"])
 app.include_router(auth_router, tags=["auth"])
 app.include_router(ratings_router, prefix="/api/v1", tags=["ratings"])
 app.include_router(interests_router, prefix="/api/v1", tags=["interests"])
+app.include_router(metrics_router, prefix="/api/v1", tags=["metrics"])
+app.include_router(search_router, prefix="/api/v1", tags=["search"])
+app.include_router(chat_router, prefix="/api/v1", tags=["chat"])
+app.include_router(media_router, tags=["media"])
+app.include_router(uploads_router, prefix="/api/v1", tags=["uploads"])
 
 app.include_router(web_router)
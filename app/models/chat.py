@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, DateTime, UniqueConstraint
+from datetime import datetime
+
+from app.db.base import Base
+
+
+class Chat(Base):
+    """Conversación entre dos perfiles. profile_a_id < profile_b_id (ver room_key en routes/chat.py)."""
+    __tablename__ = "chats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    profile_a_id = Column(Integer, nullable=False)
+    profile_b_id = Column(Integer, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_message_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("profile_a_id", "profile_b_id", name="uq_chats_room"),
+    )
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
+from datetime import datetime
+
+from app.db.base import Base
+
+
+class Message(Base):
+    __tablename__ = "messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    chat_id = Column(Integer, ForeignKey("chats.id", ondelete="CASCADE"), nullable=False)
+    sender_profile_id = Column(Integer, nullable=False)
+    text = Column(String, nullable=False)
+
+    # Hora a la que llegó al servidor (no la de escritura en BD, que va en lotes)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Historial por sala con keyset (created_at, id)
+        Index("ix_messages_chat_created", "chat_id", "created_at", "id"),
+    )
@@ -24,8 +24,17 @@ class Offer(Base):
     status = Column(String, default="DRAFT", nullable=False)  # DRAFT/PENDING/APPROVED/REJECTED
     video_path = Column(String, nullable=True)
     photo_path = Column(String, nullable=True)
+    photo_variants = Column(JSON, nullable=True)  # Tamaños WebP/JPEG (app/services/images.py)
     extra_info = Column(JSON, nullable=True) # Datos extra (habitaciones, m2, etc.)
 
+    # Procesado del vídeo en segundo plano (app/services/media_jobs.py)
+    media_status = Column(String, nullable=True)  # PENDING/PROCESSING/READY/REJECTED (None = sin vídeo)
+    media_error = Column(String, nullable=True)  # Motivo del rechazo, para el usuario
+    media_info = Column(JSON, nullable=True)  # Metadatos de ffprobe (duración, resolución, códecs)
+    media_updated_at = Column(DateTime, nullable=True)
+    video_renditions = Column(JSON, nullable=True)  # {"720p": url, "480p": url} (MP4 faststart)
+    poster_path = Column(String, nullable=True)  # Fotograma JPEG para <video poster>
+
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
@@ -34,3 +43,6 @@ class Offer(Base):
 
     # ✅ RELACIÓN CON INTERESES
     interests = relationship("Interest", back_populates="offer", cascade="all, delete-orphan")
+
+    # ✅ ATRIBUTOS TIPADOS POR VERTICAL (tablas laterales indexadas)
+    real_estate = relationship("OfferRealEstate", uselist=False, cascade="all, delete-orphan")
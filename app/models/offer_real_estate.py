@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+
+from app.db.base import Base
+
+
+class OfferRealEstate(Base):
+    """
+    Atributos tipados de Inmobiliaria (copiados de Offer.extra_info al guardar)
+    para que los filtros de /ui/results usen índices en vez de recorrer el JSON.
+    """
+    __tablename__ = "offer_real_estate"
+
+    offer_id = Column(Integer, ForeignKey("offers.id", ondelete="CASCADE"), primary_key=True)
+
+    operation_type = Column(String, nullable=True)  # Venta / Alquiler
+    rooms = Column(Integer, nullable=True)
+    sqm = Column(Integer, nullable=True)
+    zone_text = Column(String, nullable=True)  # Normalizado: minúsculas y sin tildes
+
+    __table_args__ = (
+        Index("ix_offer_real_estate_op_rooms", "operation_type", "rooms"),
+        Index("ix_offer_real_estate_sqm", "sqm"),
+        # ix_offer_real_estate_zone (prefijo de zone_text) depende del motor: migración 0010
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, JSON
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -15,6 +15,7 @@ class Profile(Base):
     profile_type = Column(String, nullable=False)
     description = Column(String, nullable=True)
     photo = Column(String, nullable=True) # Foto de perfil (avatar)
+    photo_variants = Column(JSON, nullable=True) # Tamaños WebP/JPEG del avatar (app/services/images.py)
     phone = Column(String, nullable=True) # Teléfono para WhatsApp
     video_url = Column(String, nullable=True)
     available_now = Column(Boolean, default=False)
@@ -24,6 +25,20 @@ class Profile(Base):
     lon = Column(String, nullable=True)
     address = Column(String, nullable=True)
 
+    # Índice espacial (se rellena desde lat/lon, ver app/services/geo.py)
+    geo_lat = Column(Float, nullable=True)
+    geo_lon = Column(Float, nullable=True)
+    geo_cell = Column(Integer, nullable=True)
+
+    # Agregados de valoraciones (se actualizan en create_rating, ver app/services/ratings.py)
+    rating_count = Column(Integer, default=0, nullable=False)
+    rating_sum = Column(Integer, default=0, nullable=False)
+    rating_1 = Column(Integer, default=0, nullable=False)
+    rating_2 = Column(Integer, default=0, nullable=False)
+    rating_3 = Column(Integer, default=0, nullable=False)
+    rating_4 = Column(Integer, default=0, nullable=False)
+    rating_5 = Column(Integer, default=0, nullable=False)
+
     # ✅ RELACIÓN CON OFERTAS
     offers = relationship(
         "Offer",
@@ -37,3 +52,14 @@ class Profile(Base):
         back_populates="profile",
         cascade="all, delete-orphan"
     )
+
+    @property
+    def rating(self):
+        """Media de valoraciones (None si no tiene ninguna)."""
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 1)
+
+    @property
+    def rating_histogram(self):
+        return {score: getattr(self, f"rating_{score}") or 0 for score in range(1, 6)}
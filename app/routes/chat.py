@@ -1,14 +1,38 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
-from typing import Dict, Set, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect, Query, status
+from sqlalchemy.orm import Session
+from typing import Dict, Optional, Set, Tuple
 import json
 import time
 
+from app.db.session import get_db
+from app.services.backplane import backplane
+from app.services.chat_connections import ChatConnection, chat_metrics
+from app.services.chat_history import HISTORY_PAGE_SIZE, chat_writer, fetch_history
+
 router = APIRouter()
 
 def room_key(a: int, b: int) -> Tuple[int, int]:
     return (a, b) if a < b else (b, a)
 
-rooms: Dict[Tuple[int, int], Set[WebSocket]] = {}
+rooms: Dict[Tuple[int, int], Set[ChatConnection]] = {}
+
+
+def is_session_profile(session: dict, me: int) -> bool:
+    # `me` viene del cliente: solo vale si es el perfil de la sesión (login)
+    return session.get("profile_id") is not None and session.get("profile_id") == me
+
+
+def broadcast_local(key: Tuple[int, int], payload: str):
+    # Solo los sockets de este worker (el resto lo reparte el backplane).
+    # Encola en cada conexión y vuelve: un cliente lento no frena a los demás.
+    for conn in list(rooms.get(key, ())):
+        conn.offer(payload)
+
+
+async def _on_backplane_message(data: dict):
+    broadcast_local(tuple(data["room"]), data["payload"])
+
+backplane.subscribe("chat", _on_backplane_message)
 
 @router.websocket("/ws/chat")
 async def ws_chat(
@@ -16,11 +40,16 @@ async def ws_chat(
     me: int = Query(...),
     other: int = Query(...),
 ):
+    if not is_session_profile(websocket.session, me):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
     await websocket.accept()
     key = room_key(me, other)
-    rooms.setdefault(key, set()).add(websocket)
+    conn = ChatConnection(websocket, key)
+    conn.start()
+    rooms.setdefault(key, set()).add(conn)
 
-    await websocket.send_text(json.dumps({
+    conn.offer(json.dumps({
         "type": "system",
         "text": "Conectado al chat",
         "ts": time.time(),
@@ -38,23 +67,58 @@ async def ws_chat(
             if not text:
                 continue
 
+            ts = time.time()
             payload = json.dumps({
                 "type": "message",
                 "from": me,
                 "to": other,
                 "text": text,
-                "ts": time.time(),
+                "ts": ts,
             })
 
-            for ws in list(rooms.get(key, set())):
-                try:
-                    await ws.send_text(payload)
-                except Exception:
-                    pass
+            broadcast_local(key, payload)
+            await backplane.publish("chat", {"room": list(key), "payload": payload})
+            # Se guarda en segundo plano (por lotes), sin esperar a la BD
+            chat_writer.enqueue(key, me, text, ts)
 
-    except WebSocketDisconnect:
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: lo hemos cerrado nosotros por lento (ver ChatConnection)
         pass
     finally:
-        rooms.get(key, set()).discard(websocket)
+        await conn.stop()
+        rooms.get(key, set()).discard(conn)
         if key in rooms and not rooms[key]:
             rooms.pop(key, None)
+            chat_metrics.forget(key)
+
+
+@router.get("/chat/history")
+def chat_history(
+    request: Request,
+    me: int,
+    other: int,
+    before: Optional[str] = None,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=200),
+    db: Session = Depends(get_db),
+):
+    """Mensajes de la sala (me, other), más antiguos primero. `before` = next_cursor de la página anterior."""
+    if not is_session_profile(request.session, me):
+        raise HTTPException(status_code=403, detail="Solo puedes leer tus propias conversaciones")
+    try:
+        rows, next_cursor = fetch_history(db, room_key(me, other), before=before, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    return {
+        "messages": [
+            {
+                "type": "message",
+                "id": row.id,
+                "from": row.sender_profile_id,
+                "text": row.text,
+                "ts": row.created_at.isoformat(),
+            }
+            for row in reversed(rows)
+        ],
+        "next_cursor": next_cursor,
+    }
@@ -1,16 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func
+from sqlalchemy import select, func, case
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from app.db.session import get_db
+from app.core.cache import interest_high_water
+from app.db.session import get_async_db, get_db
 from app.models.offer import Offer
 from app.models.interest import Interest
 from app.models.user import User
+from app.models.profile import Profile
+from app.services.backplane import backplane
+from app.services.notifications import interest_hub
 
 router = APIRouter()
 
+# Comentario SSE cada N segundos para que proxies / Render no corten la conexión
+SSE_KEEPALIVE_S = 25
+
+
+def _notify_owner(owner_id: int, event: dict):
+    interest_high_water.raise_to(owner_id, event["last_id"], only_if_present=True)
+    interest_hub.publish(owner_id, event)
+
+
+async def _on_backplane_interest(data: dict):
+    # Interés creado en otro worker
+    _notify_owner(data["user_id"], data["event"])
+
+backplane.subscribe("interest", _on_backplane_interest)
+
 class InterestCreate(BaseModel):
     offer_id: int
 
@@ -33,79 +57,132 @@ def create_interest(payload: InterestCreate, request: Request, db: Session = Dep
     db.add(interest)
     db.commit()
     db.refresh(interest)
+
+    # Push al dueño de la oferta (este worker + el resto vía backplane)
+    owner_id = db.execute(select(Profile.user_id).where(Profile.id == offer.profile_id)).scalar()
+    if owner_id:
+        event = {
+            "has_new": True,
+            "last_id": interest.id,
+            "count": 1,
+            "offer_id": offer.id,
+            "offer_title": offer.title,
+        }
+        _notify_owner(owner_id, event)
+        backplane.publish_threadsafe("interest", {"user_id": owner_id, "event": event})
     
     return {"status": "ok", "msg": "Interés registrado", "id": interest.id}
 
+MY_OFFERS_MAX_LIMIT = 200
+
+
 @router.get("/interests/my-offers")
-def get_my_offers_interests(request: Request, db: Session = Depends(get_db)):
-    # Devuelve intereses sobre mis ofertas
+def get_my_offers_interests(
+    request: Request,
+    sort: Literal["count", "recent"] = "count",
+    limit: int = Query(50, ge=1, le=MY_OFFERS_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Intereses sobre mis ofertas (solo las que tienen alguno), en una sola consulta agrupada.
+    - sort=count: más interesados primero
+    - sort=recent: interés más reciente primero
+    """
     user_id = request.session.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="No autenticado")
-        
-    # Buscar ofertas mías que tengan intereses
-    # Hacemos una query manual
-    # Select offers where profile.user_id == user_id
-    # Join interest
-    
-    from app.models.profile import Profile
-    
-    # Obtener mi perfil
-    profile = db.execute(select(Profile).where(Profile.user_id == user_id)).scalar_one_or_none()
-    if not profile:
-        return []
 
-    # Obtener ofertas de mi perfil
-    offers = db.execute(select(Offer).where(Offer.profile_id == profile.id)).scalars().all()
-    
-    result = []
-    for o in offers:
-        # Contar intereses
-        count = db.execute(select(func.count(Interest.id)).where(Interest.offer_id == o.id)).scalar()
-        if count > 0:
-            result.append({
-                "offer_title": o.title,
-                "offer_id": o.id,
-                "interested_count": count
-            })
-            
-    return result
+    interested_count = func.count(Interest.id).label("interested_count")
+    latest_interest_id = func.max(Interest.id).label("latest_interest_id")
+    order = (interested_count.desc(), Offer.id.desc()) if sort == "count" else (latest_interest_id.desc(),)
+
+    rows = db.execute(
+        select(Offer.id, Offer.title, interested_count, latest_interest_id)
+        .join(Interest, Interest.offer_id == Offer.id)
+        .join(Profile, Profile.id == Offer.profile_id)
+        .where(Profile.user_id == user_id)
+        .group_by(Offer.id, Offer.title)
+        .order_by(*order)
+        .limit(limit)
+        .offset(offset)
+    ).all()
+
+    return [
+        {
+            "offer_title": row.title,
+            "offer_id": row.id,
+            "interested_count": row.interested_count,
+            "latest_interest_id": row.latest_interest_id,
+        }
+        for row in rows
+    ]
 
 @router.get("/interests/poll")
-def poll_interests(last_id: int, request: Request, db: Session = Depends(get_db)):
+async def poll_interests(last_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Endpoint para long-polling (simulado).
     Comprueba si hay nuevos intereses creados después de 'last_id' para las ofertas del usuario.
+    async: el caso sin novedades se responde en el event loop sin hilo ni conexión.
     """
     user_id = request.session.get("user_id")
     if not user_id:
         return {"has_new": False}
 
-    from app.models.profile import Profile
-    
-    # Mi perfil y mis ofertas
-    profile = db.execute(select(Profile).where(Profile.user_id == user_id)).scalar_one_or_none()
-    if not profile:
+    # Caso habitual: nada nuevo desde last_id -> se responde sin tocar la BD
+    latest_id = interest_high_water.get(user_id)
+    if latest_id is not None and latest_id <= last_id:
         return {"has_new": False}
-        
-    my_offers_ids = db.execute(select(Offer.id).where(Offer.profile_id == profile.id)).scalars().all()
-    
-    if not my_offers_ids:
-         return {"has_new": False}
-
-    # Buscar intereses nuevos en mis ofertas
-    new_interests = db.execute(
-        select(Interest)
-        .where(Interest.offer_id.in_(my_offers_ids))
-        .where(Interest.id > last_id)
-        .order_by(Interest.id.desc())
-    ).scalars().all()
-    
-    if new_interests:
+
+    # Una sola consulta: último id de mis ofertas y cuántos hay por encima de last_id
+    latest_id, new_count = (await db.execute(
+        select(
+            func.max(Interest.id),
+            func.count(case((Interest.id > last_id, Interest.id))),
+        )
+        .join(Offer, Offer.id == Interest.offer_id)
+        .join(Profile, Profile.id == Offer.profile_id)
+        .where(Profile.user_id == user_id)
+    )).one()
+    interest_high_water.raise_to(user_id, latest_id or 0)
+
+    if new_count:
         return {
-            "has_new": True, 
-            "last_id": new_interests[0].id, # El ID más alto encontrado
-            "count": len(new_interests)
+            "has_new": True,
+            "last_id": latest_id, # El ID más alto encontrado
+            "count": new_count
         }
     
     return {"has_new": False}
+
+
+@router.get("/interests/stream")
+async def stream_interests(request: Request):
+    """
+    Server-Sent Events: un evento `interest` por cada interés nuevo en mis ofertas.
+    No toca la BD mientras está abierto; el cliente hace un poll al (re)conectar
+    para recuperar lo que se perdiera estando desconectado.
+    """
+    user_id = request.session.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="No autenticado")
+
+    async def event_stream():
+        queue = interest_hub.subscribe(user_id)
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"id: {event['last_id']}\nevent: interest\ndata: {json.dumps(event)}\n\n"
+        finally:
+            interest_hub.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,149 @@
+"""
+/media/<archivo>: lo que suben los usuarios (vídeos, fotos, versiones web, pósters).
+
+Los nombres llevan el hash del contenido (ver app/services/uploads.py): la URL
+de un archivo nunca cambia de contenido, así que se sirve con caché immutable
+de un año. Además:
+- ETag fuerte (tamaño + mtime) y 304 con If-None-Match,
+- Range / 206 (y 416) para que <video> pueda saltar sin descargar el archivo
+  entero; Safari no reproduce vídeo si el servidor no acepta Range,
+- HEAD.
+StaticFiles (Starlette 0.38) no soporta Range, por eso no se usa aquí.
+
+Con STORAGE=local también recibe las subidas directas: PUT /media/<clave> con la
+URL firmada de LocalStorage.presign_put() (mismo protocolo que con S3). Con
+STORAGE=s3 los archivos nuevos se sirven desde el bucket; aquí quedan los antiguos.
+"""
+import mimetypes
+import os
+import re
+import stat
+from email.utils import formatdate
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.services.storage import IMMUTABLE_CACHE, LocalStorage, storage
+from app.services.uploads import CONTENT_HASH_CHARS, UPLOADS_DIR, discard_upload, receive_body
+
+router = APIRouter()
+
+MEDIA_CHUNK_SIZE = 256 * 1024
+# Sin barras ni "..": solo archivos de UPLOADS_DIR
+SAFE_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]*")
+# <nombre>_<hash>[_<variante>].<ext>; lo demás (subidas antiguas) se revalida siempre
+CONTENT_ADDRESSED = re.compile(rf"_[0-9a-f]{{{CONTENT_HASH_CHARS}}}(_[a-z0-9]+)?\.[a-z0-9]+")
+RANGE = re.compile(r"\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*")
+
+# La tabla de mimetypes depende del sistema (/etc/mime.types); fijamos las de los formatos que aceptamos
+for _type, _ext in (("video/webm", ".webm"), ("video/3gpp", ".3gp"), ("video/quicktime", ".mov"), ("image/webp", ".webp")):
+    mimetypes.add_type(_type, _ext)
+
+
+def parse_range(header: str, size: int):
+    """
+    Un solo rango 'bytes=a-b' / 'bytes=a-' / 'bytes=-n' -> (inicio, fin) inclusivos.
+    None si no se puede satisfacer (416). False si no se entiende o son varios
+    rangos: se ignora y se envía el archivo completo (lo que permite el RFC 9110).
+    """
+    m = RANGE.fullmatch(header)
+    if not m or not (m[1] or m[2]):
+        return False
+    if m[1]:
+        start = int(m[1])
+        end = int(m[2]) if m[2] else size - 1
+        if m[2] and end < start:
+            return False
+        if start >= size:
+            return None
+        return start, min(end, size - 1)
+    suffix = int(m[2])
+    if suffix == 0 or size == 0:
+        return None
+    return max(0, size - suffix), size - 1
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _read_range(path: str, start: int, end: int):
+    # Generador síncrono: StreamingResponse lo recorre en el threadpool
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(MEDIA_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@router.api_route("/media/{name}", methods=["GET", "HEAD"])
+def media(name: str, request: Request):
+    if not SAFE_NAME.fullmatch(name):
+        raise HTTPException(status_code=404, detail="Archivo no encontrado.")
+    path = os.path.join(UPLOADS_DIR, name)
+    try:
+        st = os.stat(path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado.")
+    if not stat.S_ISREG(st.st_mode):
+        raise HTTPException(status_code=404, detail="Archivo no encontrado.")
+
+    size = st.st_size
+    etag = f'"{size:x}-{st.st_mtime_ns:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": IMMUTABLE_CACHE if CONTENT_ADDRESSED.search(name) else "no-cache",
+    }
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    status_code = 200
+    start, end = 0, size - 1
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # If-Range con otro ETag (o con fecha): el archivo puede haber cambiado, se envía entero
+    if range_header and (if_range is None or if_range.strip() == etag):
+        byte_range = parse_range(range_header, size)
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    headers["Content-Length"] = str(end - start + 1)
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(
+        _read_range(path, start, end), status_code=status_code, headers=headers, media_type=media_type,
+    )
+
+
+@router.put("/media/{name}", include_in_schema=False)
+async def media_put(name: str, request: Request, expires: int, size: int, signature: str):
+    if not isinstance(storage, LocalStorage) or not SAFE_NAME.fullmatch(name):
+        raise HTTPException(status_code=404, detail="Archivo no encontrado.")
+    if not storage.verify_put(name, request.headers.get("content-type", ""), size, expires, signature):
+        raise HTTPException(status_code=403, detail="Firma no válida o caducada.")
+    # Las claves no se reutilizan: un archivo publicado no cambia nunca (caché immutable)
+    if storage.size(name) is not None:
+        raise HTTPException(status_code=409, detail="El archivo ya existe.")
+
+    upload = await receive_body(request, size)
+    if upload.size != size:
+        discard_upload(upload.path)
+        raise HTTPException(status_code=400, detail="El tamaño no coincide con el declarado.")
+    await run_in_threadpool(storage.put_file, upload.path, name)
+    return Response(status_code=200, headers={"ETag": f'"{upload.sha256}"'})
@@ -0,0 +1,38 @@
+from fastapi import APIRouter
+
+from app.core.cache import interest_high_water, results_page_cache
+from app.db.pool import pool_stats
+from app.db.session import async_engine, engine, sqlite_writer
+from app.routes.chat import rooms as chat_rooms
+from app.services.backplane import backplane
+from app.services.chat_connections import chat_metrics
+from app.services.chat_history import chat_writer
+from app.services.media_jobs import media_jobs
+from app.services.notifications import interest_hub
+from app.services.resumable import resumable_uploads
+from app.services.storage import storage
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def metrics():
+    # Contadores de este worker (cada proceso de gunicorn tiene los suyos).
+    # async: se lee en el event loop, donde viven las salas del chat
+    data = {
+        "results_cache": results_page_cache.stats(),
+        "interest_stream": interest_hub.stats(),
+        "interest_high_water": interest_high_water.stats(),
+        "backplane": backplane.stats(),
+        "chat_writer": chat_writer.stats(),
+        "chat_delivery": chat_metrics.snapshot(chat_rooms),
+        "media_jobs": media_jobs.stats(),
+        "storage": storage.stats(),
+        "resumable_uploads": resumable_uploads.stats(),
+    }
+    if engine.dialect.name == "postgresql":
+        data["db_pool"] = pool_stats(engine)
+        data["db_pool_async"] = pool_stats(async_engine.sync_engine)
+    if sqlite_writer:
+        data["sqlite_writer"] = sqlite_writer.stats()
+    return data
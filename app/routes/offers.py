@@ -1,13 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+import os
+import shutil
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-import os
-import subprocess
 
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from app.models.profile import Profile
 from app.models.offer import Offer
 from app.schemas.offer import OfferCreate, OfferOut, OfferStatusUpdate
+from app.schemas.upload import DirectUploadConfirm, DirectUploadCreate, DirectUploadOut
+from app.services.search_index import index_offer, unindex_offer
+from app.services.offer_attributes import sync_offer_attributes
+from app.services.offers import invalidate_results_cache
+from app.services.media_jobs import PENDING, PROCESSING, REJECTED, mark_pending, media_jobs
+from app.services.video import max_video_seconds
+from app.services.images import pillow_available
+from app.services.resumable import take_upload
+from app.services.storage import PRESIGN_EXPIRES_S, StorageError, storage
+from app.services.uploads import (
+    MB, UPLOAD_OPENAPI, check_direct_upload, discard_files, max_upload_bytes, new_upload_key, new_work_dir,
+    photo_files, receive_upload, store_photo_file, store_photo_upload, store_upload,
+)
 
 router = APIRouter()
 
@@ -35,7 +52,11 @@ def create_offer(payload: OfferCreate, db: Session = Depends(get_db)):
         )
 
         db.add(offer)
+        db.flush()
+        index_offer(db, offer)
+        sync_offer_attributes(db, offer)
         db.commit()
+        invalidate_results_cache(offer.category)
         db.refresh(offer)
         print(f"DEBUG: Oferta creada con éxito: {offer.id}")
         return offer
@@ -53,6 +74,7 @@ def update_offer(offer_id: int, payload: OfferCreate, db: Session = Depends(get_
     if not offer:
         raise HTTPException(status_code=404, detail="Offer no encontrada.")
 
+    previous_category = offer.category
     try:
         offer.offer_kind = payload.offer_kind
         offer.category = payload.category
@@ -68,7 +90,10 @@ def update_offer(offer_id: int, payload: OfferCreate, db: Session = Depends(get_
         if payload.status:
             offer.status = payload.status
 
+        index_offer(db, offer)
+        sync_offer_attributes(db, offer)
         db.commit()
+        invalidate_results_cache(previous_category, offer.category)
         db.refresh(offer)
         print(f"DEBUG: Oferta actualizada con éxito: {offer.id}")
         return offer
@@ -84,19 +109,29 @@ def submit_for_review(offer_id: int, db: Session = Depends(get_db)):
     if not offer:
         raise HTTPException(status_code=404, detail="Offer no encontrada.")
 
-    limit = 180.0 if "Inmobiliaria" in (offer.category or "") else 15.0
+    # El vídeo ya se validó en segundo plano (app/services/media_jobs.py): solo se mira el estado
+    if offer.media_status == REJECTED and not offer.video_path:
+        raise HTTPException(status_code=400, detail=offer.media_error or "El vídeo no es válido. Sube otro.")
+
+    limit = max_video_seconds(offer.category)
     if not offer.video_path:
         raise HTTPException(status_code=400, detail=f"Para enviar a revisión necesitas subir un vídeo (máx {int(limit/60) if limit >= 60 else int(limit)} {'min' if limit >= 60 else 's'}).")
 
+    if offer.media_status in (PENDING, PROCESSING):
+        # 409: el cliente reintenta en unos segundos
+        raise HTTPException(status_code=409, detail="El vídeo aún se está procesando. Inténtalo en unos segundos.")
+
     offer.status = "PUBLISHED" # Auto-publicar para demo (saltar revisión)
     db.commit()
+    invalidate_results_cache(offer.category)
     db.refresh(offer)
     return offer
 
 
+# async + get_async_db: lectura caliente, no ocupa un hilo del threadpool
 @router.get("/offers", response_model=list[OfferOut])
-def list_offers(
-    db: Session = Depends(get_db),
+async def list_offers(
+    db: AsyncSession = Depends(get_async_db),
     profile_id: int | None = None,
     offer_kind: str | None = None,
     available_now: bool | None = None,
@@ -121,7 +156,7 @@ def list_offers(
         q = q.where(Offer.available_now == available_now)
 
     q = q.limit(limit).offset(offset)
-    return db.execute(q).scalars().all()
+    return (await db.execute(q)).scalars().all()
 
 
 @router.get("/offers/pending", response_model=list[OfferOut])
@@ -144,24 +179,40 @@ def update_offer_status(offer_id: int, payload: OfferStatusUpdate, db: Session =
 
     offer.status = payload.status
     db.commit()
+    invalidate_results_cache(offer.category)
     db.refresh(offer)
     return offer
 
 
-@router.post("/offers/{offer_id}/video", response_model=OfferOut)
-def upload_offer_video(
-    offer_id: int,
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-):
+def _get_offer(db: Session, offer_id: int) -> Offer:
     offer = db.execute(select(Offer).where(Offer.id == offer_id)).scalar_one_or_none()
     if not offer:
         raise HTTPException(status_code=404, detail="Offer no encontrada.")
+    return offer
 
-    # ✅ Aceptar content-types con codecs (ej. "video/webm;codecs=vp8,opus")
+
+def _video_files(offer: Offer) -> list:
+    """URLs del vídeo y de todo lo generado a partir de él (versiones web, póster)."""
+    return [offer.video_path, offer.poster_path, *(offer.video_renditions or {}).values()]
+
+
+def _save_offer_video(db: Session, offer: Offer, video_path: str) -> Offer:
+    mark_pending(offer)
+    return _save_offer_media(db, offer, video_path=video_path)
+
+
+def _save_offer_media(db: Session, offer: Offer, **paths) -> Offer:
+    for attr, value in paths.items():
+        setattr(offer, attr, value)
+    db.commit()
+    invalidate_results_cache(offer.category)
+    db.refresh(offer)
+    return offer
+
+
+def _video_extension(filename: str) -> str:
     # ✅ Lógica relajada para mayor compatibilidad (Android/iOS)
-    ct = (file.content_type or "").lower()
-    name = (file.filename or "").lower()
+    name = (filename or "").lower()
     
     ext = ".mp4" # Default
     if name.endswith(".webm"): ext = ".webm"
@@ -169,94 +220,132 @@ def upload_offer_video(
     elif name.endswith(".3gp"): ext = ".3gp"
     elif name.endswith(".mkv"): ext = ".mkv"
     elif name.endswith(".avi"): ext = ".avi"
-    
-    # Si no tiene extensión conocida pero es video, lo guardamos tal cual (o como mp4)
-    if not ct.startswith("video/") and not ext:
-         raise HTTPException(
-            status_code=400,
-            detail=f"Formato no permitido (content_type={file.content_type})."
-        )
+    return ext
 
-    uploads_dir = "app/static/uploads"
-    os.makedirs(uploads_dir, exist_ok=True)
 
-    filename = f"offer_{offer_id}_video{ext}"
-    save_path = os.path.join(uploads_dir, filename)
+def _photo_extension(filename: str) -> str:
+    # Validar extensión de imagen
+    name = (filename or "").lower()
+    ext = ".jpg"
+    if name.endswith(".png"): ext = ".png"
+    elif name.endswith(".jpeg"): ext = ".jpeg"
+    elif name.endswith(".webp"): ext = ".webp"
+    return ext
 
-    data = file.file.read()
-    if not data:
-        raise HTTPException(status_code=400, detail="Archivo vacío.")
 
-    with open(save_path, "wb") as f:
-        f.write(data)
+async def _replace_offer_video(db: Session, offer: Offer, video_path: str) -> Offer:
+    previous = _video_files(offer)
+    # Se responde ya con media_status=PENDING; duración y metadatos los valida media_jobs
+    offer = await run_in_threadpool(_save_offer_video, db, offer, video_path)
+    await run_in_threadpool(discard_files, *previous, keep=(video_path,))
+    media_jobs.submit(offer.id)
+    return offer
 
-    # Duración <= 15s (si ffprobe existe). Si falla ffprobe, NO bloqueamos (demo).
-    try:
-        result = subprocess.run(
-            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-             "-of", "default=noprint_wrappers=1:nokey=1", save_path],
-            capture_output=True,
-            text=True,
-            check=True,
-        )
-        duration = float((result.stdout or "").strip() or "0")
-        
-        limit = 180.0 if "Inmobiliaria" in (offer.category or "") else 15.0
-        
-        if duration > limit:
-            os.remove(save_path)
-            msg = f"Vídeo demasiado largo ({duration:.1f}s). Máximo 15s."
-            if limit > 15:
-                msg = f"Vídeo demasiado largo ({duration:.1f}s). Máximo {int(limit/60)} minutos para Inmobiliaria."
-            raise HTTPException(status_code=400, detail=msg)
-    except FileNotFoundError:
-        pass
-    except HTTPException:
-        raise
-    except Exception:
-        # No bloqueamos por validación en demo
-        pass
-
-    offer.video_path = f"/static/uploads/{filename}"
-    db.commit()
-    db.refresh(offer)
+
+async def _replace_offer_photo(db: Session, offer: Offer, photo_path: str, variants: dict | None) -> Offer:
+    previous = photo_files(offer.photo_path, offer.photo_variants)
+    offer = await run_in_threadpool(_save_offer_media, db, offer, photo_path=photo_path, photo_variants=variants)
+    await run_in_threadpool(discard_files, *previous, keep=photo_files(photo_path, variants))
     return offer
 
 
-@router.post("/offers/{offer_id}/photo", response_model=OfferOut)
-def upload_offer_photo(
+# async: el cuerpo se lee en streaming (app/services/uploads.py); la BD va al threadpool
+@router.post("/offers/{offer_id}/video", response_model=OfferOut, openapi_extra=UPLOAD_OPENAPI)
+async def upload_offer_video(
     offer_id: int,
-    file: UploadFile = File(...),
+    request: Request,
+    response: Response,
+    upload_id: str | None = None,
     db: Session = Depends(get_db),
 ):
-    offer = db.execute(select(Offer).where(Offer.id == offer_id)).scalar_one_or_none()
-    if not offer:
-        raise HTTPException(status_code=404, detail="Offer no encontrada.")
+    offer = await run_in_threadpool(_get_offer, db, offer_id)
+    max_bytes = max_upload_bytes("video", offer.category)
+    if upload_id:
+        # Subida reanudable ya completa (/api/v1/uploads, app/services/resumable.py)
+        upload = await run_in_threadpool(take_upload, upload_id, max_bytes, request.session.get("profile_id"))
+    else:
+        upload = await receive_upload(request, max_bytes)
 
-    # Validar extensión de imagen
-    name = (file.filename or "").lower()
-    ext = ".jpg"
-    if name.endswith(".png"): ext = ".png"
-    elif name.endswith(".jpeg"): ext = ".jpeg"
-    elif name.endswith(".webp"): ext = ".webp"
+    # ✅ Aceptar content-types con codecs (ej. "video/webm;codecs=vp8,opus")
+    ext = _video_extension(upload.filename)
+    video_path = await run_in_threadpool(store_upload, upload, f"offer_{offer_id}_video", ext)
+    offer = await _replace_offer_video(db, offer, video_path)
 
-    uploads_dir = "app/static/uploads"
-    os.makedirs(uploads_dir, exist_ok=True)
+    response.headers["X-Upload-SHA256"] = upload.sha256
+    return offer
 
-    filename = f"offer_{offer_id}_photo{ext}"
-    save_path = os.path.join(uploads_dir, filename)
 
-    data = file.file.read()
-    if not data:
-        raise HTTPException(status_code=400, detail="Archivo vacío.")
+@router.post("/offers/{offer_id}/photo", response_model=OfferOut, openapi_extra=UPLOAD_OPENAPI)
+async def upload_offer_photo(
+    offer_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    offer = await run_in_threadpool(_get_offer, db, offer_id)
+    upload = await receive_upload(request, max_upload_bytes("photo"))
 
-    with open(save_path, "wb") as f:
-        f.write(data)
+    # Tamaños WebP/JPEG sin EXIF (app/services/images.py); photo_path = el JPEG "full"
+    ext = _photo_extension(upload.filename)
+    photo_path, variants = await run_in_threadpool(store_photo_upload, upload, f"offer_{offer_id}_photo", ext)
+
+    response.headers["X-Upload-SHA256"] = upload.sha256
+    return await _replace_offer_photo(db, offer, photo_path, variants)
+
+
+# Subida directa: el archivo va del navegador al almacenamiento (S3) sin pasar por
+# los workers. presign -> PUT a la URL firmada -> confirm con la clave.
+@router.post("/offers/{offer_id}/{kind}/presign", response_model=DirectUploadOut)
+def presign_offer_upload(
+    offer_id: int,
+    kind: Literal["video", "photo"],
+    payload: DirectUploadCreate,
+    db: Session = Depends(get_db),
+):
+    offer = _get_offer(db, offer_id)
+    max_bytes = max_upload_bytes(kind, offer.category)
+    if payload.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Archivo demasiado grande. Máximo {max_bytes // MB} MB.")
+
+    ext = _video_extension(payload.filename) if kind == "video" else _photo_extension(payload.filename)
+    key = new_upload_key(f"offer_{offer_id}_{kind}", ext)
+    signed = storage.presign_put(key, payload.content_type, payload.size)
+    return {**signed, "key": key, "expires_in": PRESIGN_EXPIRES_S}
+
+
+@router.post("/offers/{offer_id}/video/confirm", response_model=OfferOut)
+async def confirm_offer_video(offer_id: int, payload: DirectUploadConfirm, db: Session = Depends(get_db)):
+    offer = await run_in_threadpool(_get_offer, db, offer_id)
+    await run_in_threadpool(
+        check_direct_upload, payload.key, f"offer_{offer_id}_video", max_upload_bytes("video", offer.category),
+    )
+    return await _replace_offer_video(db, offer, storage.url(payload.key))
+
+
+def _photo_from_storage(key: str) -> tuple:
+    # La foto subida es el original de la cámara (con EXIF): se bajan una vez,
+    # se generan los tamaños y el original se borra del almacenamiento
+    if not pillow_available():
+        return storage.url(key), None
+    work_dir = new_work_dir()
+    path = os.path.join(work_dir, key)
+    try:
+        storage.fetch(key, path)
+        return store_photo_file(path, os.path.splitext(key)[0])
+    except StorageError as e:
+        print(f"DEBUG: storage, error leyendo {key}: {e}")
+        raise HTTPException(status_code=502, detail="No se pudo leer el archivo subido.")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        discard_files(storage.url(key))
 
-    offer.photo_path = f"/static/uploads/{filename}"
-    db.commit()
-    db.refresh(offer)
-    return offer
+
+@router.post("/offers/{offer_id}/photo/confirm", response_model=OfferOut)
+async def confirm_offer_photo(offer_id: int, payload: DirectUploadConfirm, db: Session = Depends(get_db)):
+    offer = await run_in_threadpool(_get_offer, db, offer_id)
+    await run_in_threadpool(check_direct_upload, payload.key, f"offer_{offer_id}_photo", max_upload_bytes("photo"))
+    photo_path, variants = await run_in_threadpool(_photo_from_storage, payload.key)
+    return await _replace_offer_photo(db, offer, photo_path, variants)
 
 
 @router.delete("/offers/{offer_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -265,14 +354,12 @@ def delete_offer(offer_id: int, db: Session = Depends(get_db)):
     if not offer:
         raise HTTPException(status_code=404, detail="Offer no encontrada.")
     
-    # Borrar archivos si existen
-    for p in [offer.video_path, offer.photo_path]:
-        if p:
-            file_path = "app" + p
-            if os.path.exists(file_path):
-                try: os.remove(file_path)
-                except: pass
-
+    files = [*_video_files(offer), *photo_files(offer.photo_path, offer.photo_variants)]
+    category = offer.category
+    unindex_offer(db, offer.id)
     db.delete(offer)
     db.commit()
+    invalidate_results_cache(category)
+    # Borrar archivos (después del commit: si falla, la oferta sigue con sus archivos)
+    discard_files(*files)
     return None
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-import os
 import subprocess
 
 from app.db.session import get_db
 from app.models.profile import Profile
 from app.models.product import Product
+from app.services.resumable import take_upload
+from app.services.uploads import UPLOAD_OPENAPI, discard_files, max_upload_bytes, receive_upload, store_upload
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -49,35 +51,49 @@ def create_product(payload: ProductCreate, db: Session = Depends(get_db)):
     return product
 
 
-@router.post("/products/{product_id}/video", response_model=ProductOut)
-def upload_product_video(
-    product_id: int,
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-):
+def _get_product(db: Session, product_id: int) -> Product:
     product = db.execute(select(Product).where(Product.id == product_id)).scalar_one_or_none()
     if not product:
         raise HTTPException(status_code=404, detail="Producto no encontrado.")
+    return product
 
-    ct = (file.content_type or "").lower()
-    ext = ".mp4" # Simplify for now or reuse logic
-    if "webm" in ct: ext = ".webm"
-    
-    uploads_dir = "app/static/uploads"
-    os.makedirs(uploads_dir, exist_ok=True)
-    filename = f"prod_{product_id}{ext}"
-    save_path = os.path.join(uploads_dir, filename)
-
-    data = file.file.read()
-    with open(save_path, "wb") as f:
-        f.write(data)
 
-    product.video_path = f"/static/uploads/{filename}"
+def _save_product_video(db: Session, product: Product, video_path: str) -> Product:
+    product.video_path = video_path
     db.commit()
     db.refresh(product)
     return product
 
 
+@router.post("/products/{product_id}/video", response_model=ProductOut, openapi_extra=UPLOAD_OPENAPI)
+async def upload_product_video(
+    product_id: int,
+    request: Request,
+    response: Response,
+    upload_id: str | None = None,
+    db: Session = Depends(get_db),
+):
+    product = await run_in_threadpool(_get_product, db, product_id)
+    if upload_id:
+        # Subida reanudable ya completa (/api/v1/uploads)
+        upload = await run_in_threadpool(
+            take_upload, upload_id, max_upload_bytes("video"), request.session.get("profile_id"),
+        )
+    else:
+        upload = await receive_upload(request, max_upload_bytes("video"))
+
+    ext = ".mp4" # Simplify for now or reuse logic
+    if "webm" in upload.content_type: ext = ".webm"
+    
+    video_path = await run_in_threadpool(store_upload, upload, f"prod_{product_id}", ext)
+    previous = product.video_path
+
+    response.headers["X-Upload-SHA256"] = upload.sha256
+    product = await run_in_threadpool(_save_product_video, db, product, video_path)
+    await run_in_threadpool(discard_files, previous, keep=(video_path,))
+    return product
+
+
 @router.post("/products/{product_id}/submit", response_model=ProductOut)
 def submit_product(product_id: int, db: Session = Depends(get_db)):
     product = db.execute(select(Product).where(Product.id == product_id)).scalar_one_or_none()
@@ -64,66 +64,70 @@ def get_profile(profile_id: int, db: Session = Depends(get_db)):
     return profile
 
 
-from fastapi import UploadFile, File
-import os
-import shutil
+from starlette.concurrency import run_in_threadpool
 
-@router.post("/profiles/{profile_id}/photo")
-def upload_profile_photo(profile_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
+from app.services.uploads import (
+    UPLOAD_OPENAPI, discard_files, discard_upload, max_upload_bytes, photo_files, receive_upload,
+    store_photo_upload, store_upload,
+)
+
+
+def _get_profile(db: Session, profile_id: int) -> Profile:
     profile = db.get(Profile, profile_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile no encontrado")
+    return profile
+
+
+def _save_profile_field(db: Session, profile: Profile, attr: str, value: str, **extra):
+    setattr(profile, attr, value)
+    for extra_attr, extra_value in extra.items():
+        setattr(profile, extra_attr, extra_value)
+    db.commit()
+
+
+@router.post("/profiles/{profile_id}/photo", openapi_extra=UPLOAD_OPENAPI)
+async def upload_profile_photo(profile_id: int, request: Request, db: Session = Depends(get_db)):
+    profile = await run_in_threadpool(_get_profile, db, profile_id)
+    upload = await receive_upload(request, max_upload_bytes("photo"))
 
-    # Guardar en static/uploads
-    upload_dir = "app/static/uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    
     # Extension
     ext = ".jpg"
-    if "png" in file.content_type: ext = ".png"
-    elif "jpeg" in file.content_type: ext = ".jpg"
-    
-    filename = f"profile_avatar_{profile_id}{ext}"
-    file_location = f"{upload_dir}/{filename}"
+    if "png" in upload.content_type: ext = ".png"
+    elif "jpeg" in upload.content_type: ext = ".jpg"
     
-    with open(file_location, "wb+") as file_object:
-        shutil.copyfileobj(file.file, file_object)
-        
-    # Actualizar DB
-    profile.photo = f"/static/uploads/{filename}"
-    db.commit()
-    
-    return {"status": "ok", "photo_url": profile.photo}
+    # Tamaños WebP/JPEG sin EXIF; se decodifica una vez aquí, no en cada vista
+    photo_url, variants = await run_in_threadpool(store_photo_upload, upload, f"profile_avatar_{profile_id}", ext)
+    previous = photo_files(profile.photo, profile.photo_variants)
 
-@router.post("/profiles/{profile_id}/video_upload")
-def upload_profile_video_file(profile_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
-    profile = db.get(Profile, profile_id)
-    if not profile:
-        raise HTTPException(status_code=404, detail="Profile no encontrado")
+    # Actualizar DB (y borrar la foto anterior: cada versión tiene su propia URL)
+    await run_in_threadpool(_save_profile_field, db, profile, "photo", photo_url, photo_variants=variants)
+    await run_in_threadpool(discard_files, *previous, keep=photo_files(photo_url, variants))
+
+    return {"status": "ok", "photo_url": photo_url, "photo_variants": variants, "sha256": upload.sha256}
+
+@router.post("/profiles/{profile_id}/video_upload", openapi_extra=UPLOAD_OPENAPI)
+async def upload_profile_video_file(profile_id: int, request: Request, db: Session = Depends(get_db)):
+    profile = await run_in_threadpool(_get_profile, db, profile_id)
+    upload = await receive_upload(request, max_upload_bytes("video"))
 
-    # Guardar en static/uploads
-    upload_dir = "app/static/uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    
     # Extension permitida
-    if not file.content_type.startswith("video/"):
+    if not upload.content_type.startswith("video/"):
+        discard_upload(upload.path)
         raise HTTPException(status_code=400, detail="El archivo debe ser un video")
         
     ext = ".mp4" # Forzar mp4 o detectar extension
-    if "webm" in file.content_type: ext = ".webm"
-    elif "quicktime" in file.content_type: ext = ".mov"
-    
-    filename = f"profile_video_{profile_id}{ext}"
-    file_location = f"{upload_dir}/{filename}"
+    if "webm" in upload.content_type: ext = ".webm"
+    elif "quicktime" in upload.content_type: ext = ".mov"
     
-    with open(file_location, "wb+") as file_object:
-        shutil.copyfileobj(file.file, file_object)
-        
+    video_url = await run_in_threadpool(store_upload, upload, f"profile_video_{profile_id}", ext)
+    previous = profile.video_url
+
     # Actualizar DB
-    profile.video_url = f"/static/uploads/{filename}"
-    db.commit()
+    await run_in_threadpool(_save_profile_field, db, profile, "video_url", video_url)
+    await run_in_threadpool(discard_files, previous, keep=(video_url,))
     
-    return {"status": "ok", "video_url": profile.video_url}
+    return {"status": "ok", "video_url": video_url, "sha256": upload.sha256}
 
 
 from pydantic import BaseModel
@@ -155,6 +159,7 @@ def update_profile_phone(profile_id: int, payload: ProfileUpdatePhone, db: Sessi
     return {"status": "ok", "phone": profile.phone}
 
 from app.schemas.profile import ProfileUpdateLocation, ProfileUpdateVideo
+from app.services.geo import set_profile_geo
 
 @router.put("/profiles/{profile_id}/video")
 def update_profile_video(profile_id: int, payload: ProfileUpdateVideo, db: Session = Depends(get_db)):
@@ -175,5 +180,6 @@ def update_profile_location(profile_id: int, payload: ProfileUpdateLocation, db:
     profile.lat = payload.lat
     profile.lon = payload.lon
     profile.address = payload.address
+    set_profile_geo(profile)  # Mantener el índice espacial al día
     db.commit()
     return {"status": "ok", "location": profile.address}
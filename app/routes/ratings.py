@@ -1,14 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func
-from pydantic import BaseModel
+from sqlalchemy import select
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from app.models.rating import Rating
 from app.models.profile import Profile
 from app.models.user import User
+from app.services.ratings import apply_rating
 
 router = APIRouter()
 
@@ -16,7 +18,7 @@ router = APIRouter()
 class RatingCreate(BaseModel):
     profile_id: int
     author_id: int # Quien escribe
-    score: int
+    score: int = Field(ge=1, le=5)
     comment: Optional[str] = None
 
 class RatingOut(BaseModel):
@@ -55,6 +57,8 @@ def create_rating(payload: RatingCreate, db: Session = Depends(get_db)):
         comment=payload.comment
     )
     db.add(rating)
+    # 5. Agregados del perfil en la misma transacción (UPDATE atómico)
+    apply_rating(db, payload.profile_id, payload.score)
     db.commit()
     db.refresh(rating)
     
@@ -70,11 +74,11 @@ def create_rating(payload: RatingCreate, db: Session = Depends(get_db)):
     )
 
 @router.get("/profiles/{profile_id}/ratings", response_model=List[RatingOut])
-def list_profile_ratings(profile_id: int, db: Session = Depends(get_db)):
+async def list_profile_ratings(profile_id: int, db: AsyncSession = Depends(get_async_db)):
     # Obtener ratings con autor
     # SQLAlchemy join
     stmt = select(Rating, User).join(User, Rating.author_id == User.id).where(Rating.profile_id == profile_id).order_by(Rating.created_at.desc())
-    results = db.execute(stmt).all()
+    results = (await db.execute(stmt)).all()
     
     out = []
     for r, u in results:
@@ -91,11 +95,13 @@ def list_profile_ratings(profile_id: int, db: Session = Depends(get_db)):
 
 @router.get("/profiles/{profile_id}/stats")
 def get_profile_stats(profile_id: int, db: Session = Depends(get_db)):
-    # Calcular media y total
-    stmt = select(func.count(Rating.id), func.avg(Rating.score)).where(Rating.profile_id == profile_id)
-    count, avg = db.execute(stmt).one()
+    # Agregados precalculados en el perfil (O(1), sin recorrer ratings)
+    profile = db.get(Profile, profile_id)
+    if not profile:
+        return {"count": 0, "average": 0.0, "histogram": {}}
     
     return {
-        "count": count or 0,
-        "average": round(avg, 1) if avg else 0.0
+        "count": profile.rating_count or 0,
+        "average": profile.rating or 0.0,
+        "histogram": profile.rating_histogram,
     }
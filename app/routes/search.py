@@ -1,45 +1,41 @@
-import math
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import text, select
 
 from app.db.session import get_db
 from app.models.profile import Profile
+from app.models.user import User
 from app.models.category import Category
 from app.schemas.search import SearchRequest, SearchResponse, SearchProfileOut
+from app.services.geo import haversine_km_many, nearest_k, bounding_box, cells_for_bbox
 
 router = APIRouter()
 
 
-def haversine_km(lat1, lon1, lat2, lon2) -> float:
-    R = 6371.0
-    p1 = math.radians(lat1)
-    p2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dl = math.radians(lon2 - lon1)
-
-    a = math.sin(dphi / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
-
-
 @router.post("/search", response_model=SearchResponse)
 def search(payload: SearchRequest, db: Session = Depends(get_db)):
-    # 1) Cargamos perfiles PRO/AMBOS con ubicación
-    q = select(Profile).where(Profile.lat.isnot(None)).where(Profile.lon.isnot(None))
-
-    # PRO/AMBOS (si tu campo se llama distinto, dime)
+    # 1) Prefiltro espacial en SQL: celdas de la rejilla + bounding box del radio
+    min_lat, max_lat, min_lon, max_lon = bounding_box(payload.lat, payload.lon, payload.radius_km)
+
+    q = (
+        select(Profile, User.name)
+        .outerjoin(User, User.id == Profile.user_id)
+        .where(Profile.geo_lat.between(min_lat, max_lat))
+        .where(Profile.geo_lon.between(min_lon, max_lon))
+    )
+    cells = cells_for_bbox(min_lat, max_lat, min_lon, max_lon)
+    if cells is not None:
+        q = q.where(Profile.geo_cell.in_(cells))
+
+    # PRO/AMBOS (y PROFESIONAL, que es el valor que guarda el alta de perfiles)
     if hasattr(Profile, "profile_type"):
-        q = q.where(Profile.profile_type.in_(["PRO", "AMBOS"]))
+        q = q.where(Profile.profile_type.in_(["PRO", "AMBOS", "PROFESIONAL"]))
 
     # disponibilidad opcional
     if payload.available_now is not None and hasattr(Profile, "available_now"):
         q = q.where(Profile.available_now == payload.available_now)
 
-    profiles = db.execute(q).scalars().all()
-
-    # 2) Si viene category_id, filtramos con SQL directo (sin ORM relationships)
-    allowed_profile_ids = None
+    # 2) Si viene category_id, filtramos en la misma consulta (sin ORM relationships)
     category_name = None
 
     if payload.category_id is not None:
@@ -48,35 +44,33 @@ def search(payload: SearchRequest, db: Session = Depends(get_db)):
             raise HTTPException(status_code=400, detail="category_id no existe")
         category_name = cat.name
 
-        rows = db.execute(
-            text("SELECT profile_id FROM profile_categories WHERE category_id = :cid"),
-            {"cid": payload.category_id},
-        ).all()
-        allowed_profile_ids = {r[0] for r in rows}
-
-    # 3) Distancia + radio
-    tmp = []
-    for p in profiles:
-        if allowed_profile_ids is not None and p.id not in allowed_profile_ids:
-            continue
+        in_category = text("SELECT profile_id FROM profile_categories WHERE category_id = :cid").bindparams(
+            cid=payload.category_id
+        ).columns(profile_id=Profile.id.type)
+        q = q.where(Profile.id.in_(in_category))
 
-        d = haversine_km(payload.lat, payload.lon, p.lat, p.lon)
-        if d <= payload.radius_km:
-            tmp.append((p, d))
+    candidates = db.execute(q).all()
 
-    tmp.sort(key=lambda x: x[1])
+    # 3) Distancia exacta + radio + top 50, vectorizado sobre los candidatos cercanos
+    distances = haversine_km_many(
+        payload.lat, payload.lon,
+        [p.geo_lat for p, _ in candidates],
+        [p.geo_lon for p, _ in candidates],
+    )
+    nearest = nearest_k(distances, k=50, max_km=payload.radius_km)
 
     results = []
-    for p, d in tmp[:50]:
+    for i in nearest:
+        p, owner_name = candidates[i]
         results.append(
             SearchProfileOut(
                 profile_id=p.id,
-                display_name=p.display_name or f"Profile #{p.id}",
-                avatar_url=getattr(p, "avatar_url", None),
+                display_name=owner_name or f"Profile #{p.id}",
+                avatar_url=p.photo,
                 verified=bool(getattr(p, "verified", False)),
                 rating=getattr(p, "rating", None),
                 available_now=bool(getattr(p, "available_now", False)),
-                distance_km=round(d, 2),
+                distance_km=round(float(distances[i]), 2),
                 primary_category=category_name,
             )
         )
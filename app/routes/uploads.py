@@ -0,0 +1,88 @@
+"""
+/api/v1/uploads: subidas reanudables (tus 1.0), ver app/services/resumable.py.
+Al terminar, el cliente entrega la subida con POST /offers/{id}/video?upload_id=<id>.
+"""
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+
+from app.services.resumable import (
+    RESUMABLE_MAX_BYTES, TUS_EXTENSIONS, TUS_VERSION, append_chunk, create_upload, discard_resumable,
+    expires_header, parse_metadata, upload_status,
+)
+from app.services.uploads import too_large
+
+router = APIRouter()
+
+
+def _session_profile(request: Request) -> int:
+    # Las subidas son del perfil en sesión: sin él no se reserva disco
+    profile_id = request.session.get("profile_id")
+    if not profile_id:
+        raise HTTPException(status_code=401, detail="No autenticado")
+    return profile_id
+
+
+def _tus_headers(upload: dict | None = None, **extra) -> dict:
+    headers = {"Tus-Resumable": TUS_VERSION, "Cache-Control": "no-store", **extra}
+    if upload:
+        headers["Upload-Offset"] = str(upload["offset"])
+        headers["Upload-Length"] = str(upload["length"])
+        headers["Upload-Expires"] = expires_header(upload["expires_at"])
+    return headers
+
+
+@router.options("/uploads")
+def resumable_options():
+    return Response(status_code=204, headers=_tus_headers(**{
+        "Tus-Version": TUS_VERSION,
+        "Tus-Extension": TUS_EXTENSIONS,
+        "Tus-Max-Size": str(RESUMABLE_MAX_BYTES),
+    }))
+
+
+@router.post("/uploads", status_code=201)
+def create_resumable_upload(
+    request: Request,
+    upload_length: int | None = Header(None),
+    upload_metadata: str | None = Header(None),
+):
+    profile_id = _session_profile(request)
+    # Sin Upload-Defer-Length: el tamaño se sabe siempre (es un File del navegador)
+    if upload_length is None or upload_length <= 0:
+        raise HTTPException(status_code=400, detail="Falta Upload-Length.")
+    if upload_length > RESUMABLE_MAX_BYTES:
+        raise too_large(RESUMABLE_MAX_BYTES)
+    upload = create_upload(upload_length, parse_metadata(upload_metadata), profile_id)
+    location = f"{request.url.path.rstrip('/')}/{upload['id']}"
+    return Response(status_code=201, headers=_tus_headers(upload, Location=location))
+
+
+@router.head("/uploads/{upload_id}")
+def resumable_upload_offset(upload_id: str, request: Request):
+    upload = upload_status(upload_id, _session_profile(request))
+    return Response(status_code=200, headers=_tus_headers(upload))
+
+
+# async: el cuerpo se escribe en streaming, como receive_upload()
+@router.patch("/uploads/{upload_id}")
+async def resumable_upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int | None = Header(None),
+    content_type: str | None = Header(None),
+):
+    profile_id = _session_profile(request)
+    if content_type != "application/offset+octet-stream":
+        raise HTTPException(status_code=415, detail="Se esperaba application/offset+octet-stream.")
+    if upload_offset is None or upload_offset < 0:
+        raise HTTPException(status_code=400, detail="Falta Upload-Offset.")
+    upload = await append_chunk(upload_id, upload_offset, request, profile_id)
+    headers = _tus_headers(upload)
+    del headers["Upload-Length"]
+    return Response(status_code=204, headers=headers)
+
+
+@router.delete("/uploads/{upload_id}", status_code=204)
+def delete_resumable_upload(upload_id: str, request: Request):
+    upload_status(upload_id, _session_profile(request))  # 404 si no existe, 403 si es de otro
+    discard_resumable(upload_id)
+    return Response(status_code=204, headers=_tus_headers())
@@ -1,14 +1,24 @@
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from app.models.offer import Offer
+from app.models.offer_real_estate import OfferRealEstate
 from app.models.profile import Profile
 from app.models.user import User
 from app.core.data import CATEGORIES, get_flattened_categories, get_sales_categories
+from app.core.cache import results_page_cache
+from app.services.offers import (
+    published_offers_query, offer_card, fetch_keyset_page, results_cache_key, results_cache_tags,
+    with_distances,
+)
+from app.services.geo import parse_coord
+from app.services.images import srcset
+from app.services.search_index import text_search_subquery, fold_accents
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
@@ -23,6 +33,22 @@ def format_price(value):
         return value
 
 templates.env.filters["format_price"] = format_price
+templates.env.filters["srcset"] = srcset
+
+async def user_origin(request: Request, db: AsyncSession, lat: str = "", lon: str = ""):
+    """(lat, lon) desde los parámetros o, si no vienen, desde el perfil en sesión."""
+    origin = (parse_coord(lat), parse_coord(lon))
+    if None not in origin:
+        return origin
+
+    profile_id = request.session.get("profile_id")
+    if profile_id:
+        row = (await db.execute(
+            select(Profile.geo_lat, Profile.geo_lon).where(Profile.id == profile_id)
+        )).first()
+        if row and row.geo_lat is not None and row.geo_lon is not None:
+            return (row.geo_lat, row.geo_lon)
+    return None
 
 def get_user_context(request: Request):
     return {
@@ -78,8 +104,9 @@ def ui_need_new(request: Request):
 # -------------------------
 # RESULTADOS (búsqueda)
 # -------------------------
+# Lecturas calientes (resultados, feed): async + get_async_db, sin hilo del threadpool
 @router.get("/ui/results", response_class=HTMLResponse)
-def ui_results(
+async def ui_results(
     request: Request,
     q: str = "",
     cat: str = "",
@@ -91,8 +118,32 @@ def ui_results(
     min_price: str = "",    # Filtro precio mín
     max_price: str = "",    # Filtro precio máx
     zone: str = "",         # Filtro zona (texto)
-    db: Session = Depends(get_db)  # Inyección de DB
+    lat: str = "",          # Origen para distancias (si no, la ubicación de mi perfil)
+    lon: str = "",
+    db: AsyncSession = Depends(get_async_db)  # Inyección de DB
 ):
+    # Origen de las distancias: de la URL o, si no viene, la ubicación del perfil en
+    # sesión (una lectura por clave primaria). Redondeado (~100 m) entra en la clave
+    # de caché: los visitantes cerca del mismo sitio comparten página, y si el perfil
+    # cambia de ubicación cambia la clave (no quedan distancias viejas)
+    origin = await user_origin(request, db, lat, lon)
+    if origin:
+        origin = (round(origin[0], 3), round(origin[1], 3))
+
+    # 0. Caché del HTML renderizado (se invalida al escribir ofertas en offers.py)
+    cache_key = results_cache_key(
+        q=q, cat=cat, mode=mode, op=op, rooms=rooms, sqm=sqm,
+        min_price=min_price, max_price=max_price, zone=zone,
+        origin=origin,
+    )
+    cached = results_page_cache.get(cache_key)
+    if cached is not None:
+        return HTMLResponse(cached, headers={"X-Cache": "HIT"})
+    # Generación de las etiquetas antes de leer: si una escritura invalida la
+    # caché mientras se renderiza, esta página ya es vieja y no se guarda
+    cache_tags = results_cache_tags(cat)
+    cache_version = results_page_cache.version(cache_tags)
+
     sales_cats = get_sales_categories()
 
     # 1. Determinar si es búsqueda de productos (Mercadillo, Inmo, Motor)
@@ -112,21 +163,25 @@ def ui_results(
         view_mode = "list"
 
     # Siempre usamos el modelo Offer en esta versión del proyecto
-    query = select(Offer).where(Offer.status == "PUBLISHED").order_by(Offer.id.desc())
+    query = published_offers_query()
 
     # 2. Lógica de filtrado estricto
     if cat == "Inmobiliaria (Pisos/Locales)":
         query = query.where(Offer.category == "Inmobiliaria (Pisos/Locales)")
-        # Filtros Premium de Inmobiliaria
+        # Filtros Premium de Inmobiliaria (columnas indexadas de offer_real_estate)
+        if op or rooms or sqm or zone:
+            query = query.join(OfferRealEstate, OfferRealEstate.offer_id == Offer.id)
         if op:
-            query = query.where(Offer.extra_info["operation_type"].as_string() == op)
+            query = query.where(OfferRealEstate.operation_type == op)
         if rooms:
-            query = query.where(Offer.extra_info["rooms"].as_integer() >= int(rooms))
+            query = query.where(OfferRealEstate.rooms >= int(rooms))
         if sqm:
-            query = query.where(Offer.extra_info["sqm"].as_integer() >= int(sqm))
+            query = query.where(OfferRealEstate.sqm >= int(sqm))
         if zone:
-            # Búsqueda parcial de texto en la zona
-            query = query.where(Offer.extra_info["zone_text"].as_string().ilike(f"%{zone}%"))
+            # Zona que empieza por el texto (guardada sin tildes y en minúsculas). Prefijo y
+            # no '%texto%': así usa ix_offer_real_estate_zone (migración 0010)
+            prefix = fold_accents(zone).strip().replace("/", "//").replace("%", "/%").replace("_", "/_")
+            query = query.where(OfferRealEstate.zone_text.like(f"{prefix}%", escape="/"))
 
     elif cat == "Vehículos y Motor":
         query = query.where(Offer.category == "Vehículos y Motor")
@@ -143,7 +198,13 @@ def ui_results(
         query = query.where(Offer.category == cat)
     
     if q:
-        query = query.where(Offer.title.contains(q))
+        # Índice de texto completo (título + descripción), ordenado por relevancia
+        fts = text_search_subquery(db, q)
+        if fts is not None:
+            query = query.join(fts, fts.c.offer_id == Offer.id).order_by(None).order_by(fts.c.score, Offer.id.desc())
+        else:
+            # Solo stopwords ("de la"): sin términos para el índice, filtro LIKE sobre el título
+            query = query.where(Offer.title.contains(q))
 
     # Filtros de precio (globales para cualquier categoría)
     if min_price:
@@ -151,31 +212,15 @@ def ui_results(
     if max_price:
         query = query.where(Offer.price <= float(max_price))
 
-    items = db.execute(query).scalars().all()
-    results = []
+    # Una sola consulta (oferta + nombre + teléfono + ubicación del dueño)
+    rows = (await db.execute(query)).all()
+    results = [offer_card(row) for row in rows]
 
-    for o in items:
-        prof = db.get(Profile, o.profile_id)
-        u = db.get(User, prof.user_id) if prof else None
-        
-        results.append({
-            "id": o.profile_id,
-            "title": o.title,
-            "role": o.title, # Retrocompatibilidad con la card de listado
-            "name": u.name if u else "Usuario",
-            "category": o.category,
-            "offer_cat": o.category, # Retrocompatibilidad
-            "price": o.price or 0,
-            "video": o.video_path or "", # Path al video
-            "photo": o.photo_path or "https://via.placeholder.com/56", 
-            "distance_km": 1.2,
-            "status": "Disponible" if o.available_now else "Consultar",
-            "desc": o.description or "",
-            "phone": prof.phone or "",
-            "extra": o.extra_info or {}
-        })
+    # Distancias reales (vectorizadas) y orden por cercanía si sabemos dónde está el usuario
+    if origin:
+        results = with_distances(rows, results, *origin)
 
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "ui_results.html",
         {
             "request": request,
@@ -188,22 +233,22 @@ def ui_results(
             "q": q, "cat": cat,
             "view_mode": view_mode,
             "op": op, "rooms": rooms, "sqm": sqm,
-            "min_price": min_price, "max_price": max_price, "zone": zone
+            "min_price": min_price, "max_price": max_price, "zone": zone,
+            "lat": lat, "lon": lon,
         },
     )
+    results_page_cache.set(cache_key, response.body, tags=cache_tags, version=cache_version)
+    response.headers["X-Cache"] = "MISS"
+    return response
 
-@router.get("/ui/feed", response_class=HTMLResponse)
-def ui_feed(
-    request: Request,
-    cat: str = "",
-    q: str = "",
-    start_id: int = None,
-    db: Session = Depends(get_db)
-):
-    from app.core.data import get_sales_categories
+# Nº de ofertas por ventana del feed (cada una lleva un <video>)
+FEED_PAGE_SIZE = 6
+
+
+def feed_query(db: AsyncSession, cat: str = "", q: str = ""):
     sales_cats = get_sales_categories()
 
-    query = select(Offer).where(Offer.status == "PUBLISHED").order_by(Offer.id.desc())
+    query = published_offers_query()
     
     # Filtrado similar a ui_results pero enfocado a productos/motor/inmo
     if cat == "Inmobiliaria (Pisos/Locales)":
@@ -217,54 +262,87 @@ def ui_feed(
          query = query.where(Offer.category == cat)
     
     if q:
-        query = query.where(Offer.title.contains(q))
+        # Texto completo, pero mantenemos el orden por id para poder paginar por cursor
+        fts = text_search_subquery(db, q)
+        if fts is not None:
+            query = query.join(fts, fts.c.offer_id == Offer.id)
+        else:
+            query = query.where(Offer.title.contains(q))
 
-    items = db.execute(query).scalars().all()
-    results = []
+    return query
 
-    for o in items:
-        prof = db.get(Profile, o.profile_id)
-        u = db.get(User, prof.user_id) if prof else None
-        
-        results.append({
-            "id": o.profile_id,
-            "title": o.title,
-            "name": u.name if u else "Usuario",
-            "category": o.category,
-            "price": o.price or 0,
-            "video": o.video_path or "",
-            "photo": o.photo_path or "https://via.placeholder.com/56", 
-            "desc": o.description or "",
-            "phone": prof.phone or "",
-            "extra": o.extra_info or {}
-        })
+
+@router.get("/ui/feed", response_class=HTMLResponse)
+async def ui_feed(
+    request: Request,
+    cat: str = "",
+    q: str = "",
+    start_id: int = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Primera ventana (keyset): empieza en start_id si viene, si no en la más reciente
+    # run_sync: fetch_keyset_page (sync) sobre el driver async, sin hilo
+    rows, next_cursor = await db.run_sync(
+        fetch_keyset_page, feed_query(db, cat, q), FEED_PAGE_SIZE, start_id=start_id
+    )
+    results = [offer_card(row) for row in rows]
 
     return templates.TemplateResponse(
         "ui_item_feed.html",
         {
             "request": request,
             "items": results,
+            "next_cursor": next_cursor,
+            "first_page": True,
             "back_url": f"/ui/results?cat={cat}&q={q}" if cat or q else "/ui"
         }
     )
 
 
+@router.get("/ui/feed/items", response_class=HTMLResponse)
+async def ui_feed_items(
+    request: Request,
+    cursor: int,
+    cat: str = "",
+    q: str = "",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Fragmento HTML con la siguiente ventana del feed (scroll infinito)."""
+    rows, next_cursor = await db.run_sync(
+        fetch_keyset_page, feed_query(db, cat, q), FEED_PAGE_SIZE, before_id=cursor
+    )
+    results = [offer_card(row) for row in rows]
+
+    response = templates.TemplateResponse(
+        "ui_item_feed_items.html",
+        {
+            "request": request,
+            "items": results,
+            "next_cursor": next_cursor,
+        }
+    )
+    response.headers["X-Next-Cursor"] = str(next_cursor or "")
+    return response
+
+
 # -------------------------
 # PERFIL
 # -------------------------
 @router.get("/ui/profile/{profile_id}", response_class=HTMLResponse)
 def ui_profile(request: Request, profile_id: int, db: Session = Depends(get_db)):
-    # 1. Obtener perfil
-    prof = db.get(Profile, profile_id)
-    if not prof:
+    # 1. Obtener perfil + nombre del usuario asociado en una sola consulta
+    row = db.execute(
+        select(Profile, User.name)
+        .outerjoin(User, User.id == Profile.user_id)
+        .where(Profile.id == profile_id)
+    ).first()
+    if not row:
         return HTMLResponse("<h1>404 - Perfil no encontrado</h1>", status_code=404)
+    prof, owner_name = row
     
-    # 2. Obtener usuario asociado
-    user_owner = db.get(User, prof.user_id)
-    
-    # 3. Obtener ofertas del perfil
-    offers_q = select(Offer).where(Offer.profile_id == profile_id).where(Offer.status == "PUBLISHED").order_by(Offer.id.desc())
-    offers = db.execute(offers_q).scalars().all()
+    # 2. Obtener ofertas del perfil (misma consulta compartida que resultados/feed)
+    offers_q = published_offers_query().where(Offer.profile_id == profile_id)
+    offers = db.execute(offers_q).all()
 
     # Prepara datos para la vista
     profile_data = {
@@ -272,10 +350,13 @@ def ui_profile(request: Request, profile_id: int, db: Session = Depends(get_db))
         "type": prof.profile_type,
         "desc": prof.description,
         "available": prof.available_now,
-        "user_name": user_owner.name if user_owner else "Usuario",
+        "user_name": owner_name or "Usuario",
         "user_photo": prof.photo if prof.photo else "https://via.placeholder.com/80", # Ahora leemos de la DB
         "photo": prof.photo, # Raw photo path
-        "phone": prof.phone or ""
+        "photo_variants": prof.photo_variants or {},
+        "phone": prof.phone or "",
+        "rating": prof.rating,
+        "rating_count": prof.rating_count or 0,
     }
 
     return templates.TemplateResponse(
@@ -343,6 +424,19 @@ def ui_offer_new(request: Request, type: str = ""):
 
 
 
+# -------------------------
+# CHAT
+# -------------------------
+@router.get("/ui/chat/{other_profile_id}", response_class=HTMLResponse)
+def ui_chat(request: Request, other_profile_id: int):
+    return templates.TemplateResponse("ui_chat.html", {
+        "request": request,
+        "title": "Chat",
+        "user": get_user_context(request),
+        "other_profile_id": other_profile_id,
+    })
+
+
 # -------------------------
 # WIZARD NUEVA OFERTA (4 pasos)
 # -------------------------
@@ -14,6 +14,7 @@ class OfferCreate(BaseModel):
     available_now: bool = False
     allergens: Optional[str] = None
     extra_info: Optional[Dict[str, Any]] = None
+    status: Optional[str] = None  # Solo lo usa update_offer (DRAFT, PUBLISHED, RESERVADO, VENDIDO)
 
 
 class OfferStatusUpdate(BaseModel):
@@ -34,7 +35,13 @@ class OfferOut(BaseModel):
     status: str
     video_path: Optional[str] = None
     photo_path: Optional[str] = None
+    photo_variants: Optional[Dict[str, Any]] = None
     extra_info: Optional[Dict[str, Any]] = None
+    media_status: Optional[str] = None  # PENDING/PROCESSING/READY/REJECTED
+    media_error: Optional[str] = None
+    media_info: Optional[Dict[str, Any]] = None
+    video_renditions: Optional[Dict[str, str]] = None
+    poster_path: Optional[str] = None
 
     # ✅ campos obligatorios en respuesta
     created_at: datetime
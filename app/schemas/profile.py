@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Literal
+from typing import Optional, Literal, Dict, Any
 
 
 ProfileType = Literal["PROFESIONAL", "COMUNITARIO"]
@@ -28,6 +28,7 @@ class ProfileOut(BaseModel):
     address: Optional[str] = None
     phone: Optional[str] = None
     photo: Optional[str] = None
+    photo_variants: Optional[Dict[str, Any]] = None
 
     class Config:
         from_attributes = True
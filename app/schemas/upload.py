@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from typing import Dict
+
+
+# Subida directa al almacenamiento (app/services/storage.py): presign -> PUT -> confirm
+class DirectUploadCreate(BaseModel):
+    filename: str
+    content_type: str = Field(min_length=1, max_length=100)
+    size: int = Field(gt=0)
+
+
+class DirectUploadOut(BaseModel):
+    key: str
+    url: str
+    method: str
+    headers: Dict[str, str]
+    expires_in: int
+
+
+class DirectUploadConfirm(BaseModel):
+    key: str
@@ -0,0 +1,94 @@
+"""
+Carga concurrente sobre las lecturas calientes para comparar la ruta sync
+(def + Session: un hilo del threadpool por petición, 40 por worker) con la
+async (async def + AsyncSession: sin hilo mientras espera a la BD).
+
+    python -m app.scripts.async_db_bench http://127.0.0.1:8000
+    python -m app.scripts.async_db_bench http://127.0.0.1:8000 10,40,100,200 2000
+
+Argumentos: URL del servidor, niveles de concurrencia (clientes a la vez) y
+peticiones por nivel. Para el "antes", arrancar el servidor con el commit
+anterior (rutas sync) y lanzar lo mismo; con SQLite local las consultas tardan
+microsegundos y el límite de hilos apenas se nota: donde se ve es con la BD en
+otra máquina (Postgres gestionado, PgBouncer), donde cada consulta espera la red.
+Con RESULTS_CACHE_TTL=0 en el servidor /ui/results mide la consulta y no la caché.
+
+Por cada nivel: peticiones/s, latencias p50 / p95 / p99 y errores; al final,
+las métricas del pool (/api/v1/metrics -> db_pool, db_pool_async) si es Postgres.
+"""
+import asyncio
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+# Rutas portadas a get_async_db (rotan en ese orden)
+HOT_PATHS = [
+    "/api/v1/offers?limit=20",
+    "/ui/results?cat=Todas",
+    "/ui/feed",
+    "/api/v1/profiles/1/ratings",
+    "/api/v1/interests/poll?last_id=0",
+]
+DEFAULT_LEVELS = [10, 40, 100, 200]
+DEFAULT_REQUESTS = 1000
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, total: int) -> dict:
+    latencies = []
+    errors = Counter()  # código HTTP o tipo de excepción -> nº
+    next_request = 0
+
+    async def worker():
+        nonlocal next_request
+        while next_request < total:
+            path = HOT_PATHS[next_request % len(HOT_PATHS)]
+            next_request += 1
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code >= 500:
+                    errors[response.status_code] += 1
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95)],
+        "p99": latencies[int(len(latencies) * 0.99)],
+        "errors": errors,
+    }
+
+
+async def main(base_url: str, levels: list, total: int):
+    # keepalive_expiry < 5 s (keep-alive de uvicorn): no reutilizar conexiones que el servidor ya cerró
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels), keepalive_expiry=2)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        # Calentar: conexiones del pool, plantillas, caché de la página de resultados
+        for path in HOT_PATHS:
+            await client.get(path)
+        for concurrency in levels:
+            r = await run_level(client, concurrency, total)
+            print(
+                f"concurrencia {concurrency:>4}  {r['rps']:8,.0f} req/s  "
+                f"p50 {r['p50']:7.1f} ms  p95 {r['p95']:7.1f} ms  p99 {r['p99']:7.1f} ms  "
+                f"errores {sum(r['errors'].values())} {dict(r['errors']) or ''}"
+            )
+        metrics = (await client.get("/api/v1/metrics")).json()
+    for name in ("db_pool", "db_pool_async"):
+        if name in metrics:
+            print(f"{name}: {metrics[name]}")
+
+
+if __name__ == "__main__":
+    url = sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:8000"
+    levels = [int(n) for n in sys.argv[2].split(",")] if len(sys.argv) > 2 else DEFAULT_LEVELS
+    total = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_REQUESTS
+    asyncio.run(main(url, levels, total))
@@ -0,0 +1,133 @@
+"""
+Mide la latencia de entrega del backplane entre dos "workers" (dos instancias en
+este proceso, cada una con su origen).
+
+    python -m app.scripts.backplane_bench                    # unix + redis de pega en local
+    python -m app.scripts.backplane_bench redis://host:6379  # contra un Redis real
+
+Sin URL de Redis se levanta RespStandIn: un servidor mínimo que entiende
+PUBLISH / SUBSCRIBE / PING / AUTH / SELECT del protocolo RESP, suficiente para
+probar RedisBackplane sin instalar Redis.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from app.services.backplane import RedisBackplane, UnixSocketBackplane, resp_encode, resp_read
+
+PING_MESSAGES = 200  # uno a uno: latencia sin cola
+FLOOD_MESSAGES = 5000  # de golpe: rendimiento
+
+
+class RespStandIn:
+    def __init__(self):
+        self.channels = {}  # canal -> set(writer)
+        self.writers = set()
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=0) -> int:
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        for writer in self.writers:
+            writer.close()
+
+    async def _handle(self, reader, writer):
+        self.writers.add(writer)
+        try:
+            while True:
+                command = await resp_read(reader)
+                name = command[0].decode().upper()
+                if name == "SUBSCRIBE":
+                    for i, channel in enumerate(command[1:], start=1):
+                        self.channels.setdefault(channel, set()).add(writer)
+                        # ["subscribe", canal, nº de suscripciones]
+                        writer.write(b"*3\r\n$9\r\nsubscribe\r\n$%d\r\n%s\r\n:%d\r\n" % (len(channel), channel, i))
+                elif name == "PUBLISH":
+                    channel, payload = command[1], command[2]
+                    targets = self.channels.get(channel, set())
+                    for target in list(targets):
+                        target.write(resp_encode("message", channel, payload))
+                    writer.write(b":%d\r\n" % len(targets))
+                elif name == "PING":
+                    writer.write(b"+PONG\r\n")
+                elif name in ("AUTH", "SELECT"):
+                    writer.write(b"+OK\r\n")
+                else:
+                    writer.write(b"-ERR unknown command\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for subscribers in self.channels.values():
+                subscribers.discard(writer)
+            self.writers.discard(writer)
+            writer.close()
+
+
+async def bench(name, sender, receiver):
+    received = asyncio.Queue()
+
+    async def on_message(data):
+        received.put_nowait(data["i"])
+
+    receiver.subscribe("bench", on_message)
+    await receiver.start()
+    await sender.start()
+    await asyncio.sleep(0.2)
+
+    # Latencia: un mensaje cada vez
+    latencies = []
+    for i in range(PING_MESSAGES):
+        started = time.perf_counter()
+        await sender.publish("bench", {"i": i})
+        await asyncio.wait_for(received.get(), timeout=5)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+
+    # Rendimiento: todos seguidos
+    started = time.perf_counter()
+    for i in range(FLOOD_MESSAGES):
+        await sender.publish("bench", {"i": i})
+    got = 0
+    try:
+        while got < FLOOD_MESSAGES:
+            await asyncio.wait_for(received.get(), timeout=5)
+            got += 1
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{name:<6} latencia p50 {latencies[len(latencies) // 2]:.3f} ms  "
+        f"p95 {latencies[int(len(latencies) * 0.95)]:.3f} ms  max {latencies[-1]:.3f} ms  |  "
+        f"{got}/{FLOOD_MESSAGES} en ráfaga, {got / elapsed:,.0f} msg/s"
+    )
+    await sender.stop()
+    await receiver.stop()
+
+
+async def main(redis_url=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "backplane.sock")
+        broker = UnixSocketBackplane(path)
+        await broker.start()  # el primero se queda con el rol de broker
+        await bench("unix", UnixSocketBackplane(path), broker)
+
+    standin = None
+    if not redis_url:
+        standin = RespStandIn()
+        port = await standin.start()
+        redis_url = f"redis://127.0.0.1:{port}/0"
+    await bench("redis", RedisBackplane(redis_url), RedisBackplane(redis_url))
+    if standin:
+        await standin.stop()
+        await asyncio.sleep(0.1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -0,0 +1,45 @@
+import shutil
+
+from sqlalchemy import select
+
+from app.db.session import SessionLocal
+from app.models.offer import Offer
+from app.services.media_jobs import READY, generated_files, media_stem, record_renditions, store_renditions
+from app.services.uploads import discard_files, media_source, new_work_dir
+from app.services.video import inspect_video, make_renditions
+
+
+def run():
+    # Versiones web + póster para los vídeos que no los tienen
+    # (subidos antes de la migración 0008 o cortados por un reinicio del worker)
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(Offer.id, Offer.video_path, Offer.media_info)
+            .where(Offer.media_status == READY, Offer.video_path.is_not(None), Offer.poster_path.is_(None))
+            .order_by(Offer.id)
+        ).all()
+    finally:
+        db.close()
+
+    done = 0
+    for offer_id, video_path, info in rows:
+        source = media_source(video_path)
+        work_dir = new_work_dir()
+        try:
+            info = info if info and info.get("probed") else inspect_video(source)
+            result = make_renditions(source, info, work_dir, media_stem(video_path))
+            if result["error"]:
+                print(f"⚠️ Oferta {offer_id}: {result['error']}")
+            if result["renditions"] or result["poster"]:
+                result = store_renditions(result, work_dir)
+                if record_renditions(offer_id, video_path, result):
+                    done += 1
+                else:
+                    discard_files(*generated_files(result))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"✅ Versiones web generadas para {done}/{len(rows)} vídeos")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,13 @@
+from app.db.session import engine
+from app.db.migrations import MIGRATIONS, run_migrations
+
+
+def run():
+    applied = run_migrations(engine)
+    if applied:
+        print(f"✅ Migraciones aplicadas: {', '.join(applied)}")
+    else:
+        print(f"✅ Esquema al día ({len(MIGRATIONS)} migraciones)")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,12 @@
+from app.db.session import engine
+from app.services.ratings import rebuild_rating_stats
+
+
+def run():
+    # Corrige cualquier deriva entre ratings y los agregados guardados en profiles
+    with engine.begin() as conn:
+        rebuild_rating_stats(conn)
+    print("✅ Agregados de valoraciones recalculados")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,221 @@
+"""
+Servidor mínimo compatible con S3 para probar STORAGE=s3 sin MinIO ni AWS.
+
+    S3_ACCESS_KEY=dev S3_SECRET_KEY=devsecret python -m app.scripts.s3_standin 9000 /tmp/s3
+
+y la app con:
+
+    STORAGE=s3 S3_ENDPOINT=http://127.0.0.1:9000 S3_BUCKET=ofrezco \
+    S3_ACCESS_KEY=dev S3_SECRET_KEY=devsecret uvicorn app.main:app
+
+Entiende PUT / GET (con Range) / HEAD / DELETE de objetos con direccionamiento
+por ruta (/bucket/clave), comprueba las firmas SigV4 (cabecera Authorization o
+URL prefirmada, con caducidad) usando las mismas funciones que S3Storage, y
+responde a CORS como un bucket configurado para subidas desde el navegador.
+Como un bucket de lectura pública, GET / HEAD sin firma se permiten.
+Los objetos se guardan como archivos; los metadatos solo en memoria.
+"""
+import hmac
+import os
+import re
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from app.core.config import settings
+from app.routes.media import parse_range
+from app.services.storage import UNSIGNED_PAYLOAD, sigv4_signature
+
+CHUNK_SIZE = 256 * 1024
+AUTHORIZATION = re.compile(
+    r"AWS4-HMAC-SHA256 Credential=([^/]+)/(\d{8})/([^/]+)/s3/aws4_request,\s*"
+    r"SignedHeaders=([a-z0-9;-]+),\s*Signature=([0-9a-f]{64})"
+)
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, HEAD, PUT",
+    "Access-Control-Allow-Headers": "*",
+    "Access-Control-Expose-Headers": "ETag",
+    "Access-Control-Max-Age": "3600",
+}
+
+
+class S3StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, root: str, access_key: str, secret_key: str, region: str = "us-east-1"):
+        super().__init__(address, S3Handler)
+        self.root = root
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.meta = {}  # ruta -> {"Content-Type", "Cache-Control"}
+
+
+class S3Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        print(f"DEBUG: s3 {self.command} {self.path.split('?')[0]} -> {args[1] if len(args) > 1 else ''}")
+
+    def _reply(self, status: int, headers: dict | None = None, body: bytes = b""):
+        self.send_response(status)
+        for name, value in {**CORS_HEADERS, **(headers or {})}.items():
+            self.send_header(name, value)
+        if "Content-Length" not in (headers or {}):
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _error(self, status: int, code: str):
+        self._reply(status, {"Content-Type": "application/xml"}, f"<Error><Code>{code}</Code></Error>".encode())
+
+    def _authorized(self, path: str, query: dict) -> bool:
+        server = self.server
+        headers = {name.lower(): value for name, value in self.headers.items()}
+        if "X-Amz-Signature" in query:
+            credential = query.get("X-Amz-Credential", "").split("/")
+            amz_date = query.get("X-Amz-Date", "")
+            try:
+                expires_at = datetime.strptime(amz_date, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc) \
+                    + timedelta(seconds=int(query.get("X-Amz-Expires", "0")))
+            except ValueError:
+                return False
+            if expires_at < datetime.now(timezone.utc):
+                return False
+            signed = query.get("X-Amz-SignedHeaders", "").split(";")
+            signature = query["X-Amz-Signature"]
+            payload_hash = UNSIGNED_PAYLOAD
+            signed_query = {k: v for k, v in query.items() if k != "X-Amz-Signature"}
+        else:
+            m = AUTHORIZATION.fullmatch(headers.get("authorization", ""))
+            if not m:
+                return False
+            credential = [m[1], m[2], m[3]]
+            amz_date = headers.get("x-amz-date", "")
+            signed = m[4].split(";")
+            signature = m[5]
+            payload_hash = headers.get("x-amz-content-sha256", "")
+            signed_query = query
+        if not credential or credential[0] != server.access_key or "host" not in signed:
+            return False
+        _, expected = sigv4_signature(
+            server.secret_key, server.region, amz_date, self.command, path, signed_query,
+            {name: headers.get(name, "") for name in signed}, payload_hash,
+        )
+        return hmac.compare_digest(expected, signature)
+
+    def _object(self):
+        url = urlsplit(self.path)
+        query = dict(parse_qsl(url.query, keep_blank_values=True))
+        # Bucket de lectura pública (S3_PUBLIC_URL): GET / HEAD sin firma permitidos
+        public_read = self.command in ("GET", "HEAD") and "X-Amz-Signature" not in query \
+            and "authorization" not in {name.lower() for name in self.headers}
+        if not public_read and not self._authorized(url.path, query):
+            self._error(403, "SignatureDoesNotMatch")
+            return None
+        parts = unquote(url.path).lstrip("/").split("/", 1)
+        if len(parts) != 2 or not parts[1] or ".." in parts[1] or "/" in parts[1]:
+            self._error(400, "InvalidRequest")
+            return None
+        directory = os.path.join(self.server.root, parts[0])
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, parts[1])
+
+    def do_OPTIONS(self):
+        self._reply(200)
+
+    def do_PUT(self):
+        path = self._object()
+        if path is None:
+            return
+        length = int(self.headers.get("Content-Length", "0"))
+        tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+        with open(tmp_path, "wb") as f:
+            remaining = length
+            while remaining > 0:
+                chunk = self.rfile.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk)
+        os.replace(tmp_path, path)
+        self.server.meta[path] = {
+            "Content-Type": self.headers.get("Content-Type", "application/octet-stream"),
+            "Cache-Control": self.headers.get("Cache-Control", ""),
+        }
+        self._reply(200, {"ETag": f'"{uuid.uuid4().hex}"'})
+
+    def _head_or_get(self, send_body: bool):
+        path = self._object()
+        if path is None:
+            return
+        if not os.path.isfile(path):
+            self._error(404, "NoSuchKey")
+            return
+        size = os.path.getsize(path)
+        headers = {k: v for k, v in self.server.meta.get(path, {}).items() if v}
+        headers["Accept-Ranges"] = "bytes"
+        status, start, end = 200, 0, size - 1
+        byte_range = parse_range(self.headers["Range"], size) if self.headers.get("Range") else False
+        if byte_range is None:
+            self._error(416, "InvalidRange")
+            return
+        if byte_range:
+            status, (start, end) = 206, byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        self._reply(status, headers)
+        if not send_body:
+            return
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def do_GET(self):
+        self._head_or_get(True)
+
+    def do_HEAD(self):
+        self._head_or_get(False)
+
+    def do_DELETE(self):
+        path = self._object()
+        if path is None:
+            return
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        self.server.meta.pop(path, None)
+        self._reply(204)
+
+
+def run():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 9000
+    root = sys.argv[2] if len(sys.argv) > 2 else "s3-data"
+    os.makedirs(root, exist_ok=True)
+    server = S3StandIn(
+        ("127.0.0.1", port), root,
+        access_key=settings.S3_ACCESS_KEY or "dev",
+        secret_key=settings.S3_SECRET_KEY or "devsecret",
+        region=settings.S3_REGION,
+    )
+    print(f"✅ S3 de pruebas en http://127.0.0.1:{port} (datos en {root}, access key {server.access_key})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,380 @@
+"""
+Backplane de difusión entre workers.
+
+gunicorn arranca varios workers y cada uno tiene su propio estado en memoria
+(salas del chat, conexiones SSE, cachés). El backplane reenvía mensajes a los
+DEMÁS workers para que cada uno los aplique a su estado local:
+
+    backplane.subscribe("chat", handler)       # handler async, recibe `data`
+    await backplane.publish("chat", data)      # desde el event loop
+    backplane.publish_threadsafe("chat", data) # desde rutas sync (threadpool)
+
+publish() NO entrega en el propio worker: quien publica aplica antes el cambio
+localmente (así no depende del backplane para sus propias respuestas).
+
+Transportes (settings.BACKPLANE):
+- local: un solo worker, publish no hace nada.
+- unix:  un solo host. El worker que consigue el flock de `<socket>.lock` hace de
+         broker en un socket Unix; el resto se conecta como cliente. Si el broker
+         muere, los clientes reconectan y uno de ellos toma el relevo.
+- redis: varias máquinas. PUBLISH / SUBSCRIBE sobre un canal, hablando RESP
+         directamente (sin dependencia de redis-py).
+
+Cada trama lleva la hora de envío; stats() da la latencia de entrega (p50/p95/max).
+"""
+import asyncio
+import fcntl
+import json
+import os
+import time
+import uuid
+from collections import deque
+from urllib.parse import urlparse
+
+from app.core.config import settings
+
+DEFAULT_UNIX_SOCKET = "/tmp/ofrezco-backplane.sock"
+REDIS_CHANNEL = "ofrezco:backplane"
+MAX_FRAME_BYTES = 1024 * 1024
+# Un cliente del broker con más de esto pendiente de escribir se desconecta (reconectará)
+MAX_CLIENT_BUFFER = 4 * 1024 * 1024
+RECONNECT_DELAY_S = 0.5
+LATENCY_SAMPLES = 1000
+
+
+class Backplane:
+    def __init__(self):
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers = {}  # topic -> [handler]
+        self._loop = None
+        self._latencies_ms = deque(maxlen=LATENCY_SAMPLES)
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+
+    # ---- API ----
+    def subscribe(self, topic: str, handler):
+        self._handlers.setdefault(topic, []).append(handler)
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self):
+        self._loop = None
+
+    async def publish(self, topic: str, data: dict):
+        frame = json.dumps({"topic": topic, "data": data, "origin": self.origin, "ts": time.time()})
+        try:
+            await self._send(frame.encode())
+            self.sent += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"DEBUG: backplane publish falló ({topic}): {e}")
+
+    def publish_threadsafe(self, topic: str, data: dict):
+        """Para rutas sync. Sin backplane arrancado (scripts, tests) no hace nada."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self.publish(topic, data), loop)
+
+    def stats(self) -> dict:
+        samples = sorted(self._latencies_ms)
+
+        def pct(p):
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))], 2) if samples else None
+
+        return {
+            "transport": self.transport,
+            "sent": self.sent,
+            "received": self.received,
+            "errors": self.errors,
+            "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "max": round(samples[-1], 2) if samples else None},
+        }
+
+    # ---- Transporte ----
+    transport = "local"
+
+    async def _send(self, frame: bytes):
+        pass
+
+    async def _dispatch(self, frame: bytes):
+        try:
+            message = json.loads(frame)
+        except ValueError:
+            self.errors += 1
+            return
+        if message.get("origin") == self.origin:
+            return
+        self.received += 1
+        self._latencies_ms.append(max(0.0, (time.time() - message.get("ts", time.time())) * 1000))
+        for handler in self._handlers.get(message.get("topic"), []):
+            try:
+                await handler(message.get("data"))
+            except Exception as e:
+                self.errors += 1
+                print(f"DEBUG: backplane handler falló ({message.get('topic')}): {e}")
+
+
+class UnixSocketBackplane(Backplane):
+    transport = "unix"
+
+    def __init__(self, path: str = DEFAULT_UNIX_SOCKET):
+        super().__init__()
+        self.path = path
+        self.role = None  # "broker" / "client"
+        self._lock_fd = None
+        self._server = None
+        self._clients = set()  # writers (modo broker)
+        self._writer = None  # conexión al broker (modo cliente)
+        self._task = None
+
+    async def start(self):
+        if self._task:
+            return
+        await super().start()
+        self._task = asyncio.create_task(self._run())
+        # Espera corta a tener rol, para no perder los primeros mensajes
+        for _ in range(50):
+            if self.role:
+                break
+            await asyncio.sleep(0.02)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._writer:
+            self._writer.close()
+        for writer in list(self._clients):
+            writer.close()
+        if self._server:
+            self._server.close()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self.role = None
+        await super().stop()
+
+    def _try_lock(self) -> bool:
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                if self._try_lock():
+                    await self._serve()
+                    return
+                await self._connect()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"DEBUG: backplane unix reconectando: {e}")
+            self.role = None
+            await asyncio.sleep(RECONNECT_DELAY_S)
+
+    # Modo broker
+    async def _serve(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # socket de un broker anterior que murió
+        self._server = await asyncio.start_unix_server(self._handle_client, path=self.path, limit=MAX_FRAME_BYTES)
+        self.role = "broker"
+        print(f"DEBUG: backplane unix: broker en {self.path} (pid {os.getpid()})")
+
+    async def _handle_client(self, reader, writer):
+        self._clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._relay(line, exclude=writer)
+                await self._dispatch(line)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    def _relay(self, line: bytes, exclude=None):
+        for writer in list(self._clients):
+            if writer is exclude:
+                continue
+            if writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+                self.errors += 1
+                self._clients.discard(writer)
+                writer.close()
+                continue
+            writer.write(line)
+
+    # Modo cliente
+    async def _connect(self):
+        reader, writer = await asyncio.open_unix_connection(self.path, limit=MAX_FRAME_BYTES)
+        self._writer = writer
+        self.role = "client"
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    raise ConnectionError("broker desconectado")
+                await self._dispatch(line)
+        finally:
+            self._writer = None
+            writer.close()
+
+    async def _send(self, frame: bytes):
+        line = frame + b"\n"
+        if self.role == "broker":
+            self._relay(line)
+        elif self._writer is not None:
+            self._writer.write(line)
+            await self._writer.drain()
+        else:
+            raise ConnectionError("sin conexión con el broker")
+
+    def stats(self) -> dict:
+        data = super().stats()
+        data["role"] = self.role
+        if self.role == "broker":
+            data["clients"] = len(self._clients)
+        return data
+
+
+# -------------------------
+# RESP (protocolo de Redis)
+# -------------------------
+def resp_encode(*args) -> bytes:
+    out = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        value = arg if isinstance(arg, bytes) else str(arg).encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(value), value))
+    return b"".join(out)
+
+
+async def resp_read(reader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("conexión cerrada")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode()
+    if kind == b"-":
+        raise RuntimeError(body.decode())
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        size = int(body)
+        if size < 0:
+            return None
+        data = await reader.readexactly(size + 2)
+        return data[:-2]
+    if kind == b"*":
+        size = int(body)
+        return None if size < 0 else [await resp_read(reader) for _ in range(size)]
+    raise ValueError(f"respuesta RESP inválida: {line!r}")
+
+
+class RedisBackplane(Backplane):
+    transport = "redis"
+
+    def __init__(self, url: str):
+        super().__init__()
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.channel = REDIS_CHANNEL
+        self._pub = None  # (reader, writer)
+        self._pub_lock = asyncio.Lock()
+        self._task = None
+        self._subscribed = asyncio.Event()
+
+    async def _open(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port, limit=MAX_FRAME_BYTES)
+        if self.password:
+            writer.write(resp_encode("AUTH", self.password))
+            await resp_read(reader)
+        if self.db:
+            writer.write(resp_encode("SELECT", self.db))
+            await resp_read(reader)
+        return reader, writer
+
+    async def start(self):
+        if self._task:
+            return
+        await super().start()
+        self._task = asyncio.create_task(self._listen())
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), timeout=2)
+        except asyncio.TimeoutError:
+            print("DEBUG: backplane redis aún no suscrito, se reintenta en segundo plano")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._pub:
+            self._pub[1].close()
+            self._pub = None
+        await super().stop()
+
+    async def _listen(self):
+        while True:
+            writer = None
+            try:
+                reader, writer = await self._open()
+                writer.write(resp_encode("SUBSCRIBE", self.channel))
+                await writer.drain()
+                while True:
+                    message = await resp_read(reader)
+                    if not isinstance(message, list) or not message:
+                        continue
+                    kind = message[0].decode() if isinstance(message[0], bytes) else message[0]
+                    if kind == "subscribe":
+                        self._subscribed.set()
+                    elif kind == "message":
+                        await self._dispatch(message[2])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                self._subscribed.clear()
+                print(f"DEBUG: backplane redis reconectando: {e}")
+            finally:
+                if writer is not None:
+                    writer.close()
+            await asyncio.sleep(RECONNECT_DELAY_S)
+
+    async def _send(self, frame: bytes):
+        async with self._pub_lock:
+            if self._pub is None:
+                self._pub = await self._open()
+            reader, writer = self._pub
+            try:
+                writer.write(resp_encode("PUBLISH", self.channel, frame))
+                await writer.drain()
+                await resp_read(reader)
+            except Exception:
+                writer.close()
+                self._pub = None
+                raise
+
+
+def create_backplane(kind: str, url: str = "") -> Backplane:
+    if kind == "unix":
+        return UnixSocketBackplane(url or DEFAULT_UNIX_SOCKET)
+    if kind == "redis":
+        return RedisBackplane(url or "redis://localhost:6379/0")
+    return Backplane()
+
+
+backplane = create_backplane(settings.BACKPLANE, settings.BACKPLANE_URL)
@@ -0,0 +1,149 @@
+"""
+Conexiones del chat con cola de salida propia.
+
+Cada WebSocket tiene una cola acotada y una tarea que escribe en él, así un
+cliente lento (móvil con mala cobertura) no retrasa al resto de la sala:
+broadcast_local() solo encola, nunca espera.
+
+Si la cola de un cliente se llena, se vacía y se sustituye por un único evento
+{"type": "resync"}: el cliente recarga el historial (que ya está en BD, ver
+app/services/chat_history.py) en vez de recibir mensaje a mensaje. Si se llena
+más de MAX_OVERFLOWS veces seguidas sin llegar a vaciarla (la cuenta vuelve a
+cero cuando el cliente se pone al día), o un envío tarda más de SEND_TIMEOUT_S,
+se cierra la conexión (el cliente reconecta).
+"""
+import asyncio
+import json
+import time
+from collections import deque
+
+SEND_QUEUE_SIZE = 100
+SEND_TIMEOUT_S = 10
+MAX_OVERFLOWS = 3
+LATENCY_SAMPLES = 200
+# Código WebSocket 1013 = "Try Again Later"
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+RESYNC_PAYLOAD = json.dumps({"type": "resync"})
+
+
+class RoomStats:
+    def __init__(self):
+        self.delivered = 0
+        self.latencies_ms = deque(maxlen=LATENCY_SAMPLES)
+        self.max_queue_depth = 0
+
+    def as_dict(self, connections) -> dict:
+        samples = sorted(self.latencies_ms)
+        return {
+            "connections": len(connections),
+            "queue_depth": sum(c.queue.qsize() for c in connections),
+            "max_queue_depth": self.max_queue_depth,
+            "delivered": self.delivered,
+            "latency_ms_p50": round(samples[len(samples) // 2], 2) if samples else None,
+            "latency_ms_p95": round(samples[int(len(samples) * 0.95)], 2) if samples else None,
+        }
+
+
+class ChatMetrics:
+    def __init__(self):
+        self.rooms = {}  # room -> RoomStats
+        self.coalesced = 0
+        self.dropped_connections = 0
+
+    def room(self, key) -> RoomStats:
+        stats = self.rooms.get(key)
+        if stats is None:
+            stats = self.rooms[key] = RoomStats()
+        return stats
+
+    def forget(self, key):
+        self.rooms.pop(key, None)
+
+    def snapshot(self, connections_by_room, top: int = 20) -> dict:
+        rooms = {
+            f"{key[0]}-{key[1]}": stats.as_dict(connections_by_room.get(key, ()))
+            for key, stats in self.rooms.items()
+        }
+        # Solo las salas más lentas, para no devolver miles de entradas
+        slowest = sorted(rooms.items(), key=lambda kv: kv[1]["latency_ms_p95"] or 0, reverse=True)[:top]
+        return {
+            "rooms": len(rooms),
+            "connections": sum(len(c) for c in connections_by_room.values()),
+            "coalesced": self.coalesced,
+            "dropped_connections": self.dropped_connections,
+            "slowest_rooms": dict(slowest),
+        }
+
+
+chat_metrics = ChatMetrics()
+
+
+class ChatConnection:
+    def __init__(self, websocket, room):
+        self.websocket = websocket
+        self.room = room
+        self.queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.overflows = 0
+        self.closed = False
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._writer())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def offer(self, payload: str):
+        """Encola sin esperar. Si la cola está llena, se colapsa en un 'resync'."""
+        if self.closed:
+            return
+        stats = chat_metrics.room(self.room)
+        try:
+            self.queue.put_nowait((payload, time.monotonic()))
+        except asyncio.QueueFull:
+            self.overflows += 1
+            chat_metrics.coalesced += 1
+            if self.overflows > MAX_OVERFLOWS:
+                self._drop("cola llena")
+                return
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((RESYNC_PAYLOAD, time.monotonic()))
+        stats.max_queue_depth = max(stats.max_queue_depth, self.queue.qsize())
+
+    def _drop(self, reason: str):
+        self.closed = True
+        chat_metrics.dropped_connections += 1
+        print(f"DEBUG: chat, cerrando conexión lenta en sala {self.room}: {reason}")
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        asyncio.create_task(self._close())
+
+    async def _close(self):
+        try:
+            await self.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass
+
+    async def _writer(self):
+        stats = chat_metrics.room(self.room)
+        while True:
+            payload, enqueued_at = await self.queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(payload), SEND_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                self._task = None
+                self._drop("envío lento")
+                return
+            except Exception:
+                # Socket cerrado: el bucle de lectura de ws_chat limpia la sala
+                return
+            stats.delivered += 1
+            stats.latencies_ms.append((time.monotonic() - enqueued_at) * 1000)
+            if self.queue.empty():
+                # Se puso al día (incluido el resync): los desbordes anteriores ya no cuentan
+                self.overflows = 0
@@ -0,0 +1,210 @@
+"""
+Historial del chat con escritura diferida (write-behind).
+
+ws_chat no espera a la BD: encola el mensaje con chat_writer.enqueue() y sigue
+difundiendo. Una tarea por worker vacía la cola en lotes (hasta BATCH_SIZE
+mensajes o FLUSH_INTERVAL_S segundos) y los inserta en una sola transacción,
+en un hilo aparte para no bloquear el event loop.
+
+Al apagar el worker se vacía lo pendiente (stop()). Lo que siga en cola si el
+proceso muere de golpe se pierde: son como mucho FLUSH_INTERVAL_S segundos de chat.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, insert, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from app.db.session import SessionLocal
+from app.models.chat import Chat
+from app.models.message import Message
+
+BATCH_SIZE = 200
+FLUSH_INTERVAL_S = 0.2
+MAX_QUEUED = 10000
+MAX_RETRIES = 3
+HISTORY_PAGE_SIZE = 50
+_EPOCH = datetime(1970, 1, 1)  # created_at es UTC sin zona (como el resto de modelos)
+
+
+class ChatWriter:
+    def __init__(self):
+        self._queue = None
+        self._task = None
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_batch_ms = None
+
+    def enqueue(self, room, sender_profile_id: int, text: str, ts: float):
+        """No bloquea. Llamar desde el event loop."""
+        if self._queue is None:
+            return
+        message = {
+            "room": room,
+            "sender_profile_id": sender_profile_id,
+            "text": text,
+            "created_at": datetime.utcfromtimestamp(ts),
+        }
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            print("DEBUG: cola del historial de chat llena, mensaje no guardado")
+
+    async def start(self):
+        if self._task:
+            return
+        self._queue = asyncio.Queue(maxsize=MAX_QUEUED)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Vacía lo pendiente y para la tarea (shutdown del worker)."""
+        if not self._task:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        self._queue = None
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stopping = False
+            deadline = time.monotonic() + FLUSH_INTERVAL_S
+            while len(batch) < BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    message = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if message is None:
+                    stopping = True
+                    break
+                batch.append(message)
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch):
+        for attempt in range(1, MAX_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                await run_in_threadpool(write_messages, batch)
+            except Exception as e:
+                self.errors += 1
+                print(f"DEBUG: historial de chat, lote de {len(batch)} falló (intento {attempt}): {e}")
+                await asyncio.sleep(0.5 * attempt)
+                continue
+            self.written += len(batch)
+            self.batches += 1
+            self.last_batch_ms = round((time.perf_counter() - started) * 1000, 2)
+            return
+        self.dropped += len(batch)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "last_batch_ms": self.last_batch_ms,
+        }
+
+
+def _chat_ids(db, rooms) -> dict:
+    """(profile_a_id, profile_b_id) -> chats.id, creando las salas que falten."""
+    def existing():
+        return {
+            (row.profile_a_id, row.profile_b_id): row.id
+            for row in db.execute(
+                select(Chat.id, Chat.profile_a_id, Chat.profile_b_id).where(
+                    or_(*[and_(Chat.profile_a_id == a, Chat.profile_b_id == b) for a, b in rooms])
+                )
+            )
+        }
+
+    ids = existing()
+    missing = [room for room in rooms if room not in ids]
+    if missing:
+        for a, b in missing:
+            try:
+                with db.begin_nested():
+                    db.add(Chat(profile_a_id=a, profile_b_id=b))
+            except IntegrityError:
+                pass  # la ha creado otro worker a la vez
+        ids = existing()
+    return ids
+
+
+def write_messages(batch):
+    """Inserta un lote de mensajes (de varias salas) en una transacción."""
+    db = SessionLocal()
+    try:
+        rooms = {tuple(m["room"]) for m in batch}
+        chat_ids = _chat_ids(db, rooms)
+        db.execute(insert(Message), [
+            {
+                "chat_id": chat_ids[tuple(m["room"])],
+                "sender_profile_id": m["sender_profile_id"],
+                "text": m["text"],
+                "created_at": m["created_at"],
+            }
+            for m in batch
+        ])
+        last_at = {}
+        for m in batch:
+            room = tuple(m["room"])
+            last_at[room] = max(last_at.get(room, m["created_at"]), m["created_at"])
+        for room, at in last_at.items():
+            db.execute(update(Chat).where(Chat.id == chat_ids[room]).values(last_message_at=at))
+        db.commit()
+    finally:
+        db.close()
+
+
+# -------------------------
+# LECTURA (keyset)
+# -------------------------
+def encode_cursor(message) -> str:
+    micros = (message.created_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}:{message.id}"
+
+
+def decode_cursor(cursor: str):
+    """'<microsegundos>:<id>' -> (created_at, id). ValueError si no es válido."""
+    micros, message_id = cursor.split(":")
+    return _EPOCH + timedelta(microseconds=int(micros)), int(message_id)
+
+
+def fetch_history(db, room, before: str | None = None, limit: int = HISTORY_PAGE_SIZE):
+    """
+    Una página de mensajes de la sala, del más nuevo al más antiguo, y el cursor
+    para pedir la anterior (None si no hay más). Una sola consulta.
+    """
+    stmt = (
+        select(Message.id, Message.sender_profile_id, Message.text, Message.created_at)
+        .join(Chat, Chat.id == Message.chat_id)
+        .where(Chat.profile_a_id == room[0], Chat.profile_b_id == room[1])
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(limit + 1)
+    )
+    if before:
+        created_at, message_id = decode_cursor(before)
+        stmt = stmt.where(tuple_(Message.created_at, Message.id) < tuple_(created_at, message_id))
+
+    rows = db.execute(stmt).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+chat_writer = ChatWriter()
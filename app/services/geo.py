@@ -0,0 +1,109 @@
+"""
+Utilidades geográficas: distancia haversine e índice espacial por celdas.
+
+El índice es una rejilla fija de GEO_CELL_DEG grados (~11 km de lado en latitud).
+Cada perfil guarda su celda (Profile.geo_cell, indexada) y sus coordenadas como
+Float (geo_lat / geo_lon). Una búsqueda por radio calcula el bounding box, lo
+convierte en la lista de celdas que lo cubren y filtra por celda + bbox en SQL,
+así el coste depende de los perfiles cercanos y no del total.
+
+Sobre los candidatos, haversine_km_many + nearest_k calculan todas las distancias
+y el top-K en una sola pasada vectorizada con NumPy.
+"""
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+GEO_CELL_DEG = 0.1
+_CELLS_PER_ROW = int(round(360 / GEO_CELL_DEG))
+# Por encima de este nº de celdas el IN (...) deja de compensar; se usa solo el bbox
+MAX_CELLS_PER_QUERY = 400
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    R = EARTH_RADIUS_KM
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dl = math.radians(lon2 - lon1)
+
+    a = math.sin(dphi / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return R * c
+
+
+def haversine_km_many(lat: float, lon: float, lats, lons) -> np.ndarray:
+    """Distancias (km) desde (lat, lon) a cada punto. Coordenadas None/NaN -> NaN."""
+    lats = np.radians(np.asarray(lats, dtype=float))
+    lons = np.radians(np.asarray(lons, dtype=float))
+    p1 = math.radians(lat)
+    dphi = lats - p1
+    dl = lons - math.radians(lon)
+
+    a = np.sin(dphi / 2) ** 2 + math.cos(p1) * np.cos(lats) * np.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def nearest_k(distances, k: int | None = None, max_km: float | None = None) -> np.ndarray:
+    """
+    Índices de `distances` ordenados de más cerca a más lejos.
+    - max_km: descarta los que quedan fuera del radio (y los NaN)
+    - k: solo los k más cercanos (selección parcial con argpartition, O(n))
+    Sin max_km, los NaN (sin coordenadas) quedan al final.
+    """
+    d = np.asarray(distances, dtype=float)
+    idx = np.arange(d.size)
+    if max_km is not None:
+        idx = idx[d <= max_km]
+    if k is not None and idx.size > k:
+        idx = idx[np.argpartition(d[idx], k - 1)[:k]]
+    return idx[np.argsort(d[idx], kind="stable")]
+
+
+def parse_coord(value) -> float | None:
+    """Profile.lat / lon se guardan como texto; devuelve float o None si no es válido."""
+    try:
+        coord = float(str(value).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+    return coord if math.isfinite(coord) else None
+
+
+def _cell_index(lat: float, lon: float) -> tuple[int, int]:
+    row = int(math.floor((min(max(lat, -90.0), 89.999999) + 90.0) / GEO_CELL_DEG))
+    col = int(math.floor((min(max(lon, -180.0), 179.999999) + 180.0) / GEO_CELL_DEG))
+    return row, col
+
+
+def geo_cell(lat: float, lon: float) -> int:
+    row, col = _cell_index(lat, lon)
+    return row * _CELLS_PER_ROW + col
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lon, max_lon) que contiene el círculo de radio radius_km."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlon = min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+def cells_for_bbox(min_lat, max_lat, min_lon, max_lon) -> list[int] | None:
+    """Celdas que cubren el bbox, o None si son demasiadas (radio muy grande)."""
+    row0, col0 = _cell_index(min_lat, min_lon)
+    row1, col1 = _cell_index(max_lat, max_lon)
+    if (row1 - row0 + 1) * (col1 - col0 + 1) > MAX_CELLS_PER_QUERY:
+        return None
+    return [r * _CELLS_PER_ROW + c for r in range(row0, row1 + 1) for c in range(col0, col1 + 1)]
+
+
+def set_profile_geo(profile):
+    """Sincroniza las columnas del índice espacial con profile.lat / profile.lon."""
+    lat, lon = parse_coord(profile.lat), parse_coord(profile.lon)
+    if lat is None or lon is None:
+        profile.geo_lat = profile.geo_lon = profile.geo_cell = None
+        return
+    profile.geo_lat = lat
+    profile.geo_lon = lon
+    profile.geo_cell = geo_cell(lat, lon)
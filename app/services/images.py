@@ -0,0 +1,86 @@
+"""
+Fotos de ofertas y perfiles: se decodifican una vez al subirlas y se guardan en
+unos pocos tamaños fijos, en WebP y JPEG (fallback), sin EXIF (ni GPS ni datos
+de la cámara). El original no se sirve nunca.
+
+Los listados muestran las fotos en huecos de 40-140 px: con srcset el navegador
+baja la versión "thumb" o "card" (KB) en vez del original de la cámara (MB).
+
+photo_variants (JSON en offers / profiles):
+    {"thumb": {"w": 160, "h": 120, "webp": url, "jpeg": url}, "card": {...}, "full": {...}}
+"""
+import os
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Sin Pillow se guarda la foto tal cual, como antes
+    Image = None
+
+# Lado mayor de cada tamaño (nunca se amplía)
+IMAGE_SIZES = (
+    ("thumb", 160),  # avatares y miniaturas de 40-56 px (hasta 3x)
+    ("card", 480),  # tarjetas de resultados / perfil
+    ("full", 1280),  # feed a pantalla completa y detalle
+)
+WEBP_QUALITY = 78
+JPEG_QUALITY = 82
+MAX_PIXELS = 50_000_000  # ~7000x7000; más es una foto rara o una bomba de descompresión
+
+
+def pillow_available() -> bool:
+    return Image is not None
+
+
+def make_image_variants(path: str, out_dir: str, stem: str) -> dict:
+    """
+    Genera <stem>_<tamaño>.webp / .jpg en out_dir a partir de la imagen en `path`.
+    Devuelve {tamaño: {"w", "h", "webp", "jpeg"}} con nombres de archivo.
+    ValueError si no es una imagen válida.
+    """
+    try:
+        with Image.open(path) as img:
+            if img.width * img.height > MAX_PIXELS:
+                raise ValueError("Imagen demasiado grande.")
+            # JPEG: decodifica directamente a escala reducida (mucho más rápido con fotos de 12+ MP)
+            img.draft("RGB", (IMAGE_SIZES[-1][1], IMAGE_SIZES[-1][1]))
+            img = ImageOps.exif_transpose(img)  # aplica la rotación del móvil antes de quitar el EXIF
+            img.load()
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError("El archivo no es una imagen válida.") from e
+
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    img = img.convert("RGBA" if has_alpha else "RGB")
+
+    variants = {}
+    for label, longest in IMAGE_SIZES:
+        resized = img.copy()
+        resized.thumbnail((longest, longest), Image.LANCZOS)
+
+        webp_name = f"{stem}_{label}.webp"
+        jpeg_name = f"{stem}_{label}.jpg"
+        # Sin exif= al guardar: los metadatos no se copian
+        resized.save(os.path.join(out_dir, webp_name), "WEBP", quality=WEBP_QUALITY, method=4)
+        if has_alpha:
+            # JPEG no tiene transparencia: fondo blanco
+            background = Image.new("RGB", resized.size, (255, 255, 255))
+            background.paste(resized, mask=resized.getchannel("A"))
+            resized = background
+        resized.save(os.path.join(out_dir, jpeg_name), "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+
+        variants[label] = {"w": resized.width, "h": resized.height, "webp": webp_name, "jpeg": jpeg_name}
+    return variants
+
+
+def variant_files(variants: dict | None) -> list:
+    """URLs de todos los archivos de photo_variants (para borrarlos)."""
+    return [url for v in (variants or {}).values() for url in (v.get("webp"), v.get("jpeg")) if url]
+
+
+def srcset(variants: dict | None, fmt: str = "jpeg") -> str:
+    """'url 160w, url 480w, ...' para <img srcset> / <source srcset>."""
+    widths = {}
+    for v in (variants or {}).values():
+        # Fotos pequeñas: varios tamaños acaban con el mismo ancho, basta uno
+        if v.get(fmt):
+            widths.setdefault(v["w"], v[fmt])
+    return ", ".join(f"{url} {w}w" for w, url in widths.items())
@@ -0,0 +1,402 @@
+"""
+Procesado de los vídeos de ofertas en segundo plano.
+
+upload_offer_video guarda el archivo, marca la oferta media_status=PENDING y
+vuelve enseguida; ffprobe y ffmpeg se ejecutan aquí, en pools de procesos, no
+en el worker que atiende peticiones. Son dos pools por worker de gunicorn:
+ffprobe (MEDIA_PROBE_WORKERS) y ffmpeg (MEDIA_WORKERS). Validar un vídeo nuevo
+tarda segundos y es lo que desbloquea submit_for_review (409 mientras tanto):
+no debe esperar detrás de las transcodificaciones a 720p/480p en cola.
+
+Ciclo de vida (columna offers.media_status):
+    PENDING -> PROCESSING -> READY     (vídeo válido, o no se pudo comprobar)
+                          -> REJECTED  (demasiado largo: se borra el archivo)
+
+Tras READY se generan las versiones para web (video_renditions) y el póster
+(poster_path), ver make_renditions(): se generan en un directorio temporal
+y se suben al almacenamiento (app/services/storage.py); con S3 ffmpeg lee el
+original por una URL firmada. La oferta ya se puede publicar mientras
+tanto: hasta que estén, las plantillas usan el original. Si el worker se
+reinicia a medias, app.scripts.build_renditions completa las que falten.
+
+El estado vive en la BD, no en memoria:
+- claim_job() pasa PENDING -> PROCESSING con un UPDATE condicional, así solo
+  un worker coge cada vídeo aunque varios lo tengan en cola. Se reclama cuando
+  hay un proceso de ffprobe libre, no al encolar: media_updated_at marca el
+  inicio real y lo que espera sigue PENDING (lo puede coger otro worker).
+- Al arrancar, cada worker retoma lo que quedó PENDING (o PROCESSING más de
+  STALE_AFTER_S, si el proceso murió a medias). Al parar, lo que estaba en
+  curso vuelve a PENDING.
+- submit_for_review solo mira media_status, ya no ejecuta ffprobe.
+"""
+import asyncio
+import multiprocessing
+import os
+import shutil
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select, update
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.offer import Offer
+from app.services.offers import invalidate_results_cache
+from app.services.storage import content_type_for, storage
+from app.services.uploads import discard_files, media_source, new_work_dir
+from app.services.video import duration_error, inspect_video, make_renditions
+
+PENDING = "PENDING"
+PROCESSING = "PROCESSING"
+READY = "READY"
+REJECTED = "REJECTED"
+
+STALE_AFTER_S = 600
+MAX_RESUMED = 500
+
+
+def _claimable(now: datetime):
+    return or_(
+        Offer.media_status == PENDING,
+        and_(
+            Offer.media_status == PROCESSING,
+            Offer.media_updated_at < now - timedelta(seconds=STALE_AFTER_S),
+        ),
+    )
+
+
+def mark_pending(offer: Offer):
+    """Llamar al guardar un vídeo nuevo (antes del commit)."""
+    offer.media_status = PENDING
+    offer.media_error = None
+    offer.media_info = None
+    offer.media_updated_at = datetime.utcnow()
+    offer.video_renditions = None
+    offer.poster_path = None
+
+
+def media_stem(video_path: str) -> str:
+    """offer_12_video_<hash> para /media/offer_12_video_<hash>.mp4: base de los archivos generados."""
+    return os.path.splitext(video_path.rsplit("/", 1)[-1])[0]
+
+
+def store_renditions(result: dict, work_dir: str) -> dict:
+    """Sube lo que make_renditions() dejó en work_dir. Mismo dict, con URLs en vez de nombres."""
+    def put(filename):
+        storage.put_file(os.path.join(work_dir, filename), filename, content_type_for(filename))
+        return storage.url(filename)
+
+    return {
+        **result,
+        "renditions": {label: put(filename) for label, filename in result["renditions"].items()},
+        "poster": put(result["poster"]) if result["poster"] else None,
+    }
+
+
+def generated_files(result: dict) -> list:
+    return [*result["renditions"].values(), result["poster"]]
+
+
+def pending_offer_ids() -> list:
+    db = SessionLocal()
+    try:
+        return db.execute(
+            select(Offer.id)
+            .where(_claimable(datetime.utcnow()))
+            .order_by(Offer.media_updated_at)
+            .limit(MAX_RESUMED)
+        ).scalars().all()
+    finally:
+        db.close()
+
+
+def claim_job(offer_id: int) -> str | None:
+    """PENDING -> PROCESSING. Devuelve el video_path a procesar, o None si ya lo tiene otro."""
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        result = db.execute(
+            update(Offer)
+            .where(Offer.id == offer_id, Offer.video_path.is_not(None), _claimable(now))
+            .values(media_status=PROCESSING, media_updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        if result.rowcount != 1:
+            return None
+        return db.execute(select(Offer.video_path).where(Offer.id == offer_id)).scalar_one_or_none()
+    finally:
+        db.close()
+
+
+def release_jobs(offer_ids):
+    """PROCESSING -> PENDING para los trabajos que se cortan al parar el worker."""
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(Offer)
+            .where(Offer.id.in_(list(offer_ids)), Offer.media_status == PROCESSING)
+            .values(media_status=PENDING)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def record_result(offer_id: int, video_path: str, info: dict) -> str | None:
+    """Guarda el resultado. None si la oferta cambió de vídeo (o se borró) mientras tanto."""
+    db = SessionLocal()
+    try:
+        offer = db.execute(
+            select(Offer).where(
+                Offer.id == offer_id,
+                Offer.video_path == video_path,
+                Offer.media_status == PROCESSING,
+            )
+        ).scalar_one_or_none()
+        if offer is None:
+            return None
+
+        error = duration_error(info["duration"], offer.category) if info.get("duration") else None
+        offer.media_info = info
+        offer.media_error = error
+        offer.media_status = REJECTED if error else READY
+        offer.media_updated_at = datetime.utcnow()
+        if error:
+            offer.video_path = None
+        db.commit()
+
+        if error:
+            discard_files(video_path)
+            invalidate_results_cache(offer.category)
+        return offer.media_status
+    finally:
+        db.close()
+
+
+def record_renditions(offer_id: int, video_path: str, result: dict) -> bool:
+    """Guarda las URLs (store_renditions) de las versiones y el póster si el vídeo sigue siendo el mismo."""
+    db = SessionLocal()
+    try:
+        offer = db.execute(
+            select(Offer).where(Offer.id == offer_id, Offer.video_path == video_path)
+        ).scalar_one_or_none()
+        if offer is None:
+            return False
+        offer.video_renditions = result["renditions"] or None
+        offer.poster_path = result["poster"]
+        db.commit()
+        invalidate_results_cache(offer.category)
+        return True
+    finally:
+        db.close()
+
+
+class WorkerPool:
+    """
+    ProcessPoolExecutor con un hueco por proceso. Los trabajos esperan en slot()
+    (sin reclamar nada en la BD) y, dentro, run() empieza en un proceso libre.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.executor = None
+        self._slots = None
+        self.waiting = 0  # esperando un proceso libre
+        self.running = 0  # en el executor
+
+    def _new_executor(self):
+        # spawn: los hijos solo importan app.services.video, no heredan el event loop ni la BD
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def start(self):
+        self.executor = self._new_executor()
+        self._slots = asyncio.Semaphore(self.workers)
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    @asynccontextmanager
+    async def slot(self):
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    async def run(self, fn, *args):
+        """Llamar dentro de slot(). BrokenProcessPool si un hijo murió (el pool ya se ha reemplazado)."""
+        executor = self.executor
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            raise
+        finally:
+            self.running -= 1
+
+    def _replace_broken(self, broken):
+        """Un hijo murió (OOM, señal): cerrar el pool roto y abrir otro. Varias tareas
+        ven el mismo pool roto a la vez; solo la primera lo cambia (y tras stop() no se reabre)."""
+        if self.executor is not broken:
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.executor = self._new_executor()  # los huecos (semáforo) siguen siendo los mismos
+        print("DEBUG: media, pool de procesos caído, se reemplaza")
+
+
+class MediaJobs:
+    def __init__(self):
+        self._probes = WorkerPool(settings.MEDIA_PROBE_WORKERS)
+        self._transcodes = WorkerPool(settings.MEDIA_WORKERS)
+        self._tasks = set()
+        self._claimed = set()  # offer_ids en PROCESSING por este worker (se liberan al parar)
+        self.submitted = 0
+        self.ready = 0
+        self.rejected = 0
+        self.unverified = 0
+        self.failed = 0
+        self.transcoded = 0
+        self.transcode_errors = 0
+        self.last_job_ms = None
+        self.last_transcode_ms = None
+
+    async def start(self):
+        if self._probes.executor:
+            return
+        self._probes.start()
+        self._transcodes.start()
+        offer_ids = await run_in_threadpool(pending_offer_ids)
+        if offer_ids:
+            print(f"DEBUG: media, retomando {len(offer_ids)} vídeos pendientes")
+        for offer_id in offer_ids:
+            self.submit(offer_id)
+
+    async def stop(self):
+        if not self._probes.executor:
+            return
+        for task in list(self._tasks):
+            task.cancel()
+        self._probes.shutdown()
+        self._transcodes.shutdown()
+        if self._claimed:
+            await run_in_threadpool(release_jobs, set(self._claimed))
+            self._claimed.clear()
+
+    def submit(self, offer_id: int):
+        """No bloquea. Llamar desde el event loop. Sin pool (scripts) queda PENDING para el próximo arranque."""
+        if self._probes.executor is None:
+            return
+        self.submitted += 1
+        task = asyncio.create_task(self._run(offer_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, offer_id: int):
+        async with self._probes.slot():
+            # Se reclama con un proceso de ffprobe libre: PROCESSING = se está validando
+            video_path = await run_in_threadpool(claim_job, offer_id)
+            if video_path is None:
+                return
+            self._claimed.add(offer_id)
+            started = time.perf_counter()
+            try:
+                try:
+                    info = await self._probes.run(inspect_video, media_source(video_path))
+                except BrokenProcessPool:
+                    # El vídeo se da por no comprobado
+                    self.failed += 1
+                    info = {"probed": False, "error": "worker de media caído"}
+                status = await run_in_threadpool(record_result, offer_id, video_path, info)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                print(f"DEBUG: media, error procesando vídeo de la oferta {offer_id}: {e}")
+                await run_in_threadpool(release_jobs, {offer_id})
+                return
+            finally:
+                self._claimed.discard(offer_id)
+
+        self.last_job_ms = round((time.perf_counter() - started) * 1000, 2)
+        if status == READY:
+            self.ready += 1
+            if not info.get("probed"):
+                self.unverified += 1
+        elif status == REJECTED:
+            self.rejected += 1
+
+        if status == READY:
+            # La oferta ya se puede publicar con el original; las versiones web, cuando haya hueco
+            try:
+                async with self._transcodes.slot():
+                    await self._transcode(offer_id, video_path, info)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.transcode_errors += 1
+                print(f"DEBUG: media, sin versiones web para la oferta {offer_id}: {e}")
+
+    async def _transcode(self, offer_id: int, video_path: str, info: dict):
+        started = time.perf_counter()
+        work_dir = await run_in_threadpool(new_work_dir)
+        try:
+            try:
+                result = await self._transcodes.run(
+                    make_renditions, media_source(video_path), info, work_dir, media_stem(video_path),
+                )
+            except BrokenProcessPool:
+                # El vídeo ya está READY con el original; app.scripts.build_renditions completa las versiones
+                self.transcode_errors += 1
+                print(f"DEBUG: media, sin versiones web para la oferta {offer_id}: worker de media caído")
+                return
+            if result["error"]:
+                self.transcode_errors += 1
+                print(f"DEBUG: media, sin versiones web para la oferta {offer_id}: {result['error']}")
+            if result["renditions"] or result["poster"]:
+                result = await run_in_threadpool(store_renditions, result, work_dir)
+                if not await run_in_threadpool(record_renditions, offer_id, video_path, result):
+                    # La oferta cambió de vídeo (o se borró) mientras tanto
+                    await run_in_threadpool(discard_files, *generated_files(result))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        self.transcoded += 1
+        self.last_transcode_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def stats(self) -> dict:
+        return {
+            "workers": settings.MEDIA_WORKERS,
+            "probe_workers": settings.MEDIA_PROBE_WORKERS,
+            # queued: esperando un proceso libre; running: ya en un proceso
+            "queued": self._probes.waiting + self._transcodes.waiting,
+            "running": self._probes.running + self._transcodes.running,
+            "probes_queued": self._probes.waiting,
+            "transcodes_queued": self._transcodes.waiting,
+            "submitted": self.submitted,
+            "ready": self.ready,
+            "rejected": self.rejected,
+            "unverified": self.unverified,
+            "failed": self.failed,
+            "transcoded": self.transcoded,
+            "transcode_errors": self.transcode_errors,
+            "last_job_ms": self.last_job_ms,
+            "last_transcode_ms": self.last_transcode_ms,
+        }
+
+
+media_jobs = MediaJobs()
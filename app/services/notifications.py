@@ -0,0 +1,76 @@
+"""
+Pub/sub en memoria para notificaciones push (SSE en /api/v1/interests/stream).
+
+Cada conexión SSE se suscribe con su user_id y recibe una asyncio.Queue.
+publish() se puede llamar desde rutas sync (threadpool): entrega el evento en el
+event loop de cada suscriptor con call_soon_threadsafe.
+
+Es por proceso: los eventos de otros workers llegan por el backplane
+(app/services/backplane.py, ver app/routes/interests.py). El cliente mantiene
+un poll lento de respaldo para los huecos de reconexión.
+"""
+import asyncio
+import threading
+
+# Eventos pendientes por conexión; si el cliente no los consume se descartan los más antiguos
+MAX_PENDING_EVENTS = 50
+
+
+class NotificationHub:
+    def __init__(self):
+        self._subscribers = {}  # user_id -> {queue: loop}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """Llamar desde el event loop (generador SSE)."""
+        queue = asyncio.Queue(maxsize=MAX_PENDING_EVENTS)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers.setdefault(user_id, {})[queue] = loop
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        with self._lock:
+            queues = self._subscribers.get(user_id)
+            if queues is None:
+                return
+            queues.pop(queue, None)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def _put(self, queue: asyncio.Queue, event: dict):
+        if queue.full():
+            queue.get_nowait()
+            self.dropped += 1
+        queue.put_nowait(event)
+
+    def publish(self, user_id: int, event: dict) -> int:
+        """Envía `event` a todas las conexiones de user_id en este worker. Devuelve cuántas."""
+        with self._lock:
+            targets = list(self._subscribers.get(user_id, {}).items())
+            self.published += 1
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, event)
+            except RuntimeError:
+                # Event loop cerrado (worker apagándose)
+                continue
+            self.delivered += 1
+        return len(targets)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._subscribers),
+                "connections": sum(len(q) for q in self._subscribers.values()),
+                "published": self.published,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+            }
+
+
+# Nuevos intereses sobre las ofertas de un usuario (ver app/routes/interests.py)
+interest_hub = NotificationHub()
@@ -0,0 +1,61 @@
+"""
+Atributos tipados por vertical (Inmobiliaria, y en el futuro Motor...).
+
+Cada vertical declara su categoría, el modelo de su tabla lateral y cómo convertir
+cada clave de Offer.extra_info a columna. Para añadir Vehículos basta con crear
+el modelo (p. ej. OfferVehicle con car_year, car_km...) y registrarlo en VERTICALS.
+"""
+from sqlalchemy.orm import Session
+
+from app.models.offer import Offer
+from app.models.offer_real_estate import OfferRealEstate
+from app.services.search_index import fold_accents
+
+
+def _to_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_str(value):
+    return str(value).strip() if value not in (None, "") else None
+
+
+def _to_folded(value):
+    return fold_accents(str(value)).strip() if value not in (None, "") else None
+
+
+# categoría -> (modelo, relación en Offer, {columna: conversor desde extra_info[columna]})
+VERTICALS = {
+    "Inmobiliaria (Pisos/Locales)": (
+        OfferRealEstate,
+        "real_estate",
+        {
+            "operation_type": _to_str,
+            "rooms": _to_int,
+            "sqm": _to_int,
+            "zone_text": _to_folded,
+        },
+    ),
+}
+
+
+def sync_offer_attributes(db: Session, offer: Offer):
+    """Copia extra_info a la tabla lateral de su vertical. Llamar antes del commit."""
+    extra = offer.extra_info or {}
+    for category, (model, attr, fields) in VERTICALS.items():
+        row = getattr(offer, attr)
+        if offer.category != category:
+            # Cambio de categoría: ya no pertenece a esta vertical
+            if row is not None:
+                setattr(offer, attr, None)
+            continue
+
+        if row is None:
+            row = model()
+            setattr(offer, attr, row)
+        for column, convert in fields.items():
+            setattr(row, column, convert(extra.get(column)))
+
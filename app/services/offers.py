@@ -0,0 +1,144 @@
+import math
+
+from sqlalchemy import select
+
+from app.core.cache import results_page_cache
+from app.core.data import get_sales_categories
+from app.models.offer import Offer
+from app.models.profile import Profile
+from app.models.user import User
+from app.services.backplane import backplane
+from app.services.geo import haversine_km_many, nearest_k
+
+PLACEHOLDER_PHOTO = "https://via.placeholder.com/56"
+
+# Etiqueta de caché para páginas que mezclan todas las categorías
+ALL_CATEGORIES_TAG = "*"
+
+
+def offer_cards_query():
+    """
+    SELECT de ofertas con el nombre y teléfono del dueño en una sola consulta.
+    Evita el N+1 de hacer db.get(Profile) + db.get(User) por cada fila.
+    """
+    return (
+        select(
+            Offer.id,
+            Offer.profile_id,
+            Offer.offer_kind,
+            Offer.category,
+            Offer.title,
+            Offer.description,
+            Offer.price,
+            Offer.currency,
+            Offer.available_now,
+            Offer.status,
+            Offer.video_path,
+            Offer.video_renditions,
+            Offer.poster_path,
+            Offer.photo_path,
+            Offer.photo_variants,
+            Offer.extra_info,
+            User.name.label("owner_name"),
+            Profile.phone.label("owner_phone"),
+            Profile.geo_lat.label("owner_lat"),
+            Profile.geo_lon.label("owner_lon"),
+        )
+        .outerjoin(Profile, Profile.id == Offer.profile_id)
+        .outerjoin(User, User.id == Profile.user_id)
+    )
+
+
+def published_offers_query():
+    return offer_cards_query().where(Offer.status == "PUBLISHED").order_by(Offer.id.desc())
+
+
+def offer_card(row) -> dict:
+    """Convierte una fila de offer_cards_query() en el dict que usan las plantillas."""
+    renditions = row.video_renditions or {}
+    return {
+        "id": row.profile_id,
+        "offer_id": row.id,
+        "title": row.title,
+        "role": row.title,  # Retrocompatibilidad con la card de listado
+        "name": row.owner_name or "Usuario",
+        "category": row.category,
+        "offer_cat": row.category,  # Retrocompatibilidad
+        "price": row.price or 0,
+        # Versión ligera para listados/feed; la HD solo si la pantalla y la red lo aguantan
+        # (ui_item_feed.html). Sin versiones todavía (o sin ffmpeg): el original.
+        "video": renditions.get("480p") or row.video_path or "",
+        "video_hd": renditions.get("720p") or "",
+        "poster": row.poster_path or "",
+        "photo": row.photo_path or PLACEHOLDER_PHOTO,
+        "photo_variants": row.photo_variants or {},  # srcset WebP/JPEG (macro picture de ui_macros.html)
+        "distance_km": None,  # Se rellena con with_distances() si conocemos el origen
+        "status": "Disponible" if row.available_now else "Consultar",
+        "desc": row.description or "",
+        "phone": row.owner_phone or "",
+        "extra": row.extra_info or {},
+    }
+
+
+def with_distances(rows: list, cards: list, lat: float, lon: float) -> list:
+    """
+    Rellena distance_km (desde la ubicación del dueño) en una sola pasada
+    vectorizada y devuelve las cards ordenadas de más cerca a más lejos.
+    Las ofertas sin ubicación van al final, en su orden original.
+    """
+    distances = haversine_km_many(lat, lon, [r.owner_lat for r in rows], [r.owner_lon for r in rows])
+    for card, d in zip(cards, distances):
+        if not math.isnan(d):
+            card["distance_km"] = round(float(d), 1)
+    return [cards[i] for i in nearest_k(distances)]
+
+
+def fetch_keyset_page(db, query, limit: int, before_id: int | None = None, start_id: int | None = None):
+    """
+    Paginación por cursor sobre Offer.id (la query debe venir ordenada por Offer.id DESC).
+    - before_id: devuelve las ofertas con id < before_id (siguiente ventana)
+    - start_id: primera ventana empezando en esa oferta (id <= start_id)
+    Devuelve (filas, next_cursor). next_cursor es None cuando no hay más.
+    El coste es constante: siempre se leen como mucho limit + 1 filas por índice.
+    """
+    if before_id is not None:
+        query = query.where(Offer.id < before_id)
+    elif start_id is not None:
+        query = query.where(Offer.id <= start_id)
+
+    rows = db.execute(query.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = rows[-1].id if has_more and rows else None
+    return rows, next_cursor
+
+
+# -------------------------
+# CACHÉ DE /ui/results
+# -------------------------
+def results_cache_key(**params) -> tuple:
+    """Clave normalizada a partir de los filtros de búsqueda (sin espacios sobrantes)."""
+    return tuple(sorted((k, (str(v) if v is not None else "").strip()) for k, v in params.items()))
+
+
+def results_cache_tags(cat: str) -> set:
+    """Categorías que puede contener una página de resultados (para invalidarla)."""
+    if not cat or cat == "Todas":
+        return {ALL_CATEGORIES_TAG}
+    if cat == "Mercado de Segunda Mano (Venta)":
+        return set(get_sales_categories())
+    return {cat}
+
+
+def invalidate_results_cache(*categories):
+    """Llamar cuando se crea, edita, publica o borra una oferta de estas categorías."""
+    tags = [ALL_CATEGORIES_TAG, *[c for c in categories if c]]
+    results_page_cache.invalidate_tags(*tags)
+    # Los demás workers tienen su propia copia de la caché
+    backplane.publish_threadsafe("results_cache", {"tags": tags})
+
+
+async def _on_backplane_invalidation(data: dict):
+    results_page_cache.invalidate_tags(*data["tags"])
+
+backplane.subscribe("results_cache", _on_backplane_invalidation)
@@ -0,0 +1,46 @@
+"""
+Agregados de valoraciones guardados en Profile (rating_count, rating_sum, rating_1..5).
+
+apply_rating() los actualiza con un UPDATE atómico (col = col + 1) en la misma
+transacción que el INSERT del rating, así no hay carreras entre workers.
+rebuild_rating_stats() los recalcula desde la tabla ratings por si hubiera deriva.
+"""
+from sqlalchemy import select, update, func
+
+from app.models.profile import Profile
+from app.models.rating import Rating
+
+RATING_SCORES = range(1, 6)
+
+
+def apply_rating(db, profile_id: int, score: int):
+    """Suma una valoración a los agregados del perfil. Llamar antes del commit."""
+    score_col = getattr(Profile, f"rating_{score}")
+    db.execute(
+        update(Profile)
+        .where(Profile.id == profile_id)
+        .values({
+            Profile.rating_count: Profile.rating_count + 1,
+            Profile.rating_sum: Profile.rating_sum + score,
+            score_col: score_col + 1,
+        })
+    )
+
+
+def rebuild_rating_stats(conn):
+    """Recalcula los agregados de todos los perfiles desde la tabla ratings (sin commit)."""
+    def aggregate(expr, *where):
+        return (
+            select(func.coalesce(expr, 0))
+            .where(Rating.profile_id == Profile.id, *where)
+            .scalar_subquery()
+        )
+
+    values = {
+        Profile.rating_count: aggregate(func.count(Rating.id)),
+        Profile.rating_sum: aggregate(func.sum(Rating.score)),
+    }
+    for score in RATING_SCORES:
+        values[getattr(Profile, f"rating_{score}")] = aggregate(func.count(Rating.id), Rating.score == score)
+
+    conn.execute(update(Profile).values(values))
@@ -0,0 +1,327 @@
+"""
+Subidas reanudables (protocolo tus 1.0: core + creation, expiration, termination).
+
+Para los vídeos largos (Inmobiliaria, hasta 3 min / 600 MB) desde el móvil: si
+se corta la conexión, el cliente pregunta cuánto llegó (HEAD) y sigue desde
+ahí (PATCH con Upload-Offset) en vez de volver a empezar.
+
+    POST   /api/v1/uploads        Upload-Length, Upload-Metadata -> 201 + Location
+    HEAD   /api/v1/uploads/<id>   -> Upload-Offset
+    PATCH  /api/v1/uploads/<id>   Upload-Offset + bytes (application/offset+octet-stream)
+    DELETE /api/v1/uploads/<id>
+
+Cuando Upload-Offset == Upload-Length, la subida se entrega a la ruta de
+siempre: POST /offers/{id}/video?upload_id=<id> (o /products/{id}/video), que
+la trata igual que un multipart recibido (take_upload() -> StoredUpload).
+
+Solo con sesión: cada subida es del perfil que la creó (profile_id en el .json)
+y solo él puede consultarla, continuarla, borrarla o entregarla. Un perfil no
+puede tener más de RESUMABLE_MAX_OPEN_PER_PROFILE subidas abiertas a la vez
+(cada una reserva hasta RESUMABLE_MAX_BYTES en disco durante 24 h).
+
+El estado vive en disco, junto a los datos, en RESUMABLE_DIR:
+    <id>.part  bytes recibidos (su tamaño es el offset)
+    <id>.json  longitud total, metadatos, perfil y caducidad
+así lo ven los cuatro workers de gunicorn. Un PATCH a la vez por subida
+(flock sobre el .part; el segundo recibe 423). Las subidas sin actividad
+durante RESUMABLE_EXPIRES_S se borran (sweep periódico de resumable_uploads,
+que de paso limpia los temporales viejos de INCOMING_DIR).
+"""
+import asyncio
+import base64
+import binascii
+import fcntl
+import hashlib
+import json
+import os
+import re
+import secrets
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+from email.utils import formatdate
+
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+
+from app.services.uploads import (
+    INCOMING_DIR, REAL_ESTATE_VIDEO_MAX_BYTES, UPLOAD_CHUNK_SIZE, UPLOADS_DIR, StoredUpload, discard_upload,
+    too_large,
+)
+
+TUS_VERSION = "1.0.0"
+TUS_EXTENSIONS = "creation,expiration,termination"
+RESUMABLE_DIR = os.path.join(UPLOADS_DIR, ".resumable")
+RESUMABLE_EXPIRES_S = 24 * 60 * 60  # desde el último PATCH
+# El mayor límite de vídeo; cada ruta aplica el suyo al entregar la subida (take_upload)
+RESUMABLE_MAX_BYTES = REAL_ESTATE_VIDEO_MAX_BYTES
+RESUMABLE_MAX_OPEN_PER_PROFILE = 3
+SWEEP_INTERVAL_S = 10 * 60
+UPLOAD_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def _paths(upload_id: str) -> tuple:
+    if not UPLOAD_ID.fullmatch(upload_id or ""):
+        raise HTTPException(status_code=404, detail="Subida no encontrada.")
+    base = os.path.join(RESUMABLE_DIR, upload_id)
+    return f"{base}.part", f"{base}.json"
+
+
+def expires_header(expires_at: float) -> str:
+    return formatdate(expires_at, usegmt=True)
+
+
+def parse_metadata(header: str | None) -> dict:
+    """'filename ZmlsZS5tcDQ=,filetype dmlkZW8vbXA0' -> {"filename": "file.mp4", ...}"""
+    metadata = {}
+    for pair in (header or "").split(","):
+        parts = pair.strip().split(" ", 1)
+        if not parts[0]:
+            continue
+        try:
+            metadata[parts[0]] = base64.b64decode(parts[1]).decode("utf-8") if len(parts) > 1 else ""
+        except (binascii.Error, UnicodeDecodeError):
+            raise HTTPException(status_code=400, detail="Upload-Metadata no válido.")
+    return metadata
+
+
+def upload_status(upload_id: str, profile_id: int) -> dict:
+    """Metadatos + offset (bytes recibidos) + expires_at. 404 si no existe o caducó, 403 si es de otro perfil."""
+    part_path, meta_path = _paths(upload_id)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        offset = os.path.getsize(part_path)
+    except (OSError, ValueError):
+        raise HTTPException(status_code=404, detail="Subida no encontrada.")
+    if meta.get("profile_id") != profile_id:
+        raise HTTPException(status_code=403, detail="La subida es de otro perfil.")
+    expires_at = os.path.getmtime(part_path) + RESUMABLE_EXPIRES_S
+    if expires_at < time.time():
+        discard_resumable(upload_id)
+        raise HTTPException(status_code=404, detail="Subida caducada.")
+    return {**meta, "offset": offset, "expires_at": expires_at}
+
+
+def _open_uploads(profile_id: int) -> int:
+    """Subidas sin entregar ni caducar de este perfil (los .json de RESUMABLE_DIR)."""
+    now = time.time()
+    count = 0
+    for name in os.listdir(RESUMABLE_DIR):
+        upload_id, ext = os.path.splitext(name)
+        if ext != ".json" or not UPLOAD_ID.fullmatch(upload_id):
+            continue
+        part_path, meta_path = _paths(upload_id)
+        try:
+            with open(meta_path) as f:
+                owner = json.load(f).get("profile_id")
+            last_activity = os.path.getmtime(part_path)
+        except (OSError, ValueError):
+            continue
+        if owner == profile_id and last_activity + RESUMABLE_EXPIRES_S >= now:
+            count += 1
+    return count
+
+
+def create_upload(length: int, metadata: dict, profile_id: int) -> dict:
+    os.makedirs(RESUMABLE_DIR, exist_ok=True)
+    if _open_uploads(profile_id) >= RESUMABLE_MAX_OPEN_PER_PROFILE:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Ya tienes {RESUMABLE_MAX_OPEN_PER_PROFILE} subidas a medias: termina o borra alguna.",
+        )
+    upload_id = secrets.token_hex(16)
+    part_path, meta_path = _paths(upload_id)
+    open(part_path, "wb").close()
+    meta = {
+        "id": upload_id,
+        "length": length,
+        "filename": metadata.get("filename", ""),
+        "content_type": metadata.get("filetype", "").lower(),
+        "profile_id": profile_id,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    tmp_path = f"{meta_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+    return {**meta, "offset": 0, "expires_at": time.time() + RESUMABLE_EXPIRES_S}
+
+
+def _lock(f, upload_id: str):
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        raise HTTPException(status_code=423, detail=f"La subida {upload_id} está recibiendo datos.")
+
+
+async def append_chunk(upload_id: str, offset: int, request: Request, profile_id: int) -> dict:
+    """Añade el cuerpo de un PATCH en `offset`. Si se corta, lo recibido se queda (para reanudar)."""
+    meta = await run_in_threadpool(upload_status, upload_id, profile_id)
+    part_path, _ = _paths(upload_id)
+    try:
+        # r+b y no "ab": si take_upload() ya se la llevó, no se crea un .part vacío
+        f = await run_in_threadpool(open, part_path, "r+b")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Subida no encontrada.")
+    _lock(f, upload_id)
+    try:
+        current = f.seek(0, os.SEEK_END)
+        if offset != current:
+            raise HTTPException(status_code=409, detail=f"Upload-Offset no coincide (van {current} bytes).")
+        remaining = meta["length"] - current
+        buffer = bytearray()
+        try:
+            async for chunk in request.stream():
+                if len(chunk) > remaining:
+                    raise too_large(meta["length"])
+                remaining -= len(chunk)
+                buffer.extend(chunk)
+                if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                    await run_in_threadpool(f.write, bytes(buffer))
+                    buffer.clear()
+        except ClientDisconnect:
+            pass  # Se guarda lo que llegó; el cliente preguntará el offset con HEAD
+        finally:
+            if buffer:
+                await run_in_threadpool(f.write, bytes(buffer))
+            f.flush()
+        return {**meta, "offset": meta["length"] - remaining, "expires_at": time.time() + RESUMABLE_EXPIRES_S}
+    finally:
+        f.close()
+
+
+def take_upload(upload_id: str, max_bytes: int, profile_id: int) -> StoredUpload:
+    """
+    Subida terminada -> StoredUpload en INCOMING_DIR (como receive_upload), para
+    store_upload(). 409 si aún faltan bytes, 413 si pasa del límite de la ruta,
+    403 si es de otro perfil. Sync (lee el archivo para el sha256): llamar en el threadpool.
+    """
+    meta = upload_status(upload_id, profile_id)
+    part_path, meta_path = _paths(upload_id)
+    if meta["length"] > max_bytes:
+        raise too_large(max_bytes)
+    try:
+        f = open(part_path, "rb")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Subida no encontrada.")
+    _lock(f, upload_id)
+    try:
+        if os.fstat(f.fileno()).st_size != meta["length"]:
+            raise HTTPException(status_code=409, detail="La subida no está completa.")
+        digest = hashlib.sha256()
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+        os.makedirs(INCOMING_DIR, exist_ok=True)
+        tmp_path = os.path.join(INCOMING_DIR, f"{uuid.uuid4().hex}.part")
+        os.replace(part_path, tmp_path)
+        discard_upload(meta_path)
+    finally:
+        f.close()
+    return StoredUpload(
+        path=tmp_path,
+        size=meta["length"],
+        sha256=digest.hexdigest(),
+        filename=meta["filename"],
+        content_type=meta["content_type"],
+    )
+
+
+def discard_resumable(upload_id: str):
+    for path in _paths(upload_id):
+        discard_upload(path)
+
+
+def expire_uploads(now: float | None = None) -> int:
+    """Borra las subidas sin actividad desde hace RESUMABLE_EXPIRES_S. Devuelve cuántas."""
+    now = now or time.time()
+    expired = 0
+    try:
+        names = os.listdir(RESUMABLE_DIR)
+    except OSError:
+        return 0
+    for name in names:
+        upload_id, ext = os.path.splitext(name)
+        if ext != ".json" or not UPLOAD_ID.fullmatch(upload_id):
+            continue
+        part_path, meta_path = _paths(upload_id)
+        try:
+            last_activity = os.path.getmtime(part_path)
+        except OSError:
+            last_activity = os.path.getmtime(meta_path)  # .part ya entregado o perdido
+        if last_activity + RESUMABLE_EXPIRES_S < now:
+            discard_resumable(upload_id)
+            expired += 1
+    return expired
+
+
+def expire_incoming(now: float | None = None) -> int:
+    """Temporales de INCOMING_DIR olvidados (worker reiniciado a mitad de una subida o de ffmpeg)."""
+    now = now or time.time()
+    removed = 0
+    try:
+        entries = list(os.scandir(INCOMING_DIR))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.stat().st_mtime + RESUMABLE_EXPIRES_S >= now:
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.remove(entry.path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+class ResumableUploads:
+    """Sweep periódico de lo caducado (en cada worker; borrar dos veces no pasa nada)."""
+
+    def __init__(self):
+        self._task = None
+        self.expired = 0
+        self.incoming_removed = 0
+        self.last_sweep_ms = None
+
+    async def start(self):
+        if self._task:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            try:
+                self.expired += await run_in_threadpool(expire_uploads)
+                self.incoming_removed += await run_in_threadpool(expire_incoming)
+            except Exception as e:
+                print(f"DEBUG: subidas reanudables, error limpiando caducadas: {e}")
+            self.last_sweep_ms = round((time.perf_counter() - started) * 1000, 2)
+            await asyncio.sleep(SWEEP_INTERVAL_S)
+
+    def stats(self) -> dict:
+        try:
+            in_progress = sum(1 for name in os.listdir(RESUMABLE_DIR) if name.endswith(".json"))
+        except OSError:
+            in_progress = 0
+        return {
+            "in_progress": in_progress,
+            "expired": self.expired,
+            "incoming_removed": self.incoming_removed,
+            "last_sweep_ms": self.last_sweep_ms,
+        }
+
+
+resumable_uploads = ResumableUploads()
@@ -0,0 +1,157 @@
+"""
+Índice de texto completo para ofertas (título + descripción).
+
+- SQLite: tabla virtual FTS5 `offers_fts` (rowid = offers.id), ranking con bm25.
+- Postgres: tabla `offer_search` con un tsvector ('spanish') + índice GIN, ranking con ts_rank.
+
+El texto se normaliza en Python antes de indexarlo (minúsculas y sin tildes), así
+"fontaneria" encuentra "Fontanería" en ambos motores. En SQLite además aplicamos
+un stemmer ligero de español (FTS5 no trae uno); en Postgres lo hace el diccionario 'spanish'.
+
+El índice se mantiene sincronizado desde las rutas de ofertas (index_offer / unindex_offer)
+dentro de la misma transacción que el cambio de la oferta.
+"""
+import re
+import unicodedata
+
+from sqlalchemy import Float, Integer, inspect, text
+
+SPANISH_STOPWORDS = {
+    "a", "al", "con", "de", "del", "el", "en", "es", "la", "las", "lo", "los",
+    "mi", "o", "para", "por", "que", "se", "su", "un", "una", "unos", "unas", "y",
+}
+
+# Sufijos de más largo a más corto; solo se quita uno y el stem debe conservar >= 3 letras
+SPANISH_SUFFIXES = (
+    "amientos", "imientos", "amiento", "imiento", "aciones", "iciones", "uciones",
+    "adoras", "adores", "idades", "ancias", "encias", "mente", "acion", "icion",
+    "ucion", "adora", "ador", "idad", "ancia", "encia", "ismos", "istas", "ismo",
+    "ista", "ibles", "ables", "ible", "able", "erias", "eria", "eros", "eras",
+    "ero", "era", "ios", "ias", "io", "ia", "os", "as", "es", "o", "a", "e", "s",
+)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def fold_accents(value: str) -> str:
+    """'Fontanería' -> 'fontaneria' (minúsculas y sin diacríticos)."""
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def stem_es(word: str) -> str:
+    """Stemmer ligero de español: fontanería / fontanero / fontaneros -> 'fontan'."""
+    for suffix in SPANISH_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(value: str, stem: bool = True) -> list[str]:
+    words = [w for w in _WORD_RE.findall(fold_accents(value)) if w not in SPANISH_STOPWORDS]
+    return [stem_es(w) for w in words] if stem else words
+
+
+def _is_sqlite(bind) -> bool:
+    return bind.dialect.name == "sqlite"
+
+
+# -------------------------
+# CREACIÓN / BACKFILL
+# -------------------------
+def ensure_search_index(conn):
+    """Crea el índice si no existe y lo rellena con las ofertas existentes (ver migraciones)."""
+    if _is_sqlite(conn):
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS offers_fts USING fts5("
+            "title, description, tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+    else:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS offer_search ("
+            "offer_id INTEGER PRIMARY KEY REFERENCES offers(id) ON DELETE CASCADE, "
+            "document tsvector NOT NULL)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_offer_search_document ON offer_search USING GIN (document)"
+        ))
+
+    table = "offers_fts" if _is_sqlite(conn) else "offer_search"
+    indexed = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+    if indexed == 0 and inspect(conn).has_table("offers"):
+        rows = conn.execute(text("SELECT id, title, description FROM offers")).all()
+        for offer_id, title, description in rows:
+            _write_document(conn, offer_id, title, description)
+        if rows:
+            print(f"DEBUG: Índice de búsqueda rellenado con {len(rows)} ofertas")
+
+
+# -------------------------
+# SINCRONIZACIÓN
+# -------------------------
+def _write_document(conn, offer_id: int, title: str | None, description: str | None):
+    if _is_sqlite(conn):
+        conn.execute(text("DELETE FROM offers_fts WHERE rowid = :id"), {"id": offer_id})
+        conn.execute(
+            text("INSERT INTO offers_fts (rowid, title, description) VALUES (:id, :title, :description)"),
+            {
+                "id": offer_id,
+                "title": " ".join(tokenize(title or "")),
+                "description": " ".join(tokenize(description or "")),
+            },
+        )
+    else:
+        conn.execute(
+            text(
+                "INSERT INTO offer_search (offer_id, document) VALUES (:id, "
+                "setweight(to_tsvector('spanish', :title), 'A') || "
+                "setweight(to_tsvector('spanish', :description), 'B')) "
+                "ON CONFLICT (offer_id) DO UPDATE SET document = EXCLUDED.document"
+            ),
+            {"id": offer_id, "title": fold_accents(title or ""), "description": fold_accents(description or "")},
+        )
+
+
+def index_offer(db, offer):
+    """(Re)indexa una oferta. Llamar antes del commit, con offer.id ya asignado (flush)."""
+    _write_document(db.connection(), offer.id, offer.title, offer.description)
+
+
+def unindex_offer(db, offer_id: int):
+    conn = db.connection()
+    if _is_sqlite(conn):
+        conn.execute(text("DELETE FROM offers_fts WHERE rowid = :id"), {"id": offer_id})
+    else:
+        conn.execute(text("DELETE FROM offer_search WHERE offer_id = :id"), {"id": offer_id})
+
+
+# -------------------------
+# CONSULTA
+# -------------------------
+def text_search_subquery(db, q: str):
+    """
+    Subquery (offer_id, score) con las ofertas que casan con `q`.
+    score es ascendente (menor = más relevante) en ambos motores.
+    Devuelve None si `q` no tiene términos útiles (vacío o solo stopwords):
+    el llamador no debe quitar el filtro, sino caer a Offer.title.contains(q).
+    """
+    if _is_sqlite(db.get_bind()):
+        terms = tokenize(q)
+        if not terms:
+            return None
+        match = " ".join(f"{t}*" for t in terms)  # AND implícito + prefijo
+        stmt = text(
+            "SELECT rowid AS offer_id, bm25(offers_fts, 10.0, 1.0) AS score "
+            "FROM offers_fts WHERE offers_fts MATCH :match"
+        ).bindparams(match=match)
+    else:
+        terms = tokenize(q, stem=False)
+        if not terms:
+            return None
+        tsquery = " & ".join(f"{t}:*" for t in terms)
+        stmt = text(
+            "SELECT offer_id, -ts_rank(document, to_tsquery('spanish', :tsq)) AS score "
+            "FROM offer_search WHERE document @@ to_tsquery('spanish', :tsq)"
+        ).bindparams(tsq=tsquery)
+
+    return stmt.columns(offer_id=Integer, score=Float).subquery("fts")
@@ -0,0 +1,349 @@
+"""
+Almacenamiento de los archivos subidos (vídeos, fotos, versiones web, pósters).
+
+Backend según STORAGE:
+- local: disco del servidor (MEDIA_DIR), servido por /media (app/routes/media.py).
+  Solo sirve con una instancia: los archivos no se comparten entre máquinas.
+- s3: cualquier servicio compatible con S3 (AWS, MinIO, R2...). Las peticiones
+  se firman con SigV4 aquí mismo (httpx, sin boto3) y los archivos se sirven
+  desde S3_PUBLIC_URL (bucket público o CDN), no desde gunicorn.
+  Para probar en local: python -m app.scripts.s3_standin
+
+Las claves son nombres planos con hash o token (offer_12_video_<hex16>.mp4) y
+nunca se sobrescriben, así que todo se cachea como immutable.
+
+Subida directa: presign_put() devuelve una URL firmada para que el navegador
+suba el archivo sin pasar por los workers; después confirma la clave en la API
+(POST /offers/{id}/video/confirm). Con S3 el bucket necesita CORS que permita
+PUT desde el dominio de la app. Con el backend local la URL es PUT /media/<clave>
+firmada con SECRET_KEY: el cliente usa el mismo protocolo en los dos casos.
+"""
+import hashlib
+import hmac
+import mimetypes
+import os
+import re
+import shutil
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote, urlencode
+
+import httpx
+
+from app.core.config import settings
+
+MEDIA_DIR = "app/static/uploads"
+MEDIA_URL = "/media"
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+PRESIGN_EXPIRES_S = 15 * 60
+SOURCE_URL_EXPIRES_S = 2 * 60 * 60  # ffmpeg lee el original por URL mientras transcodifica
+SAFE_KEY = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]*")
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+
+class StorageError(Exception):
+    pass
+
+
+def content_type_for(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+class Storage:
+    name = "base"
+
+    def __init__(self):
+        self.puts = 0
+        self.bytes_put = 0
+        self.deletes = 0
+        self.presigned = 0
+        self.errors = 0
+
+    def url(self, key: str) -> str:
+        raise NotImplementedError
+
+    def key_for_url(self, url: str | None) -> str | None:
+        """Clave de una URL de este almacenamiento (None si es de otro sitio)."""
+        prefix = self.url("")
+        if not url or not url.startswith(prefix):
+            return None
+        key = url[len(prefix):]
+        return key if SAFE_KEY.fullmatch(key) else None
+
+    def put_file(self, path: str, key: str, content_type: str | None = None):
+        """Sube (o mueve) el archivo local `path` a `key`. El archivo local deja de existir."""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def size(self, key: str) -> int | None:
+        """Tamaño en bytes, o None si no existe."""
+        raise NotImplementedError
+
+    def source(self, key: str) -> str:
+        """Ruta local o URL firmada desde la que ffprobe / ffmpeg pueden leer el archivo."""
+        raise NotImplementedError
+
+    def fetch(self, key: str, dest: str):
+        """Copia el archivo a la ruta local `dest`."""
+        raise NotImplementedError
+
+    def presign_put(self, key: str, content_type: str, size: int, expires: int = PRESIGN_EXPIRES_S) -> dict:
+        """{"url", "method", "headers"} para que el cliente suba `size` bytes directamente."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "puts": self.puts,
+            "bytes_put": self.bytes_put,
+            "deletes": self.deletes,
+            "presigned": self.presigned,
+            "errors": self.errors,
+        }
+
+
+class LocalStorage(Storage):
+    name = "local"
+
+    def __init__(self, root: str = MEDIA_DIR, base_url: str = MEDIA_URL, secret: str = ""):
+        super().__init__()
+        self.root = root
+        self.base_url = base_url
+        self.secret = secret.encode()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def put_file(self, path: str, key: str, content_type: str | None = None):
+        size = os.path.getsize(path)
+        shutil.move(path, self.path(key))  # os.replace si está en el mismo disco (INCOMING_DIR)
+        self.puts += 1
+        self.bytes_put += size
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+            self.deletes += 1
+        except OSError:
+            pass
+
+    def size(self, key: str) -> int | None:
+        try:
+            return os.path.getsize(self.path(key))
+        except OSError:
+            return None
+
+    def source(self, key: str) -> str:
+        return self.path(key)
+
+    def fetch(self, key: str, dest: str):
+        shutil.copyfile(self.path(key), dest)
+
+    def _put_signature(self, key: str, content_type: str, size: int, expires_at: int) -> str:
+        message = f"PUT\n{key}\n{content_type}\n{size}\n{expires_at}"
+        return hmac.new(self.secret, message.encode(), hashlib.sha256).hexdigest()
+
+    def presign_put(self, key: str, content_type: str, size: int, expires: int = PRESIGN_EXPIRES_S) -> dict:
+        expires_at = int(time.time()) + expires
+        query = urlencode({
+            "expires": expires_at,
+            "size": size,
+            "signature": self._put_signature(key, content_type, size, expires_at),
+        })
+        self.presigned += 1
+        return {"url": f"{self.url(key)}?{query}", "method": "PUT", "headers": {"Content-Type": content_type}}
+
+    def verify_put(self, key: str, content_type: str, size: int, expires_at: int, signature: str) -> bool:
+        """Para PUT /media/<clave>: firma válida y sin caducar."""
+        if expires_at < time.time():
+            return False
+        expected = self._put_signature(key, content_type, size, expires_at)
+        return hmac.compare_digest(expected, signature)
+
+
+# -------------------------
+# SigV4 (S3)
+# -------------------------
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+def sigv4_signing_key(secret_key: str, date: str, region: str, service: str = "s3") -> bytes:
+    key = _hmac(f"AWS4{secret_key}".encode(), date)
+    key = _hmac(key, region)
+    key = _hmac(key, service)
+    return _hmac(key, "aws4_request")
+
+
+def _uri_encode(value: str, safe: str = "-_.~") -> str:
+    return quote(str(value), safe=safe)
+
+
+def canonical_query(params: dict) -> str:
+    return "&".join(f"{_uri_encode(k)}={_uri_encode(v)}" for k, v in sorted(params.items()))
+
+
+def sigv4_signature(
+    secret_key: str, region: str, amz_date: str, method: str, path: str,
+    query: dict, headers: dict, payload_hash: str,
+) -> tuple:
+    """(signed_headers, firma) de una petición. `path` ya codificado; `headers` incluye host."""
+    names = sorted(name.lower() for name in headers)
+    lowered = {name.lower(): value for name, value in headers.items()}
+    canonical_headers = "".join(f"{name}:{' '.join(str(lowered[name]).split())}\n" for name in names)
+    signed_headers = ";".join(names)
+    canonical_request = "\n".join([
+        method, path, canonical_query(query), canonical_headers, signed_headers, payload_hash,
+    ])
+    scope = f"{amz_date[:8]}/{region}/s3/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest(),
+    ])
+    signature = hmac.new(
+        sigv4_signing_key(secret_key, amz_date[:8], region), string_to_sign.encode(), hashlib.sha256,
+    ).hexdigest()
+    return signed_headers, signature
+
+
+class S3Storage(Storage):
+    name = "s3"
+
+    def __init__(self, endpoint: str, bucket: str, access_key: str, secret_key: str,
+                 region: str = "us-east-1", public_url: str = ""):
+        super().__init__()
+        self.endpoint = endpoint.rstrip("/")
+        self.host = httpx.URL(self.endpoint).netloc.decode()
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        # Direccionamiento por ruta (endpoint/bucket/clave): lo aceptan AWS, MinIO y R2
+        self.public_url = (public_url or f"{self.endpoint}/{bucket}").rstrip("/")
+        self._client = httpx.Client(timeout=httpx.Timeout(30.0, read=300.0, write=300.0))
+
+    def _path(self, key: str) -> str:
+        return f"/{_uri_encode(self.bucket)}/{_uri_encode(key)}"
+
+    def _amz_date(self) -> str:
+        return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    def _request(self, method: str, key: str, headers: dict | None = None,
+                 payload_hash: str = EMPTY_SHA256, **kwargs) -> httpx.Response:
+        amz_date = self._amz_date()
+        headers = {
+            **(headers or {}),
+            "host": self.host,
+            "x-amz-date": amz_date,
+            "x-amz-content-sha256": payload_hash,
+        }
+        signed_headers, signature = sigv4_signature(
+            self.secret_key, self.region, amz_date, method, self._path(key), {}, headers, payload_hash,
+        )
+        headers["Authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{amz_date[:8]}/{self.region}/s3/aws4_request, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        try:
+            return self._client.request(method, self.endpoint + self._path(key), headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.errors += 1
+            raise StorageError(f"S3 {method} {key}: {e}") from e
+
+    def presign(self, method: str, key: str, expires: int, headers: dict | None = None) -> str:
+        amz_date = self._amz_date()
+        headers = {**(headers or {}), "host": self.host}
+        query = {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key}/{amz_date[:8]}/{self.region}/s3/aws4_request",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires),
+            "X-Amz-SignedHeaders": ";".join(sorted(name.lower() for name in headers)),
+        }
+        _, signature = sigv4_signature(
+            self.secret_key, self.region, amz_date, method, self._path(key), query, headers, UNSIGNED_PAYLOAD,
+        )
+        query["X-Amz-Signature"] = signature
+        return f"{self.endpoint}{self._path(key)}?{canonical_query(query)}"
+
+    def _check(self, response: httpx.Response, *ok):
+        if response.status_code not in ok:
+            self.errors += 1
+            raise StorageError(f"S3 {response.request.method} -> {response.status_code}: {response.text[:200]}")
+
+    def url(self, key: str) -> str:
+        return f"{self.public_url}/{key}"
+
+    def put_file(self, path: str, key: str, content_type: str | None = None):
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            response = self._request(
+                "PUT", key,
+                headers={
+                    "Content-Type": content_type or content_type_for(key),
+                    "Content-Length": str(size),
+                    "Cache-Control": IMMUTABLE_CACHE,
+                },
+                payload_hash=UNSIGNED_PAYLOAD,
+                content=f,
+            )
+        self._check(response, 200)
+        os.remove(path)
+        self.puts += 1
+        self.bytes_put += size
+
+    def delete(self, key: str):
+        self._check(self._request("DELETE", key), 200, 204, 404)
+        self.deletes += 1
+
+    def size(self, key: str) -> int | None:
+        response = self._request("HEAD", key)
+        if response.status_code == 404:
+            return None
+        self._check(response, 200)
+        return int(response.headers.get("content-length", 0))
+
+    def source(self, key: str) -> str:
+        return self.presign("GET", key, SOURCE_URL_EXPIRES_S)
+
+    def fetch(self, key: str, dest: str):
+        try:
+            with open(dest, "wb") as f, self._client.stream("GET", self.source(key)) as response:
+                self._check(response, 200)
+                for chunk in response.iter_bytes(1024 * 1024):
+                    f.write(chunk)
+        except httpx.HTTPError as e:
+            self.errors += 1
+            raise StorageError(f"S3 GET {key}: {e}") from e
+
+    def presign_put(self, key: str, content_type: str, size: int, expires: int = PRESIGN_EXPIRES_S) -> dict:
+        # Content-Length firmado: S3 rechaza el PUT si el cuerpo no mide lo declarado
+        # (así se aplica el límite de tamaño sin que los bytes pasen por la app)
+        headers = {"Content-Type": content_type, "Cache-Control": IMMUTABLE_CACHE}
+        url = self.presign("PUT", key, expires, headers={**headers, "Content-Length": str(size)})
+        self.presigned += 1
+        return {"url": url, "method": "PUT", "headers": headers}
+
+    def stats(self) -> dict:
+        return {**super().stats(), "endpoint": self.endpoint, "bucket": self.bucket}
+
+
+def create_storage() -> Storage:
+    if settings.STORAGE == "s3":
+        return S3Storage(
+            endpoint=settings.S3_ENDPOINT,
+            bucket=settings.S3_BUCKET,
+            access_key=settings.S3_ACCESS_KEY,
+            secret_key=settings.S3_SECRET_KEY,
+            region=settings.S3_REGION,
+            public_url=settings.S3_PUBLIC_URL,
+        )
+    return LocalStorage(secret=settings.SECRET_KEY)
+
+
+storage = create_storage()
@@ -0,0 +1,377 @@
+"""
+Subida de archivos en streaming (vídeos y fotos de ofertas, productos y perfiles).
+
+receive_upload() lee el cuerpo multipart directamente de request.stream() con el
+parser incremental de python-multipart, en vez de usar UploadFile (que primero
+vuelca la petición entera a un temporal y luego la leíamos completa con
+file.read()). Así:
+- la memoria por subida es constante (un búfer de UPLOAD_CHUNK_SIZE),
+- el límite de bytes se comprueba mientras llegan los datos y se corta con 413
+  en cuanto se supera (o antes de leer nada si Content-Length ya lo excede),
+- el sha256 se calcula sobre la marcha.
+
+El archivo se escribe en UPLOADS_DIR/.incoming/ y store_upload() lo pasa al
+almacenamiento (app/services/storage.py: disco local o S3) con su nombre
+definitivo. Con el backend local es un os.replace (atómico: nunca se sirve un
+archivo a medias).
+
+El nombre definitivo lleva el hash del contenido (offer_12_video_<sha256[:16]>.mp4)
+y se sirve con caché immutable: un archivo nunca cambia bajo la misma URL, al
+reemplazarlo cambia la URL. El anterior se borra con discard_files() después de
+guardar el nuevo en BD.
+
+Subida directa (sin pasar por la app): new_upload_key() + storage.presign_put(),
+el cliente sube con PUT y la ruta /confirm comprueba la clave con
+check_direct_upload(). Esas claves llevan un token aleatorio en vez del hash:
+la app no ve los bytes, pero la clave tampoco se reutiliza nunca.
+"""
+import hashlib
+import os
+import re
+import secrets
+import shutil
+import tempfile
+import uuid
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from app.services.images import make_image_variants, pillow_available, variant_files
+from app.services.storage import MEDIA_DIR, MEDIA_URL, StorageError, content_type_for, storage
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    import multipart
+    from multipart.multipart import parse_options_header
+
+UPLOADS_DIR = MEDIA_DIR  # Temporales; y los archivos con STORAGE=local
+LEGACY_UPLOADS_URL = "/static/uploads"  # URLs guardadas antes de /media (siguen sirviéndose)
+CONTENT_HASH_CHARS = 16
+INCOMING_DIR = os.path.join(UPLOADS_DIR, ".incoming")
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Margen para cabeceras y separadores multipart al comparar con Content-Length
+MULTIPART_OVERHEAD = 64 * 1024
+
+MB = 1024 * 1024
+PHOTO_MAX_BYTES = 15 * MB
+VIDEO_MAX_BYTES = 80 * MB  # vídeos de 15 s
+REAL_ESTATE_VIDEO_MAX_BYTES = 600 * MB  # Inmobiliaria: hasta 3 minutos
+
+# Documenta el cuerpo en /docs (las rutas ya no declaran UploadFile)
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+def max_upload_bytes(kind: str, category: str | None = None) -> int:
+    """Límite por tipo ("photo" / "video") y categoría de la oferta."""
+    if kind == "photo":
+        return PHOTO_MAX_BYTES
+    if "Inmobiliaria" in (category or ""):
+        return REAL_ESTATE_VIDEO_MAX_BYTES
+    return VIDEO_MAX_BYTES
+
+
+@dataclass
+class StoredUpload:
+    path: str  # temporal en INCOMING_DIR hasta store_upload()
+    size: int
+    sha256: str
+    filename: str
+    content_type: str
+
+
+def too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Archivo demasiado grande. Máximo {max_bytes // MB} MB.",
+    )
+
+
+async def receive_upload(request: Request, max_bytes: int, field: str = "file") -> StoredUpload:
+    """Guarda el campo `field` del multipart en un temporal. 400 / 413 si no es válido."""
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Se esperaba multipart/form-data.")
+
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + MULTIPART_OVERHEAD:
+        raise too_large(max_bytes)
+
+    os.makedirs(INCOMING_DIR, exist_ok=True)
+    tmp_path = os.path.join(INCOMING_DIR, f"{uuid.uuid4().hex}.part")
+
+    state = {
+        "headers": {}, "header_field": b"", "header_value": b"",
+        "in_file": False, "found": False, "filename": "", "content_type": "",
+        "size": 0, "too_large": False,
+    }
+    digest = hashlib.sha256()
+    buffer = bytearray()
+
+    def on_part_begin():
+        state["headers"] = {}
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header_field"].lower()] = state["header_value"]
+        state["header_field"] = b""
+        state["header_value"] = b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        # Solo el primer campo con este nombre; el resto del formulario se ignora
+        state["in_file"] = disposition.get(b"name", b"").decode() == field and not state["found"]
+        if state["in_file"]:
+            state["found"] = True
+            state["filename"] = disposition.get(b"filename", b"").decode("utf-8", "replace")
+            state["content_type"] = state["headers"].get(b"content-type", b"").decode("latin-1")
+
+    def on_part_data(data, start, end):
+        if not state["in_file"] or state["too_large"]:
+            return
+        chunk = data[start:end]
+        state["size"] += len(chunk)
+        if state["size"] > max_bytes:
+            state["too_large"] = True
+            return
+        digest.update(chunk)
+        buffer.extend(chunk)
+
+    def on_part_end():
+        state["in_file"] = False
+
+    parser = multipart.MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    f = open(tmp_path, "wb")
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if state["too_large"]:
+                raise too_large(max_bytes)
+            if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                await run_in_threadpool(f.write, bytes(buffer))
+                buffer.clear()
+        parser.finalize()
+        if buffer:
+            await run_in_threadpool(f.write, bytes(buffer))
+            buffer.clear()
+        f.close()
+
+        if not state["found"]:
+            raise HTTPException(status_code=400, detail=f"Falta el archivo ('{field}').")
+        if state["size"] == 0:
+            raise HTTPException(status_code=400, detail="Archivo vacío.")
+    except BaseException:
+        f.close()
+        discard_upload(tmp_path)
+        raise
+
+    return StoredUpload(
+        path=tmp_path,
+        size=state["size"],
+        sha256=digest.hexdigest(),
+        filename=state["filename"],
+        content_type=state["content_type"].lower(),
+    )
+
+
+async def receive_body(request: Request, max_bytes: int) -> StoredUpload:
+    """Como receive_upload() pero con el cuerpo en crudo (PUT firmado a /media)."""
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise too_large(max_bytes)
+
+    os.makedirs(INCOMING_DIR, exist_ok=True)
+    tmp_path = os.path.join(INCOMING_DIR, f"{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    buffer = bytearray()
+    size = 0
+
+    f = open(tmp_path, "wb")
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > max_bytes:
+                raise too_large(max_bytes)
+            digest.update(chunk)
+            buffer.extend(chunk)
+            if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                await run_in_threadpool(f.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await run_in_threadpool(f.write, bytes(buffer))
+            buffer.clear()
+        f.close()
+
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Archivo vacío.")
+    except BaseException:
+        f.close()
+        discard_upload(tmp_path)
+        raise
+
+    return StoredUpload(
+        path=tmp_path,
+        size=size,
+        sha256=digest.hexdigest(),
+        filename="",
+        content_type=request.headers.get("content-type", "").lower(),
+    )
+
+
+def new_work_dir() -> str:
+    """Directorio temporal (en el mismo disco que UPLOADS_DIR) para archivos generados."""
+    os.makedirs(INCOMING_DIR, exist_ok=True)
+    return tempfile.mkdtemp(dir=INCOMING_DIR)
+
+
+def store_upload(upload: StoredUpload, name: str, ext: str) -> str:
+    """
+    Guarda el temporal como <name>_<hash><ext> en el almacenamiento. Devuelve la
+    URL pública. Sync (con S3 es una subida): llamar en el threadpool.
+    """
+    key = f"{name}_{upload.sha256[:CONTENT_HASH_CHARS]}{ext}"
+    try:
+        storage.put_file(upload.path, key, content_type_for(key))
+    except StorageError as e:
+        discard_upload(upload.path)
+        print(f"DEBUG: storage, error guardando {key}: {e}")
+        raise HTTPException(status_code=502, detail="No se pudo guardar el archivo.")
+    return storage.url(key)
+
+
+def store_photo_file(path: str, stem: str) -> tuple:
+    """
+    Foto en disco -> tamaños fijos en WebP + JPEG sin EXIF (app/services/images.py),
+    guardados como <stem>_<tamaño>.<ext>; `path` se borra. Devuelve (URL del JPEG
+    "full", photo_variants con URLs). Sync (CPU): llamar en el threadpool.
+    """
+    work_dir = new_work_dir()
+    try:
+        try:
+            variants = make_image_variants(path, work_dir, stem)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        for v in variants.values():
+            for fmt in ("webp", "jpeg"):
+                storage.put_file(os.path.join(work_dir, v[fmt]), v[fmt], content_type_for(v[fmt]))
+                v[fmt] = storage.url(v[fmt])
+    except StorageError as e:
+        print(f"DEBUG: storage, error guardando {stem}: {e}")
+        raise HTTPException(status_code=502, detail="No se pudo guardar el archivo.")
+    finally:
+        discard_upload(path)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return variants["full"]["jpeg"], variants
+
+
+def store_photo_upload(upload: StoredUpload, name: str, ext: str) -> tuple:
+    """
+    Foto subida -> store_photo_file(); el original no se guarda.
+    Sin Pillow: (URL del original, None). Sync (CPU): llamar en el threadpool.
+    """
+    if not pillow_available():
+        return store_upload(upload, name, ext), None
+    return store_photo_file(upload.path, f"{name}_{upload.sha256[:CONTENT_HASH_CHARS]}")
+
+
+def new_upload_key(name: str, ext: str) -> str:
+    """Clave para una subida directa: <name>_<token><ext> (mismo formato que las de hash)."""
+    return f"{name}_{secrets.token_hex(CONTENT_HASH_CHARS // 2)}{ext}"
+
+
+def check_direct_upload(key: str, name: str, max_bytes: int) -> int:
+    """
+    Comprueba una clave de subida directa antes de guardarla en BD: que sea de
+    este recurso (no otra oferta) y que el archivo exista y no pase del límite.
+    Devuelve el tamaño. Sync (HEAD a S3): llamar en el threadpool.
+    """
+    if not re.fullmatch(rf"{re.escape(name)}_[0-9a-f]{{{CONTENT_HASH_CHARS}}}\.[a-z0-9]+", key or ""):
+        raise HTTPException(status_code=400, detail="Clave de subida no válida.")
+    try:
+        size = storage.size(key)
+    except StorageError as e:
+        print(f"DEBUG: storage, error comprobando {key}: {e}")
+        raise HTTPException(status_code=502, detail="No se pudo comprobar el archivo subido.")
+    if not size:
+        raise HTTPException(status_code=400, detail="No se ha recibido el archivo.")
+    if size > max_bytes:
+        discard_files(storage.url(key))
+        raise too_large(max_bytes)
+    return size
+
+
+def photo_files(photo_url: str | None, variants: dict | None) -> list:
+    """URLs de una foto y todas sus variantes (para discard_files)."""
+    return [photo_url, *variant_files(variants)]
+
+
+def _local_file(url: str) -> str | None:
+    # /media/... (STORAGE=local, o guardadas antes de pasar a S3) y /static/uploads/...
+    if url.startswith(MEDIA_URL + "/") or url.startswith(LEGACY_UPLOADS_URL + "/"):
+        return os.path.join(UPLOADS_DIR, os.path.basename(url))
+    return None
+
+
+def is_upload_url(url: str | None) -> bool:
+    return bool(url) and (storage.key_for_url(url) is not None or _local_file(url) is not None)
+
+
+def media_source(url: str) -> str:
+    """URL pública -> ruta en disco o URL firmada que pueden leer ffprobe / ffmpeg."""
+    key = storage.key_for_url(url)
+    return storage.source(key) if key else _local_file(url)
+
+
+def discard_files(*urls, keep=()):
+    """
+    Borra los archivos subidos de estas URLs (las que no sean de uploads o estén
+    en keep se ignoran). Con S3 son peticiones: desde rutas async, en el threadpool.
+    """
+    for url in urls:
+        if not is_upload_url(url) or url in keep:
+            continue
+        key = storage.key_for_url(url)
+        if key is None:
+            discard_upload(_local_file(url))
+            continue
+        try:
+            storage.delete(key)
+        except (StorageError, OSError) as e:
+            print(f"DEBUG: storage, no se pudo borrar {key}: {e}")
+
+
+def discard_upload(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,165 @@
+"""
+Utilidades de vídeo con ffprobe / ffmpeg.
+
+Funciones puras (sin BD ni FastAPI): se ejecutan en los procesos del pool de
+app/services/media_jobs.py. Este módulo es lo único que importan esos procesos,
+así que no debe importar nada de la app.
+"""
+import json
+import os
+import subprocess
+
+PROBE_TIMEOUT_S = 60
+TRANSCODE_TIMEOUT_S = 15 * 60
+VIDEO_MAX_SECONDS = 15.0
+REAL_ESTATE_VIDEO_MAX_SECONDS = 180.0  # Inmobiliaria: hasta 3 minutos
+
+# Escalera de calidades (lado corto, bitrate máximo de vídeo). Nunca se amplía:
+# solo se generan las que caben en el original, y siempre al menos la última.
+RENDITIONS = (
+    ("720p", 720, "2500k"),
+    ("480p", 480, "900k"),
+)
+POSTER_SIZE = 720
+
+
+def max_video_seconds(category: str | None) -> float:
+    return REAL_ESTATE_VIDEO_MAX_SECONDS if "Inmobiliaria" in (category or "") else VIDEO_MAX_SECONDS
+
+
+def duration_error(duration: float, category: str | None) -> str | None:
+    """Mensaje para el usuario si el vídeo supera el máximo de su categoría."""
+    limit = max_video_seconds(category)
+    if duration <= limit:
+        return None
+    if limit > VIDEO_MAX_SECONDS:
+        return f"Vídeo demasiado largo ({duration:.1f}s). Máximo {int(limit / 60)} minutos para Inmobiliaria."
+    return f"Vídeo demasiado largo ({duration:.1f}s). Máximo {int(limit)}s."
+
+
+def _number(value, cast=float):
+    # ffprobe pone "N/A" si no lo sabe (p. ej. duración de webm grabados con MediaRecorder)
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def probe_video(path: str) -> dict:
+    """
+    Duración y datos del primer stream de vídeo.
+    FileNotFoundError si no hay ffprobe; CalledProcessError / ValueError si el archivo no es válido.
+    """
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=PROBE_TIMEOUT_S,
+    )
+    data = json.loads(result.stdout or "{}")
+    fmt = data.get("format") or {}
+    video = next((s for s in data.get("streams", []) if s.get("codec_type") == "video"), {})
+    audio = next((s for s in data.get("streams", []) if s.get("codec_type") == "audio"), None)
+
+    return {
+        "duration": _number(fmt.get("duration")) or _number(video.get("duration")),
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "codec": video.get("codec_name"),
+        "audio_codec": audio.get("codec_name") if audio else None,
+        "format": fmt.get("format_name"),
+        "bit_rate": _number(fmt.get("bit_rate"), int),
+        "size": _number(fmt.get("size"), int),
+    }
+
+
+def inspect_video(path: str) -> dict:
+    """
+    Lo que ejecuta el pool de media_jobs. Nunca lanza: si ffprobe no está o no
+    entiende el archivo devuelve {"probed": False, ...} y el vídeo NO se bloquea
+    (mismo criterio que la validación inline de antes).
+    """
+    try:
+        return {"probed": True, **probe_video(path)}
+    except FileNotFoundError:
+        return {"probed": False, "error": "ffprobe no disponible"}
+    except subprocess.TimeoutExpired:
+        return {"probed": False, "error": "ffprobe tardó demasiado"}
+    except (subprocess.CalledProcessError, ValueError) as e:
+        return {"probed": False, "error": str(e)[:200]}
+
+
+def _scale_filter(short_side: int) -> str:
+    # Lado corto = short_side (sin ampliar), sirve igual para vídeos verticales y horizontales
+    return (
+        f"scale='if(gt(iw,ih),-2,min({short_side},iw))':'if(gt(iw,ih),min({short_side},ih),-2)'"
+    )
+
+
+def _run_ffmpeg(args: list, out_path: str):
+    # Se escribe en un temporal y se renombra: nunca se sirve un archivo a medias
+    tmp_path = f"{out_path}.part"
+    try:
+        subprocess.run(
+            ["ffmpeg", "-y", "-v", "error", *args, tmp_path],
+            capture_output=True,
+            check=True,
+            timeout=TRANSCODE_TIMEOUT_S,
+        )
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def rendition_ladder(info: dict) -> list:
+    short = min(info.get("width") or 0, info.get("height") or 0)
+    ladder = [r for r in RENDITIONS if short and r[1] <= short]
+    return ladder or [RENDITIONS[-1]]
+
+
+def make_renditions(path: str, info: dict, out_dir: str, stem: str) -> dict:
+    """
+    MP4 H.264/AAC con faststart (moov al principio: empieza a reproducirse sin
+    descargar el archivo entero) para cada calidad de rendition_ladder(), más un
+    póster JPEG. Se escriben en out_dir: <stem>_480p.mp4, <stem>_poster.jpg.
+    `path` puede ser una URL (firmada) si el original está en S3.
+
+    Lo que ejecuta el pool de media_jobs después de validar. Nunca lanza:
+    {"renditions": {"480p": "archivo.mp4", ...}, "poster": "archivo.jpg" | None, "error": ...}
+    """
+    result = {"renditions": {}, "poster": None, "error": None}
+
+    try:
+        for label, short_side, max_rate in rendition_ladder(info):
+            filename = f"{stem}_{label}.mp4"
+            _run_ffmpeg([
+                "-i", path,
+                "-vf", _scale_filter(short_side),
+                "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "main", "-pix_fmt", "yuv420p",
+                "-crf", "26", "-maxrate", max_rate, "-bufsize", f"{int(max_rate[:-1]) * 2}k",
+                "-c:a", "aac", "-b:a", "96k", "-ac", "2",
+                "-movflags", "+faststart",
+                "-f", "mp4",
+            ], os.path.join(out_dir, filename))
+            result["renditions"][label] = filename
+
+        # Fotograma a 1 s (o a mitad si es más corto) para que no salga negro
+        duration = info.get("duration") or 0
+        at = min(1.0, duration / 2) if duration else 0
+        filename = f"{stem}_poster.jpg"
+        _run_ffmpeg([
+            "-ss", f"{at:.2f}", "-i", path,
+            "-frames:v", "1", "-vf", _scale_filter(POSTER_SIZE), "-q:v", "4",
+            "-f", "image2",
+        ], os.path.join(out_dir, filename))
+        result["poster"] = filename
+    except FileNotFoundError:
+        result["error"] = "ffmpeg no disponible"
+    except subprocess.TimeoutExpired:
+        result["error"] = "ffmpeg tardó demasiado"
+    except subprocess.CalledProcessError as e:
+        result["error"] = (e.stderr or b"").decode("utf-8", "replace")[-200:] or str(e)
+    return result
+
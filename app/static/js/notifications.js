@@ -1,8 +1,13 @@
 /* Notificaciones y Alarma Sonora */
 
 // Configuración
-const POLL_INTERVAL = 10000; // 10 segundos
+// Canal principal: Server-Sent Events (/api/v1/interests/stream).
+// El poll queda como respaldo: cada 10 s si no hay SSE, y uno lento mientras
+// el stream está abierto (cubre eventos perdidos durante reconexiones).
+const POLL_INTERVAL = 10000; // 10 segundos (sin SSE)
+const SAFETY_POLL_INTERVAL = 120000; // 2 minutos (con SSE abierto)
 let lastInterestId = parseInt(localStorage.getItem('lastInterestId') || '0');
+let pollTimer = null;
 let audioCtx = null;
 
 // Solicitar permiso de notificaciones al cargar
@@ -39,46 +44,88 @@ function playAlarm() {
     osc.stop(audioCtx.currentTime + 2); // Sonar 2 segundos
 }
 
-// Función de Polling
+// Aviso al usuario (alarma + vibración + notificación)
+function notifyNewInterests(data) {
+    if (!data.has_new || data.last_id <= lastInterestId) {
+        return;
+    }
+    console.log("¡Nuevos intereses detectados!", data);
+
+    // Actualizar ID
+    lastInterestId = data.last_id;
+    localStorage.setItem('lastInterestId', lastInterestId);
+
+    // 1. Alarma Sonora
+    playAlarm();
+
+    // 2. Vibración (móvil)
+    if (navigator.vibrate) {
+        navigator.vibrate([500, 200, 500, 200, 1000]);
+    }
+
+    // 3. Notificación Visual
+    if (Notification.permission === "granted") {
+        new Notification("¡Nueva Oferta de Interés!", {
+            body: `Tienes ${data.count} persona(s) interesada(s) en tus ofertas.`,
+            icon: "/static/img/logo.png" // Asegurar que existe o usar placeholder
+        });
+    } else {
+        alert(`¡ALERTA! Tienes ${data.count} nuevo(s) interesado(s).`);
+    }
+}
+
+// Función de Polling (respaldo y recuperación al reconectar)
 async function checkNewInterests() {
     try {
-        // Obtenemos el ID más alto conocido por el servidor o el local
         // El endpoint recibe el último ID que conocíamos
         const res = await fetch(`/api/v1/interests/poll?last_id=${lastInterestId}`);
         const data = await res.json();
-
-        if (data.has_new && data.last_id > lastInterestId) {
-            console.log("¡Nuevos intereses detectados!", data);
-
-            // Actualizar ID
-            lastInterestId = data.last_id;
-            localStorage.setItem('lastInterestId', lastInterestId);
-
-            // 1. Alarma Sonora
-            playAlarm();
-
-            // 2. Vibración (móvil)
-            if (navigator.vibrate) {
-                navigator.vibrate([500, 200, 500, 200, 1000]);
-            }
-
-            // 3. Notificación Visual
-            if (Notification.permission === "granted") {
-                new Notification("¡Nueva Oferta de Interés!", {
-                    body: `Tienes ${data.count} persona(s) interesada(s) en tus ofertas.`,
-                    icon: "/static/img/logo.png" // Asegurar que existe o usar placeholder
-                });
-            } else {
-                alert(`¡ALERTA! Tienes ${data.count} nuevo(s) interesado(s).`);
-            }
-        }
+        notifyNewInterests(data);
     } catch (e) {
         console.error("Error polling intereses:", e);
     }
 }
 
-// Iniciar Loop
-setInterval(checkNewInterests, POLL_INTERVAL);
+function startPolling(interval) {
+    if (pollTimer) {
+        clearInterval(pollTimer);
+    }
+    pollTimer = setInterval(checkNewInterests, interval);
+}
+
+// Canal SSE
+function startStream() {
+    if (!window.EventSource) {
+        startPolling(POLL_INTERVAL);
+        return;
+    }
+
+    const source = new EventSource('/api/v1/interests/stream');
+
+    source.addEventListener('open', () => {
+        // Recuperar lo ocurrido mientras no estábamos conectados
+        checkNewInterests();
+        startPolling(SAFETY_POLL_INTERVAL);
+    });
+
+    source.addEventListener('interest', (e) => {
+        try {
+            notifyNewInterests(JSON.parse(e.data));
+        } catch (err) {
+            console.error("Evento SSE inválido:", err);
+        }
+    });
+
+    source.addEventListener('error', () => {
+        // EventSource reintenta solo; si lo da por cerrado (p. ej. 401) volvemos al poll
+        if (source.readyState === EventSource.CLOSED) {
+            startPolling(POLL_INTERVAL);
+        }
+    });
+}
+
+// Iniciar
+startStream();
 
 // Desbloqueo de AudioContext con primera interacción
 document.addEventListener('click', function () {
@@ -1,4 +1,4 @@
-const CACHE_NAME = 'ofrezco-v1';
+const CACHE_NAME = 'ofrezco-v2'; // v2: borra los vídeos/fotos que cacheaba v1
 const APP_SHELL = [
   '/ui',
   '/static/css/app.css',
@@ -23,8 +23,15 @@ self.addEventListener('activate', (event) => {
 self.addEventListener('fetch', (event) => {
   const req = event.request;
   if (req.method !== 'GET') return;
+  // Subidas de usuarios: ya las cachea el navegador (/media es immutable) y los
+  // vídeos piden Range (206), que la Cache API no sabe guardar. Directo a red.
+  // Con STORAGE=s3 vienen de otro origen (bucket / CDN): tampoco se cachean aquí.
+  const url = new URL(req.url);
+  if (url.origin !== self.location.origin) return;
+  if (req.headers.has('range') || url.pathname.startsWith('/media/') || url.pathname.startsWith('/static/uploads/')) return;
   event.respondWith(
     caches.match(req).then((cached) => cached || fetch(req).then((resp) => {
+      if (resp.status !== 200) return resp;
       const copy = resp.clone();
       caches.open(CACHE_NAME).then((cache) => cache.put(req, copy)).catch(() => {});
       return resp;
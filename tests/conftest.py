@@ -0,0 +1,82 @@
+"""
+Configuración común de los tests: se ejecutan desde la raíz del repo con
+
+    python -m pytest -q
+
+La app lee la configuración del entorno al importarse, así que aquí se fija
+antes de cualquier import de `app`: SQLite en un directorio temporal y sin la
+caché de /ui/results (los tests miden consultas, no aciertos de caché).
+"""
+import os
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix="ofrezco-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'app.db')}"
+os.environ["RESULTS_CACHE_TTL"] = "0"
+os.environ["AUTO_MIGRATE"] = "false"
+
+import base64  # noqa: E402
+import json  # noqa: E402
+from contextlib import contextmanager  # noqa: E402
+
+import itsdangerous  # noqa: E402
+import pytest  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    """La app con la BD de test ya migrada (sin los eventos de arranque: ni backplane ni ffmpeg)."""
+    from app.db.migrations import run_migrations
+    from app.db.session import engine
+    from app.main import app as fastapi_app
+
+    run_migrations(engine)
+    return fastapi_app
+
+
+@pytest.fixture
+def client(app):
+    from fastapi.testclient import TestClient
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def login(client):
+    """login(user_id=..., profile_id=...) -> pone la cookie de sesión firmada en el cliente."""
+    from app.core.config import settings
+
+    def _login(**session):
+        data = base64.b64encode(json.dumps(session).encode("utf-8"))
+        # La app reenvía la cookie en cada respuesta: sin esto, cambiar de sesión dejaría dos
+        client.cookies.clear()
+        client.cookies.set("session", itsdangerous.TimestampSigner(settings.SECRET_KEY).sign(data).decode("utf-8"))
+
+    return _login
+
+
+@pytest.fixture
+def count_selects(app):
+    """with count_selects() as statements: ... -> las SELECT ejecutadas dentro del bloque."""
+    from app.db.session import async_engine, engine
+
+    @contextmanager
+    def _count_selects():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append(statement)
+
+        # Las rutas de lectura van por el engine async; el sync por si alguna vuelve a él
+        targets = (engine, async_engine.sync_engine)
+        for target in targets:
+            event.listen(target, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            for target in targets:
+                event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+    return _count_selects
@@ -0,0 +1,87 @@
+-- Esquema de la base de datos creada por la versión inicial (init_db antes de las migraciones).
+-- Punto de partida de tests/test_migrations.py: las migraciones deben llevarlo hasta hoy.
+
+CREATE TABLE users (
+	id INTEGER NOT NULL,
+	email VARCHAR NOT NULL,
+	name VARCHAR NOT NULL,
+	PRIMARY KEY (id)
+);
+
+CREATE UNIQUE INDEX ix_users_email ON users (email);
+
+CREATE INDEX ix_users_id ON users (id);
+
+CREATE TABLE profiles (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	profile_type VARCHAR NOT NULL,
+	description VARCHAR,
+	photo VARCHAR,
+	phone VARCHAR,
+	video_url VARCHAR,
+	available_now BOOLEAN,
+	lat VARCHAR,
+	lon VARCHAR,
+	address VARCHAR,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE INDEX ix_profiles_user_id ON profiles (user_id);
+
+CREATE INDEX ix_profiles_id ON profiles (id);
+
+CREATE TABLE offers (
+	id INTEGER NOT NULL,
+	profile_id INTEGER NOT NULL,
+	offer_kind VARCHAR NOT NULL,
+	category VARCHAR NOT NULL,
+	title VARCHAR NOT NULL,
+	description VARCHAR,
+	price FLOAT,
+	currency VARCHAR NOT NULL,
+	available_now BOOLEAN NOT NULL,
+	allergens VARCHAR,
+	status VARCHAR NOT NULL,
+	video_path VARCHAR,
+	photo_path VARCHAR,
+	extra_info JSON,
+	created_at DATETIME NOT NULL,
+	updated_at DATETIME NOT NULL,
+	PRIMARY KEY (id),
+	FOREIGN KEY(profile_id) REFERENCES profiles (id)
+);
+
+CREATE INDEX ix_offers_id ON offers (id);
+
+CREATE INDEX ix_offers_profile_id ON offers (profile_id);
+
+CREATE TABLE ratings (
+	id INTEGER NOT NULL,
+	profile_id INTEGER NOT NULL,
+	author_id INTEGER NOT NULL,
+	score INTEGER NOT NULL,
+	comment VARCHAR,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(profile_id) REFERENCES profiles (id),
+	FOREIGN KEY(author_id) REFERENCES users (id)
+);
+
+CREATE INDEX ix_ratings_id ON ratings (id);
+
+CREATE INDEX ix_ratings_profile_id ON ratings (profile_id);
+
+CREATE TABLE interests (
+	id INTEGER NOT NULL,
+	offer_id INTEGER NOT NULL,
+	interested_user_id INTEGER,
+	status VARCHAR,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(offer_id) REFERENCES offers (id),
+	FOREIGN KEY(interested_user_id) REFERENCES users (id)
+);
+
+CREATE INDEX ix_interests_id ON interests (id);
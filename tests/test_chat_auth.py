@@ -0,0 +1,27 @@
+"""El historial y el WebSocket del chat solo son accesibles para el perfil de la sesión."""
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+
+def test_history_requires_session_profile(client):
+    assert client.get("/api/v1/chat/history", params={"me": 1, "other": 2}).status_code == 403
+
+
+def test_history_rejects_other_profile(client, login):
+    login(user_id=3, profile_id=3)
+    assert client.get("/api/v1/chat/history", params={"me": 1, "other": 2}).status_code == 403
+
+
+def test_history_allows_own_conversation(client, login):
+    login(user_id=1, profile_id=1)
+    response = client.get("/api/v1/chat/history", params={"me": 1, "other": 2})
+    assert response.status_code == 200
+    assert response.json()["messages"] == []
+
+
+def test_websocket_rejects_other_profile(client, login):
+    login(user_id=3, profile_id=3)
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with client.websocket_connect("/api/v1/ws/chat?me=1&other=2") as ws:
+            ws.receive_text()
+    assert exc.value.code == 1008
@@ -0,0 +1,73 @@
+"""
+Cola de salida por conexión del chat: los desbordes solo cierran la conexión si
+se repiten sin que el cliente llegue a vaciar la cola.
+"""
+import asyncio
+
+from app.services.chat_connections import MAX_OVERFLOWS, SEND_QUEUE_SIZE, ChatConnection
+
+
+class SlowWebSocket:
+    """send_text() espera hasta que el test abre la puerta."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.sent = []
+        self.closed_with = None
+
+    async def send_text(self, payload):
+        await self.gate.wait()
+        self.sent.append(payload)
+
+    async def close(self, code):
+        self.closed_with = code
+
+
+async def until(condition, ticks: int = 50):
+    """Deja correr al writer hasta que se cumpla la condición."""
+    for _ in range(ticks):
+        if condition():
+            return True
+        await asyncio.sleep(0)
+    return condition()
+
+
+def overflow(conn):
+    for i in range(SEND_QUEUE_SIZE + 1):
+        conn.offer(f"m{i}")
+
+
+def test_overflows_reset_after_drain():
+    async def scenario():
+        ws = SlowWebSocket()
+        conn = ChatConnection(ws, room=(1, 2))
+        conn.start()
+        try:
+            # Más desbordes que MAX_OVERFLOWS, pero poniéndose al día entre uno y otro
+            for _ in range(MAX_OVERFLOWS + 1):
+                overflow(conn)
+                assert conn.overflows == 1
+                ws.gate.set()
+                assert await until(lambda: conn.overflows == 0)
+                ws.gate.clear()
+            assert not conn.closed
+        finally:
+            await conn.stop()
+
+    asyncio.run(scenario())
+
+
+def test_repeated_overflows_without_drain_close_connection():
+    async def scenario():
+        ws = SlowWebSocket()
+        conn = ChatConnection(ws, room=(1, 2))
+        conn.start()
+        try:
+            for _ in range(MAX_OVERFLOWS + 1):
+                overflow(conn)
+            assert conn.closed
+            assert await until(lambda: ws.closed_with == 1013)
+        finally:
+            await conn.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,140 @@
+"""
+Pools de media: la validación (ffprobe) tiene su propio pool y no espera a las
+transcodificaciones; un vídeo se reclama (PROCESSING) solo cuando hay un
+proceso libre; y un pool roto se cierra y se sustituye una sola vez.
+"""
+import asyncio
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services import media_jobs as media_jobs_module
+from app.services.media_jobs import READY, REJECTED, MediaJobs, WorkerPool
+
+
+class FakeExecutor:
+    """Cada submit() devuelve un Future que resuelve el test."""
+
+    def __init__(self):
+        self.futures = []
+        self.shutdowns = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shutdowns.append({"wait": wait, "cancel_futures": cancel_futures})
+
+
+class BrokenExecutor(FakeExecutor):
+    def submit(self, fn, *args):
+        future = super().submit(fn, *args)
+        future.set_exception(BrokenProcessPool("hijo caído"))
+        return future
+
+
+async def until(condition, timeout: float = 2.0):
+    """Deja correr a las tareas (y al threadpool de claim_job / record_result) hasta que se cumpla."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition() and loop.time() < deadline:
+        await asyncio.sleep(0.005)
+    return condition()
+
+
+@pytest.fixture
+def jobs(monkeypatch, tmp_path):
+    claims = []
+
+    def claim_job(offer_id):
+        claims.append(offer_id)
+        return f"/uploads/video_{offer_id}.mp4"
+
+    monkeypatch.setattr(WorkerPool, "_new_executor", lambda self: FakeExecutor())
+    monkeypatch.setattr(media_jobs_module, "claim_job", claim_job)
+    monkeypatch.setattr(media_jobs_module, "release_jobs", lambda offer_ids: None)
+    monkeypatch.setattr(media_jobs_module, "new_work_dir", lambda: str(tmp_path))
+    monkeypatch.setattr(media_jobs_module, "media_source", lambda url: url)
+    jobs = MediaJobs()
+    jobs._probes.workers = jobs._transcodes.workers = 1
+    jobs.claims = claims
+    return jobs
+
+
+def start_pools(jobs):
+    jobs._probes.start()
+    jobs._transcodes.start()
+
+
+def test_claims_only_when_a_probe_worker_is_free(jobs, monkeypatch):
+    monkeypatch.setattr(media_jobs_module, "record_result", lambda *args: REJECTED)
+
+    async def scenario():
+        start_pools(jobs)
+        jobs.submit(1)
+        jobs.submit(2)
+        assert await until(lambda: len(jobs._probes.executor.futures) == 1)
+        # El 2 espera un proceso sin haberse reclamado (sigue PENDING en la BD)
+        assert jobs.claims == [1]
+        assert (jobs.stats()["queued"], jobs.stats()["running"]) == (1, 1)
+
+        jobs._probes.executor.futures[0].set_result({"probed": True, "duration": 10})
+        assert await until(lambda: len(jobs._probes.executor.futures) == 2)
+        assert jobs.claims == [1, 2]
+        assert (jobs.stats()["queued"], jobs.stats()["running"]) == (0, 1)
+        await jobs.stop()
+
+    asyncio.run(scenario())
+
+
+def test_probe_does_not_wait_for_transcodes(jobs, monkeypatch):
+    monkeypatch.setattr(media_jobs_module, "record_result", lambda *args: READY)
+
+    async def scenario():
+        start_pools(jobs)
+        for offer_id in (1, 2, 3):
+            jobs.submit(offer_id)
+        for probe in range(3):
+            assert await until(lambda: len(jobs._probes.executor.futures) > probe)
+            jobs._probes.executor.futures[probe].set_result({"probed": True, "duration": 10})
+        # Las tres validadas (READY) aunque ffmpeg sigue con la primera
+        assert await until(lambda: jobs._transcodes.waiting == 2)
+        assert jobs.claims == [1, 2, 3]
+        assert jobs.ready == 3
+        assert len(jobs._transcodes.executor.futures) == 1
+        assert jobs._transcodes.running == 1
+        await jobs.stop()
+
+    asyncio.run(scenario())
+
+
+def test_transcode_replaces_broken_pool(jobs):
+    async def scenario():
+        start_pools(jobs)
+        broken = jobs._transcodes.executor = BrokenExecutor()
+        async with jobs._transcodes.slot():
+            await jobs._transcode(1, "/uploads/video.mp4", {"probed": True})
+        return broken
+
+    broken = asyncio.run(scenario())
+    assert broken.shutdowns == [{"wait": False, "cancel_futures": True}]
+    assert isinstance(jobs._transcodes.executor, FakeExecutor) and jobs._transcodes.executor is not broken
+    assert (jobs.transcode_errors, jobs.transcoded) == (1, 0)
+
+
+def test_broken_pool_replaced_once(jobs):
+    async def scenario():
+        jobs._probes.start()
+        broken = jobs._probes.executor = BrokenExecutor()
+        results = await asyncio.gather(
+            *(jobs._probes.run(len, "x") for _ in range(3)), return_exceptions=True,
+        )
+        assert all(isinstance(r, BrokenProcessPool) for r in results)
+        return broken
+
+    broken = asyncio.run(scenario())
+    assert len(broken.shutdowns) == 1
+    assert jobs._probes.executor is not broken
@@ -0,0 +1,75 @@
+"""Las migraciones llevan una base de datos de la versión inicial hasta el esquema actual."""
+import json
+import os
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+
+from app.db.migrations import MIGRATIONS, run_migrations
+from app.models.offer import Offer
+from app.models.offer_real_estate import OfferRealEstate
+from app.models.profile import Profile
+
+BASELINE_SCHEMA = os.path.join(os.path.dirname(__file__), "fixtures", "baseline_schema.sql")
+
+
+def baseline_engine(path):
+    engine = create_engine(f"sqlite:///{path}")
+    raw = engine.raw_connection()
+    try:
+        with open(BASELINE_SCHEMA) as f:
+            raw.driver_connection.executescript(f.read())
+        raw.commit()
+    finally:
+        raw.close()
+    return engine
+
+
+def seed_baseline(engine):
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email, name) VALUES (1, 'a@example.com', 'Ana')"))
+        conn.execute(text(
+            "INSERT INTO profiles (id, user_id, profile_type, lat, lon) VALUES (1, 1, 'OFERTANTE', '40.4', '-3.7')"
+        ))
+        offer = (
+            "INSERT INTO offers (id, profile_id, offer_kind, category, title, currency, available_now, "
+            "status, extra_info, created_at, updated_at) VALUES "
+            "(:id, 1, 'PRODUCT', :category, :title, 'EUR', 0, 'PUBLISHED', :extra, '2025-01-01', '2025-01-01')"
+        )
+        conn.execute(text(offer), {
+            "id": 1, "category": "Inmobiliaria (Pisos/Locales)", "title": "Piso céntrico",
+            "extra": json.dumps({"operation_type": "Alquiler", "rooms": "3", "sqm": 85.0, "zone_text": "Chamberí"}),
+        })
+        conn.execute(text(offer), {"id": 2, "category": "Electricidad", "title": "Electricista", "extra": None})
+        for rating_id, score in ((1, 5), (2, 5), (3, 2)):
+            conn.execute(
+                text("INSERT INTO ratings (id, profile_id, author_id, score) VALUES (:id, 1, 1, :score)"),
+                {"id": rating_id, "score": score},
+            )
+
+
+def test_upgrade_from_baseline_schema(tmp_path):
+    engine = baseline_engine(tmp_path / "baseline.db")
+    seed_baseline(engine)
+
+    applied = run_migrations(engine)
+
+    assert applied == [version for version, _ in MIGRATIONS]
+    with Session(engine) as db:
+        # El modelo actual (con las columnas de 0007-0009) se puede leer
+        assert [o.id for o in db.execute(select(Offer).order_by(Offer.id)).scalars()] == [1, 2]
+        real_estate = db.get(OfferRealEstate, 1)
+        assert (real_estate.operation_type, real_estate.rooms, real_estate.sqm) == ("Alquiler", 3, 85)
+        assert real_estate.zone_text == "chamberi"
+        assert db.get(OfferRealEstate, 2) is None
+        profile = db.get(Profile, 1)
+        assert (profile.rating_count, profile.rating_sum) == (3, 12)
+        assert profile.rating_histogram == {1: 0, 2: 1, 3: 0, 4: 0, 5: 2}
+    engine.dispose()
+
+
+def test_upgrade_is_idempotent(tmp_path):
+    engine = baseline_engine(tmp_path / "baseline.db")
+    run_migrations(engine)
+    assert run_migrations(engine) == []
+    engine.dispose()
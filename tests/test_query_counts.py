@@ -0,0 +1,52 @@
+"""
+/ui/results y /ui/feed cargan la lista de ofertas (con nombre y teléfono del
+dueño) en una sola SELECT, sin consultas por fila: el número de consultas no
+crece con el número de ofertas.
+"""
+from itertools import count as counter
+
+import pytest
+from sqlalchemy import delete
+
+from app.db.session import SessionLocal
+from app.models.offer import Offer
+from app.models.profile import Profile
+from app.models.user import User
+from app.services.search_index import index_offer
+
+CATEGORY = "Electricidad"
+_owner_ids = counter()
+
+
+def seed_offers(count: int):
+    db = SessionLocal()
+    try:
+        db.execute(delete(Offer).where(Offer.category == CATEGORY))
+        for i in range(count):
+            user = User(email=f"owner-{next(_owner_ids)}@example.com", name=f"Dueño {i}")
+            db.add(user)
+            db.flush()
+            profile = Profile(user_id=user.id, profile_type="OFERTANTE", phone=f"600{i:06d}")
+            db.add(profile)
+            db.flush()
+            offer = Offer(
+                profile_id=profile.id, offer_kind="SERVICE", category=CATEGORY,
+                title=f"Electricista {i}", price=20 + i, status="PUBLISHED",
+            )
+            db.add(offer)
+            db.flush()
+            index_offer(db, offer)
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("path", [f"/ui/results?cat={CATEGORY}", f"/ui/feed?cat={CATEGORY}"])
+@pytest.mark.parametrize("offers", [3, 30])
+def test_offer_list_is_one_select(client, count_selects, path, offers):
+    seed_offers(offers)
+    with count_selects() as statements:
+        response = client.get(path)
+    assert response.status_code == 200
+    assert response.text.count("Electricista") >= min(offers, 6)
+    assert len(statements) == 1, statements
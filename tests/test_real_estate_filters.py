@@ -0,0 +1,57 @@
+"""
+Filtro de zona de Inmobiliaria en /ui/results: prefijo sobre zone_text (sin
+tildes ni mayúsculas), servido por ix_offer_real_estate_zone.
+"""
+import pytest
+from sqlalchemy import text
+
+from app.db.session import SessionLocal, engine
+from app.models.offer import Offer
+from app.models.profile import Profile
+from app.models.user import User
+from app.services.offer_attributes import sync_offer_attributes
+
+CATEGORY = "Inmobiliaria (Pisos/Locales)"
+
+
+@pytest.fixture(scope="module")
+def flats(app):
+    db = SessionLocal()
+    try:
+        user = User(email="inmo@example.com", name="Inmobiliaria")
+        db.add(user)
+        db.flush()
+        profile = Profile(user_id=user.id, profile_type="OFERTANTE")
+        db.add(profile)
+        db.flush()
+        for title, zone in (("Piso en Chamberí", "Chamberí"), ("Ático en Salamanca", "Barrio de Salamanca")):
+            offer = Offer(
+                profile_id=profile.id, offer_kind="PRODUCT", category=CATEGORY, title=title,
+                price=1000, status="PUBLISHED", extra_info={"operation_type": "Alquiler", "zone_text": zone},
+            )
+            sync_offer_attributes(db, offer)
+            db.add(offer)
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("zone, expected", [
+    ("CHAMBERI", {"Piso en Chamberí"}),
+    ("barrio de", {"Ático en Salamanca"}),
+    ("salamanca", set()),  # no es el principio de la zona
+    ("%", set()),  # los comodines del usuario se escapan
+])
+def test_zone_filter_matches_prefix(client, flats, zone, expected):
+    response = client.get("/ui/results", params={"cat": CATEGORY, "zone": zone})
+    assert response.status_code == 200
+    found = {title for title in ("Piso en Chamberí", "Ático en Salamanca") if title in response.text}
+    assert found == expected
+
+
+def test_zone_prefix_uses_index(app):
+    with engine.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT offer_id FROM offer_real_estate WHERE zone_text LIKE :p ESCAPE '/'"
+        ), {"p": "chamb%"}).all()
+    assert "ix_offer_real_estate_zone" in " ".join(row[-1] for row in plan)
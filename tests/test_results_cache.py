@@ -0,0 +1,75 @@
+"""
+Caché del HTML de /ui/results: un acierto no vuelve a leer las ofertas, la
+clave es el origen redondeado (compartida entre visitantes cercanos) y una
+página que se renderizó mientras se invalidaba su categoría no se guarda.
+"""
+import pytest
+
+from app.core.cache import TTLCache, results_page_cache
+from app.db.session import SessionLocal
+from app.models.profile import Profile
+from app.models.user import User
+
+
+@pytest.fixture
+def results_cache(monkeypatch):
+    monkeypatch.setattr(results_page_cache, "ttl", 60)
+    results_page_cache.clear()
+    yield results_page_cache
+    results_page_cache.clear()
+
+
+def test_set_skipped_if_invalidated_while_rendering():
+    cache = TTLCache(ttl=60)
+    version = cache.version({"Electricidad"})
+    cache.invalidate_tags("Electricidad")
+    cache.set("page", b"vieja", tags={"Electricidad"}, version=version)
+    assert cache.get("page") is None
+
+    # Otras categorías no afectan
+    version = cache.version({"Electricidad"})
+    cache.invalidate_tags("Fontanería")
+    cache.set("page", b"nueva", tags={"Electricidad"}, version=version)
+    assert cache.get("page") == b"nueva"
+
+
+def make_profile(email, lat, lon):
+    db = SessionLocal()
+    try:
+        user = User(email=email, name="Con ubicación")
+        db.add(user)
+        db.flush()
+        profile = Profile(user_id=user.id, profile_type="CLIENTE", geo_lat=lat, geo_lon=lon)
+        db.add(profile)
+        db.commit()
+        return user.id, profile.id
+    finally:
+        db.close()
+
+
+def test_cache_hit_runs_no_offer_query(client, count_selects, results_cache):
+    first = client.get("/ui/results?cat=Todas&lat=40.4168&lon=-3.7038")
+    assert first.headers["X-Cache"] == "MISS"
+    with count_selects() as statements:
+        second = client.get("/ui/results?cat=Todas&lat=40.4168&lon=-3.7038")
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.text == first.text
+    assert statements == []
+
+
+def test_profiles_nearby_share_the_cached_page(client, login, count_selects, results_cache):
+    user_id, profile_id = make_profile("cerca-1@example.com", 40.41681, -3.70381)
+    login(user_id=user_id, profile_id=profile_id)
+    assert client.get("/ui/results?cat=Todas").headers["X-Cache"] == "MISS"
+
+    # Otro perfil a unos metros: misma clave (origen redondeado); solo lee su ubicación
+    user_id, profile_id = make_profile("cerca-2@example.com", 40.41684, -3.70379)
+    login(user_id=user_id, profile_id=profile_id)
+    with count_selects() as statements:
+        response = client.get("/ui/results?cat=Todas")
+    assert response.headers["X-Cache"] == "HIT"
+    assert len(statements) == 1 and "FROM profiles" in statements[0]
+
+    # Si el perfil cambia de ubicación, cambia la clave: sin distancias viejas
+    client.put(f"/api/v1/profiles/{profile_id}/location", json={"lat": "41.3874", "lon": "2.1686", "address": "Barcelona"})
+    assert client.get("/ui/results?cat=Todas").headers["X-Cache"] == "MISS"
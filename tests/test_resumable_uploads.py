@@ -0,0 +1,51 @@
+"""
+Subidas reanudables (/api/v1/uploads): solo con sesión, cada subida es del
+perfil que la creó y cada perfil tiene un máximo de subidas abiertas.
+"""
+import pytest
+
+from app.services import resumable
+from app.services.resumable import RESUMABLE_MAX_OPEN_PER_PROFILE
+
+TUS = {"Tus-Resumable": "1.0.0"}
+
+
+@pytest.fixture(autouse=True)
+def resumable_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(resumable, "RESUMABLE_DIR", str(tmp_path))
+
+
+def create(client, length=10):
+    return client.post("/api/v1/uploads", headers={**TUS, "Upload-Length": str(length)})
+
+
+def test_create_requires_session(client):
+    assert create(client).status_code == 401
+
+
+def test_only_owner_can_use_upload(client, login):
+    login(user_id=1, profile_id=1)
+    location = create(client).headers["Location"]
+    chunk = {**TUS, "Upload-Offset": "0", "Content-Type": "application/offset+octet-stream"}
+
+    login(user_id=2, profile_id=2)
+    assert client.head(location, headers=TUS).status_code == 403
+    assert client.patch(location, headers=chunk, content=b"0123456789").status_code == 403
+    assert client.delete(location, headers=TUS).status_code == 403
+
+    login(user_id=1, profile_id=1)
+    assert client.patch(location, headers=chunk, content=b"0123456789").status_code == 204
+    assert client.head(location, headers=TUS).headers["Upload-Offset"] == "10"
+
+
+def test_open_uploads_per_profile_are_capped(client, login):
+    login(user_id=1, profile_id=1)
+    locations = [create(client).headers["Location"] for _ in range(RESUMABLE_MAX_OPEN_PER_PROFILE)]
+    assert create(client).status_code == 429
+
+    # Otro perfil no se ve afectado, y al borrar una se libera el hueco
+    login(user_id=2, profile_id=2)
+    assert create(client).status_code == 201
+    login(user_id=1, profile_id=1)
+    assert client.delete(locations[0], headers=TUS).status_code == 204
+    assert create(client).status_code == 201
@@ -0,0 +1,52 @@
+"""
+Búsqueda de texto en /ui/results y /ui/feed: una consulta solo de stopwords no
+tiene términos para el índice y no puede devolver todas las ofertas.
+"""
+import pytest
+
+from app.db.session import SessionLocal
+from app.models.offer import Offer
+from app.models.profile import Profile
+from app.models.user import User
+from app.services.search_index import index_offer
+
+CATEGORY = "Clases particulares"
+
+
+@pytest.fixture(scope="module")
+def offers(app):
+    db = SessionLocal()
+    try:
+        user = User(email="profe@example.com", name="Profe")
+        db.add(user)
+        db.flush()
+        profile = Profile(user_id=user.id, profile_type="OFERTANTE")
+        db.add(profile)
+        db.flush()
+        for title in ("Clases de guitarra", "Afinador de pianos", "Profesor particular"):
+            offer = Offer(
+                profile_id=profile.id, offer_kind="SERVICE", category=CATEGORY,
+                title=title, price=15, status="PUBLISHED",
+            )
+            db.add(offer)
+            db.flush()
+            index_offer(db, offer)
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("path", ["/ui/results", "/ui/feed"])
+def test_stopwords_only_query_filters_by_title(client, offers, path):
+    response = client.get(path, params={"cat": CATEGORY, "q": " de "})
+    assert response.status_code == 200
+    assert "Clases de guitarra" in response.text
+    assert "Afinador de pianos" in response.text
+    assert "Profesor particular" not in response.text
+
+
+@pytest.mark.parametrize("path", ["/ui/results", "/ui/feed"])
+def test_text_query_uses_index(client, offers, path):
+    response = client.get(path, params={"cat": CATEGORY, "q": "guitarras"})
+    assert "Clases de guitarra" in response.text
+    assert "Afinador de pianos" not in response.text